@@ -0,0 +1,29 @@
+import django_filters
+from django_filters.rest_framework import FilterSet
+
+from .models import CategorySales, ProductSales, VendorSales
+
+
+class SalesFilter(FilterSet):
+    start = django_filters.DateFilter(
+        field_name='period_start', lookup_expr='gte')
+    end = django_filters.DateFilter(
+        field_name='period_start', lookup_expr='lte')
+
+
+class VendorSalesFilter(SalesFilter):
+    class Meta:
+        model = VendorSales
+        fields = ['vendor']
+
+
+class CategorySalesFilter(SalesFilter):
+    class Meta:
+        model = CategorySales
+        fields = ['category']
+
+
+class ProductSalesFilter(SalesFilter):
+    class Meta:
+        model = ProductSales
+        fields = ['product', 'vendor', 'category']
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import backfill_sales
+
+
+class Command(BaseCommand):
+    help = ('Adds the paid orders that are not in the sales rollups yet, a chunk of orders at a time. '
+            'Orders that were already added are skipped, so it is safe to run again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        added = 0
+        for count in backfill_sales(chunk_size=options['chunk_size']):
+            added += count
+            self.stdout.write(f'{added} orders added...')
+        self.stdout.write(self.style.SUCCESS(
+            f'{added} orders were added to the sales rollups.'))
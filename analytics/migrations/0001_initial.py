@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('store', '0032_vendor_earnings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('D', 'Day'), ('W', 'Week')], max_length=1)),
+                ('period_start', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('items_sold', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='store.category')),
+            ],
+            options={
+                'unique_together': {('category', 'period', 'period_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('D', 'Day'), ('W', 'Week')], max_length=1)),
+                ('period_start', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('items_sold', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_sales', to='store.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='store.product')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vendor', 'period', 'period_start'], name='analytics_p_vendor__bb3404_idx'), models.Index(fields=['category', 'period', 'period_start'], name='analytics_p_categor_2f1494_idx'), models.Index(fields=['period', 'period_start'], name='analytics_p_period_52edf2_idx')],
+                'unique_together': {('product', 'period', 'period_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='VendorSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('D', 'Day'), ('W', 'Week')], max_length=1)),
+                ('period_start', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('items_sold', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('vendor', 'period', 'period_start')},
+            },
+        ),
+    ]
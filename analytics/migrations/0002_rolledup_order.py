@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('store', '0039_order_oversold_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RolledUpOrder',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_rollup', serialize=False, to='store.order')),
+                ('rolled_up_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
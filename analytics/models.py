@@ -0,0 +1,61 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+from store.models import Category, Order, Product
+
+
+class SalesRollup(models.Model):
+    DAY = 'D'
+    WEEK = 'W'
+    PERIOD_CHOICES = [
+        (DAY, 'Day'),
+        (WEEK, 'Week')]
+
+    period = models.CharField(max_length=1, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class VendorSales(SalesRollup):
+    vendor = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='sales')
+
+    class Meta:
+        unique_together = [['vendor', 'period', 'period_start']]
+
+
+class CategorySales(SalesRollup):
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name='sales')
+
+    class Meta:
+        unique_together = [['category', 'period', 'period_start']]
+
+
+class ProductSales(SalesRollup):
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='sales')
+    vendor = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='product_sales')
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name='product_sales')
+
+    class Meta:
+        unique_together = [['product', 'period', 'period_start']]
+        indexes = [
+            models.Index(fields=['vendor', 'period', 'period_start']),
+            models.Index(fields=['category', 'period', 'period_start']),
+            models.Index(fields=['period', 'period_start']),
+        ]
+
+
+class RolledUpOrder(models.Model):
+    """Marks a paid order whose sales were added to the rollups."""
+    order = models.OneToOneField(
+        Order, on_delete=models.CASCADE, primary_key=True, related_name='sales_rollup')
+    rolled_up_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,139 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from store.models import Order, OrderItem
+from .models import CategorySales, ProductSales, RolledUpOrder, SalesRollup, VendorSales
+
+REVENUE = DecimalField(max_digits=14, decimal_places=2)
+CHART_DAYS = 30
+
+# Each rollup with the order item paths of its key and of the columns copied onto new rows
+ROLLUPS = [
+    (VendorSales, {'vendor_id': 'product__user_id'}, {}),
+    (CategorySales, {'category_id': 'product__category_id'}, {}),
+    (ProductSales, {'product_id': 'product_id'},
+     {'vendor_id': 'product__user_id', 'category_id': 'product__category_id'}),
+]
+
+
+def week_start(date):
+    return date - timedelta(days=date.weekday())
+
+
+def group_values(order_items, columns):
+    fields = [name for name, path in columns.items() if name == path]
+    expressions = {name: F(path)
+                   for name, path in columns.items() if name != path}
+    return order_items.values(*fields, **expressions, date=TruncDate('order__created_at')).annotate(
+        revenue=Sum(F('unit_price') * F('quantity'), output_field=REVENUE),
+        items_sold=Sum('quantity'), orders=Count('order_id', distinct=True)).order_by()
+
+
+def get_buckets(rows, key, attributes):
+    buckets = {}
+    for row in rows:
+        for period, start in ((SalesRollup.DAY, row['date']), (SalesRollup.WEEK, week_start(row['date']))):
+            lookup = (period, start, *(row[name] for name in key))
+            bucket = buckets.setdefault(lookup, {
+                'attributes': {name: row[name] for name in attributes},
+                'revenue': 0, 'items_sold': 0, 'orders': 0})
+            # An order has a single date, so daily order counts add up to weekly ones
+            bucket['revenue'] += row['revenue']
+            bucket['items_sold'] += row['items_sold']
+            bucket['orders'] += row['orders']
+    return buckets
+
+
+def add_to_rollup(model, key, buckets):
+    # Rows are created and updated in key order so concurrent orders can not deadlock
+    buckets = sorted(buckets.items())
+    # Create missing rows first so concurrent orders only ever increment
+    model.objects.bulk_create(
+        [model(period=period, period_start=start, **dict(zip(key, values)), **bucket['attributes'])
+         for (period, start, *values), bucket in buckets], ignore_conflicts=True)
+    for (period, start, *values), bucket in buckets:
+        model.objects.filter(period=period, period_start=start, **dict(zip(key, values))).update(
+            revenue=F('revenue') + bucket['revenue'], items_sold=F('items_sold') + bucket['items_sold'],
+            orders=F('orders') + bucket['orders'])
+
+
+def add_sales(order_items):
+    """
+    Adds paid order items to every rollup. The database sums them per day and
+    key, and the week buckets are folded from the day rows, so one query per
+    rollup is read whether a single order or a backfill chunk is passed.
+    """
+    for model, key, attributes in ROLLUPS:
+        rows = group_values(order_items, {**key, **attributes})
+        buckets = get_buckets(rows, key, attributes)
+        if buckets:
+            add_to_rollup(model, key, buckets)
+
+
+def add_orders(order_ids):
+    """
+    Adds the paid orders among `order_ids` that were not rolled up yet and
+    returns how many it added. The marker rows are written in the same
+    transaction as the sales, so an order is counted once whether the
+    order_completed receiver or a backfill gets to it first.
+    """
+    with transaction.atomic():
+        rolled_up = set(RolledUpOrder.objects.filter(
+            order_id__in=order_ids).values_list('order_id', flat=True))
+        order_ids = sorted(set(order_ids) - rolled_up)
+        if not order_ids:
+            return 0
+        # A second backfill running at the same time fails on these rows instead of counting twice
+        RolledUpOrder.objects.bulk_create(
+            [RolledUpOrder(order_id=order_id) for order_id in order_ids])
+        add_sales(OrderItem.objects.filter(order_id__in=order_ids))
+    return len(order_ids)
+
+
+def backfill_sales(chunk_size=1000):
+    """
+    Adds every paid order that is not in the rollups yet, one chunk of orders
+    per transaction, and yields how many each chunk added. Orders the
+    receiver already added are skipped, so it can be run again at any time.
+    """
+    orders = Order.objects.filter(
+        payment_status=Order.PAYMENT_STATUS_COMPLETE, sales_rollup__isnull=True).order_by('id')
+    last_id = 0
+    while True:
+        order_ids = list(orders.filter(id__gt=last_id).values_list(
+            'id', flat=True)[:chunk_size])
+        if not order_ids:
+            return
+
+        added = add_orders(order_ids)
+        last_id = order_ids[-1]
+        yield added
+
+
+def get_sales_chart(user, days=CHART_DAYS):
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    sales = {row['period_start']: row for row in VendorSales.objects.filter(
+        vendor=user, period=SalesRollup.DAY, period_start__range=(start, end)).values('period_start', 'revenue', 'orders')}
+
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    return {
+        'labels': [date.strftime('%b %d') for date in dates],
+        'revenue': [float(sales[date]['revenue']) if date in sales else 0 for date in dates],
+        'orders': [sales[date]['orders'] if date in sales else 0 for date in dates],
+    }
+
+
+def get_top_products(queryset, limit=5):
+    return queryset.values('product_id', title=F('product__title')).annotate(
+        total_revenue=Sum('revenue'), total_items_sold=Sum('items_sold'),
+        total_orders=Sum('orders')).order_by('-total_revenue', 'product_id')[:limit]
+
+
+def get_vendor_top_products(user, days=CHART_DAYS, limit=5):
+    start = timezone.localdate() - timedelta(days=days - 1)
+    return get_top_products(ProductSales.objects.filter(
+        vendor=user, period=SalesRollup.DAY, period_start__gte=start), limit)
@@ -0,0 +1,33 @@
+from rest_framework import serializers
+
+from .models import CategorySales, ProductSales, VendorSales
+
+SALES_FIELDS = ['period', 'period_start', 'revenue', 'items_sold', 'orders']
+
+
+class VendorSalesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VendorSales
+        fields = ['vendor'] + SALES_FIELDS
+
+
+class CategorySalesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CategorySales
+        fields = ['category'] + SALES_FIELDS
+
+
+class ProductSalesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductSales
+        fields = ['product', 'title', 'vendor', 'category'] + SALES_FIELDS
+
+    title = serializers.CharField(source='product.title', read_only=True)
+
+
+class TopProductSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    title = serializers.CharField()
+    total_revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    total_items_sold = serializers.IntegerField()
+    total_orders = serializers.IntegerField()
@@ -0,0 +1,9 @@
+from django.dispatch import receiver
+from store.signals import order_completed
+
+from ..rollups import add_orders
+
+
+@receiver(order_completed)
+def add_order_to_sales(sender, **kwargs):
+    add_orders([kwargs['order'].pk])
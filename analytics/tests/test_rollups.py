@@ -0,0 +1,179 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from model_bakery import baker
+import pytest
+
+from analytics.models import CategorySales, ProductSales, RolledUpOrder, SalesRollup, VendorSales
+from analytics.rollups import backfill_sales, get_sales_chart
+from store.checkout import complete_order
+from store.models import Category, Customer, Order, OrderItem, Product
+
+
+@pytest.fixture
+def vendor():
+    return baker.make(User)
+
+
+@pytest.fixture
+def products(vendor):
+    category = baker.make(Category)
+    return [baker.make(Product, user=vendor, category=category, title=title, inventory=100)
+            for title in ('Green tea', 'Black tea')]
+
+
+@pytest.fixture
+def make_order(products):
+    customer = baker.make(Customer, user=baker.make(User))
+
+    def do_make_order(created_at, quantities=(2, 1), payment_status=Order.PAYMENT_STATUS_PENDING):
+        order = baker.make(Order, customer=customer, total_price=10, payment_status=payment_status)
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        order.refresh_from_db()
+        for product, quantity in zip(products, quantities):
+            baker.make(OrderItem, order=order, product=product, quantity=quantity, unit_price=Decimal('2.50'))
+        return order
+    return do_make_order
+
+
+def complete(order):
+    with patch('store.tasks.process_paid_order.delay'):
+        complete_order(order)
+
+
+# Wednesday and Thursday of the same week, then the Monday after
+WEDNESDAY = datetime(2026, 10, 14, 12, tzinfo=timezone.utc)
+THURSDAY = datetime(2026, 10, 15, 12, tzinfo=timezone.utc)
+MONDAY = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+@pytest.mark.django_db
+class TestAddSales:
+    def test_if_order_is_completed_adds_day_and_week_rows(self, vendor, make_order):
+        complete(make_order(WEDNESDAY))
+
+        day = VendorSales.objects.get(vendor=vendor, period=SalesRollup.DAY)
+        week = VendorSales.objects.get(vendor=vendor, period=SalesRollup.WEEK)
+        assert (day.period_start, day.revenue, day.items_sold, day.orders) == (
+            date(2026, 10, 14), Decimal('7.50'), 3, 1)
+        assert week.period_start == date(2026, 10, 12)
+        assert CategorySales.objects.filter(period=SalesRollup.DAY).get().revenue == Decimal('7.50')
+        assert ProductSales.objects.filter(period=SalesRollup.DAY).count() == 2
+
+    def test_if_orders_share_a_week_adds_to_one_week_row(self, vendor, make_order):
+        complete(make_order(WEDNESDAY))
+        complete(make_order(THURSDAY))
+        complete(make_order(MONDAY))
+
+        weeks = VendorSales.objects.filter(vendor=vendor, period=SalesRollup.WEEK).order_by('period_start')
+        assert [(week.orders, week.revenue) for week in weeks] == [
+            (2, Decimal('15.00')), (1, Decimal('7.50'))]
+
+    def test_if_order_is_completed_twice_adds_it_once(self, vendor, make_order):
+        order = make_order(WEDNESDAY)
+
+        complete(order)
+        complete(order)
+
+        assert VendorSales.objects.get(vendor=vendor, period=SalesRollup.DAY).orders == 1
+
+
+@pytest.mark.django_db
+class TestBackfill:
+    def test_if_backfilled_twice_matches_incremental_rollups(self, make_order):
+        for created_at in (WEDNESDAY, THURSDAY, MONDAY, MONDAY):
+            complete(make_order(created_at, quantities=(3, 2)))
+        make_order(MONDAY)
+        rows = sorted(ProductSales.objects.values_list(
+            'product_id', 'period', 'period_start', 'revenue', 'items_sold', 'orders'))
+        vendor_rows = sorted(VendorSales.objects.values_list('period', 'period_start', 'revenue', 'orders'))
+        RolledUpOrder.objects.all().delete()
+        for model in (VendorSales, CategorySales, ProductSales):
+            model.objects.all().delete()
+
+        call_command('backfill_sales_rollups', chunk_size=3)
+        call_command('backfill_sales_rollups', chunk_size=3)
+
+        assert sorted(ProductSales.objects.values_list(
+            'product_id', 'period', 'period_start', 'revenue', 'items_sold', 'orders')) == rows
+        assert sorted(VendorSales.objects.values_list('period', 'period_start', 'revenue', 'orders')) == vendor_rows
+
+    def test_if_receiver_added_order_skips_it(self, vendor, make_order):
+        complete(make_order(WEDNESDAY))
+        make_order(WEDNESDAY, payment_status=Order.PAYMENT_STATUS_COMPLETE)
+
+        assert list(backfill_sales(chunk_size=1)) == [1]
+
+        assert VendorSales.objects.get(vendor=vendor, period=SalesRollup.DAY).orders == 2
+
+    def test_if_order_completes_after_backfill_adds_it_once(self, vendor, make_order):
+        make_order(WEDNESDAY, payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        list(backfill_sales())
+
+        complete(make_order(WEDNESDAY))
+        list(backfill_sales())
+
+        assert VendorSales.objects.get(vendor=vendor, period=SalesRollup.DAY).orders == 2
+
+
+@pytest.mark.django_db
+class TestSalesApi:
+    def test_if_vendor_lists_sales_returns_only_own_days(self, client, vendor, make_order):
+        complete(make_order(WEDNESDAY))
+        complete(make_order(THURSDAY))
+        other_order = make_order(THURSDAY)
+        OrderItem.objects.filter(order=other_order).update(product=baker.make(Product, inventory=10))
+        complete(other_order)
+        client.force_login(vendor)
+
+        response = client.get('/analytics/vendors/')
+
+        assert response.status_code == 200
+        assert [row['period_start'] for row in response.data['results']] == [
+            '2026-10-14', '2026-10-15']
+
+    def test_if_week_period_is_requested_returns_week_rows(self, client, vendor, make_order):
+        complete(make_order(WEDNESDAY))
+        client.force_login(vendor)
+
+        response = client.get('/analytics/vendors/?period=W')
+
+        assert [row['period_start'] for row in response.data['results']] == ['2026-10-12']
+
+    def test_if_period_is_invalid_returns_400(self, client, vendor):
+        client.force_login(vendor)
+
+        response = client.get('/analytics/vendors/?period=Y')
+
+        assert response.status_code == 400
+
+    def test_if_top_products_are_requested_orders_by_revenue(self, client, vendor, make_order):
+        complete(make_order(WEDNESDAY, quantities=(1, 4)))
+        complete(make_order(MONDAY, quantities=(1, 4)))
+        client.force_login(vendor)
+
+        response = client.get('/analytics/products/top/?start=2026-10-01&end=2026-10-31')
+
+        assert [(row['title'], row['total_items_sold']) for row in response.data] == [
+            ('Black tea', 8), ('Green tea', 2)]
+
+    def test_if_vendor_lists_category_sales_returns_403(self, client, vendor):
+        client.force_login(vendor)
+
+        response = client.get('/analytics/categories/')
+
+        assert response.status_code == 403
+
+
+@pytest.mark.django_db
+class TestSalesChart:
+    def test_if_days_have_no_sales_fills_zeros(self, vendor, make_order):
+        with patch('django.utils.timezone.localdate', return_value=date(2026, 10, 15)):
+            complete(make_order(WEDNESDAY))
+            chart = get_sales_chart(vendor, days=3)
+
+        assert chart['labels'] == ['Oct 13', 'Oct 14', 'Oct 15']
+        assert chart['revenue'] == [0, 7.5, 0]
+        assert chart['orders'] == [0, 1, 0]
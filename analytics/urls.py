@@ -0,0 +1,13 @@
+from django.urls import include, path
+from rest_framework.routers import SimpleRouter
+
+from .views import CategorySalesViewSet, ProductSalesViewSet, VendorSalesViewSet
+
+router = SimpleRouter()
+router.register('vendors', VendorSalesViewSet, basename='vendor-sales')
+router.register('categories', CategorySalesViewSet, basename='category-sales')
+router.register('products', ProductSalesViewSet, basename='product-sales')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,66 @@
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import ReadOnlyModelViewSet
+
+from store.pagination import DefaultPagination
+from .filters import CategorySalesFilter, ProductSalesFilter, VendorSalesFilter
+from .models import CategorySales, ProductSales, SalesRollup, VendorSales
+from .rollups import get_top_products
+from .serializers import CategorySalesSerializer, ProductSalesSerializer, TopProductSerializer, VendorSalesSerializer
+
+
+class SalesViewSet(ReadOnlyModelViewSet):
+    """
+    Reads the sales rollups only. Rows are daily unless ?period=W is passed,
+    and vendors only see their own sales.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = DefaultPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    ordering_fields = ['period_start', 'revenue', 'items_sold', 'orders']
+    ordering = ['period_start']
+
+    def get_queryset(self):
+        period = self.request.query_params.get('period', SalesRollup.DAY)
+        if period not in dict(SalesRollup.PERIOD_CHOICES):
+            raise ValidationError({'period': 'Use D for days or W for weeks.'})
+
+        queryset = self.queryset.filter(period=period)
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(vendor=self.request.user)
+        return queryset
+
+
+class VendorSalesViewSet(SalesViewSet):
+    queryset = VendorSales.objects.all()
+    serializer_class = VendorSalesSerializer
+    filterset_class = VendorSalesFilter
+
+
+class CategorySalesViewSet(SalesViewSet):
+    queryset = CategorySales.objects.all()
+    serializer_class = CategorySalesSerializer
+    filterset_class = CategorySalesFilter
+    permission_classes = [IsAdminUser]
+
+
+class ProductSalesViewSet(SalesViewSet):
+    queryset = ProductSales.objects.select_related('product').only(
+        'product__title', 'vendor', 'category', 'period', 'period_start', 'revenue', 'items_sold', 'orders')
+    serializer_class = ProductSalesSerializer
+    filterset_class = ProductSalesFilter
+
+    @action(detail=False)
+    def top(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 100)
+        except ValueError:
+            raise ValidationError({'limit': 'A number is required.'})
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = TopProductSerializer(get_top_products(queryset, limit), many=True)
+        return Response(serializer.data)
@@ -2,10 +2,11 @@ from django.http import HttpResponseBadRequest
 from django.shortcuts import render
 from django.core.mail import send_mail, BadHeaderError
 from django.conf import settings
-from django.db.models.aggregates import Count
-from django.db.models import F
+from django.db.models import Case, Value, When
 
-from store.models import OrderItem, Product
+from store.models import ProductCard
+from store.popularity import get_popular_product_ids
+from store.breadcrumbs import clear_breadcrumbs
 from store.views import breadcrumb_navigation, sort_filter
 from .forms import ContactForm
 
@@ -36,17 +37,16 @@ def contact(request):
 
 
 def frontpage(request):
-    if request.session.get('breadcrumbs'):
-        del request.session['breadcrumbs']
+    clear_breadcrumbs(request)
 
-    order_item_ids = OrderItem.objects.values('product_id').annotate(
-        count=Count('product_id')).order_by('-count')[:16]
-    product_ids = [o['product_id'] for o in order_item_ids]
+    product_ids = get_popular_product_ids(16)
 
-    popular_products = Product.objects.select_related('user', 'category').annotate(vendor_userid=F('user__vendors'), vendor_shop_name=F('user__vendors__shop_name')).filter(
-        status=Product.ACTIVE, deleted=False, id__in=product_ids)
+    # Rank by position in the popularity list so the page stays a single table query
+    popular_products = ProductCard.objects.filter(pk__in=product_ids).annotate(popularity_score=Case(
+        *[When(pk=product_id, then=Value(len(product_ids) - rank)) for rank, product_id in enumerate(product_ids)], default=0))
 
-    context = sort_filter(request, popular_products)
+    context = sort_filter(request, popular_products,
+                          default_ordering='-popularity_score')
 
     return render(request, 'frontpage.html', {**context})
 
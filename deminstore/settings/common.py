@@ -1,4 +1,5 @@
 from datetime import timedelta
+from celery.schedules import crontab
 from dotenv import load_dotenv
 import os
 import django
@@ -20,6 +21,21 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 STRIPE_PUB_KEY = os.getenv('STRIPE_PUB_KEY')
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
+STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE')
+STRIPE_CONNECT_TIMEOUT = 3
+STRIPE_READ_TIMEOUT = 10
+STRIPE_MAX_NETWORK_RETRIES = 1
+STRIPE_POOL_SIZE = 10
+STRIPE_CIRCUIT_FAILURE_THRESHOLD = 5
+STRIPE_CIRCUIT_RESET_SECONDS = 30
+
+EMAIL_TIMEOUT = 10
+EMAIL_CONNECTION_MAX_AGE = 60
+STRIPE_EVENT_BATCH_SIZE = 100
+# A failing event is retried after 1, 2, 4... minutes and given up after this many attempts
+STRIPE_EVENT_MAX_ATTEMPTS = 10
+STRIPE_EVENT_RETRY_SECONDS = 60
 
 
 LOGIN_REDIRECT_URL = 'frontpage'
@@ -28,8 +44,62 @@ LOGIN_URL = '/myaccount/'
 LOGOUT_URL = '/logout/'
 
 CART_SESSION_ID = 'cart'
+CART_COUNT_SESSION_ID = 'cart_count'
+BREADCRUMB_COOKIE_NAME = 'breadcrumbs'
 SESSION_COOKIE_AGE = 86400
 
+# Used by store.sessions to move sessions from the database on first use
+SESSION_MIGRATE_FROM_DB = False
+
+# Listings larger than this switch from numbered pages to next/previous cursors
+KEYSET_PAGINATION_THRESHOLD = 160
+
+# Orders fetched per query while streaming an order export
+ORDER_EXPORT_CHUNK_SIZE = 200
+
+# Paid orders from this many days whose confirmation email was not sent are retried
+ORDER_CONFIRMATION_SWEEP_DAYS = 3
+
+# Frontpage popularity only counts orders from this many days, None counts all of them
+POPULAR_PRODUCTS_WINDOW_DAYS = 30
+
+CELERY_BEAT_SCHEDULE = {
+    'rebuild_popular_products': {
+        'task': 'store.tasks.rebuild_popular_products',
+        'schedule': crontab(minute=15),
+    },
+    'release_expired_reservations': {
+        'task': 'store.tasks.release_expired_reservations',
+        'schedule': crontab(minute='*/5'),
+    },
+    # Picks up webhook events whose task could not be queued
+    'process_stripe_events': {
+        'task': 'store.tasks.process_stripe_events',
+        'schedule': crontab(),
+    },
+    'send_missing_confirmations': {
+        'task': 'store.tasks.send_missing_confirmations',
+        'schedule': crontab(minute='*/10'),
+    },
+}
+
+# Stock held for an unpaid order, also used as the Stripe session lifetime (at least 30 minutes)
+STOCK_RESERVATION_MINUTES = 60
+
+# Listing counts are cached per filter and shown as "1,000+" above the threshold
+PRODUCT_COUNT_CACHE_TIMEOUT = 300
+PRODUCT_COUNT_ESTIMATE_THRESHOLD = 1000
+
+# Responsive image variants, listed in order of preference for <picture> sources
+PRODUCT_IMAGE_VARIANT_WIDTHS = [160, 320, 640, 1024]
+PRODUCT_IMAGE_VARIANT_FORMATS = ['avif', 'webp', 'jpeg']
+PRODUCT_IMAGE_VARIANT_QUALITY = 80
+THUMBNAIL_QUEUE_DEDUP_SECONDS = 600
+
+SEARCH_BACKEND = 'store.search.InvertedIndexSearchBackend'
+SEARCH_SUGGESTION_MAX_LIMIT = 20
+SEARCH_SUGGESTION_CACHE_SECONDS = 60
+
 CRISPY_TEMPLATE_PACK = 'tailwind'
 CRISPY_ALLOWED_TEMPLATE_PACKS = ('tailwind')
 
@@ -52,7 +122,8 @@ INSTALLED_APPS = [
     'django_filters',
     'core',
     'userprofile',
-    'store'
+    'store',
+    'analytics',
 ]
 
 MIDDLEWARE = [
@@ -64,6 +135,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'store.breadcrumbs.BreadcrumbMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
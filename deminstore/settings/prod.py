@@ -34,6 +34,9 @@ CACHES = {
     }
 }
 
+SESSION_ENGINE = 'store.sessions'
+SESSION_MIGRATE_FROM_DB = True
+
 # Email settings
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ['MAILGUN_SMTP_SERVER']
@@ -9,6 +9,7 @@ from django.views.generic.base import TemplateView
 urlpatterns = [
     path('', include('store.urls')),
     path('', include('userprofile.urls')),
+    path('analytics/', include('analytics.urls')),
     path('', frontpage, name='frontpage'),
     path('admin/', admin.site.urls),
     path('about/', aboutpage, name='about'),
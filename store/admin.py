@@ -7,6 +7,7 @@ from django.db.models import Count
 from django.templatetags.static import static
 
 from . import models
+from .tasks import schedule_thumbnail
 
 LESS_THAN_TEN = '<10'
 
@@ -32,8 +33,10 @@ class ProductImageInline(admin.TabularInline):
     readonly_fields = ('display_thumbnail',)
 
     def display_thumbnail(self, instance):
-        if instance.thumbnail:
+        if instance.thumbnail and instance.thumbnail_status == models.ProductImage.THUMBNAIL_READY:
             return format_html('<img src="{}" width="100" height="100" object-fit="cover" />', instance.thumbnail.url)
+        if instance.image and instance.thumbnail_status == models.ProductImage.THUMBNAIL_PENDING:
+            return 'Processing...'
         return None
 
     display_thumbnail.allow_tags = True
@@ -56,18 +59,16 @@ class ProductAdmin(admin.ModelAdmin):
     inlines = [ProductImageInline]
 
     def save_related(self, request, form, formsets, change):
-        product = form.instance
-
         super().save_related(request, form, formsets, change)
 
-        for product_image in product.productimages.all():
-            if product_image.image:
-                product_image.thumbnail = product_image.make_thumbnail(
-                    product_image.image)
-            else:
-                product_image.thumbnail = None
-            product_image.save()
-            return True
+        for formset in formsets:
+            for inline_form in formset.forms:
+                product_image = inline_form.instance
+                if 'image' in inline_form.changed_data and product_image.pk:
+                    product_image.mark_thumbnail_pending()
+                    product_image.save(
+                        update_fields=['thumbnail', 'thumbnail_status'])
+                    schedule_thumbnail(product_image.pk)
 
     @admin.display(ordering='inventory')
     def inventory_status(self, product):
@@ -122,6 +123,7 @@ class OrderAdmin(admin.ModelAdmin):
     autocomplete_fields = ['customer']
     list_display = ['id', 'created_at', 'payment_status',
                     'customer', 'payment_intent', 'total_price']
+    list_filter = ['payment_status', ('oversold_at', admin.EmptyFieldListFilter)]
     list_per_page = 10
     inlines = [OrderItemInline]
 
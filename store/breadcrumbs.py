@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core import signing
+
+BREADCRUMB_SALT = 'store.breadcrumbs'
+MAX_BREADCRUMBS = 4
+
+
+def load_breadcrumbs(request):
+    cookie = request.COOKIES.get(settings.BREADCRUMB_COOKIE_NAME)
+    if not cookie:
+        return []
+
+    try:
+        breadcrumbs = signing.loads(cookie, salt=BREADCRUMB_SALT)
+    except signing.BadSignature:
+        return []
+
+    if not isinstance(breadcrumbs, list):
+        return []
+    return [item for item in breadcrumbs
+            if isinstance(item, dict) and {'label', 'url'} <= item.keys()]
+
+
+def get_breadcrumbs(request):
+    if not hasattr(request, '_breadcrumbs'):
+        request._breadcrumbs = load_breadcrumbs(request)
+    return request._breadcrumbs
+
+
+def set_breadcrumbs(request, breadcrumbs):
+    if breadcrumbs != get_breadcrumbs(request):
+        request._breadcrumbs = breadcrumbs
+        request._breadcrumbs_changed = True
+
+
+def add_breadcrumb(request, label):
+    breadcrumb = {'label': label, 'url': request.path}
+    breadcrumbs = [item for item in get_breadcrumbs(request)
+                   if item['label'] != label]
+
+    breadcrumbs.append(breadcrumb)
+    breadcrumbs = breadcrumbs[-MAX_BREADCRUMBS:]
+    set_breadcrumbs(request, breadcrumbs)
+    return breadcrumbs
+
+
+def clear_breadcrumbs(request):
+    set_breadcrumbs(request, [])
+
+
+class BreadcrumbMiddleware:
+    """
+    Keeps the breadcrumb trail in a signed cookie instead of the session and
+    only sends the cookie when a view changed the trail, so browsing back and
+    forth between the same pages writes nothing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if getattr(request, '_breadcrumbs_changed', False):
+            if request._breadcrumbs:
+                response.set_cookie(
+                    settings.BREADCRUMB_COOKIE_NAME,
+                    signing.dumps(request._breadcrumbs,
+                                  salt=BREADCRUMB_SALT, compress=True),
+                    max_age=settings.SESSION_COOKIE_AGE,
+                    secure=settings.SESSION_COOKIE_SECURE,
+                    httponly=True,
+                    samesite='Lax',
+                )
+            else:
+                response.delete_cookie(
+                    settings.BREADCRUMB_COOKIE_NAME, samesite='Lax')
+        return response
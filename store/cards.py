@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .counts import invalidate_product_counts
+from .images import get_sources
+from .models import Product, ProductCard, ProductImage
+
+BATCH_SIZE = 500
+
+
+def get_thumbnail_url(image):
+    # Reads the stored state only, get_thumbnail() would queue missing thumbnails
+    if image.thumbnail and image.thumbnail_status == ProductImage.THUMBNAIL_READY:
+        return image.thumbnail.url
+    return ProductImage.DEFAULT_IMAGE_URL
+
+
+def build_card(product):
+    images = list(product.productimages.all())
+    image = images[0] if images else None
+    return ProductCard(
+        product=product,
+        title=product.title,
+        unit_price=product.unit_price,
+        user_id=product.user_id,
+        vendor_id=product.vendor_id,
+        vendor_name=product.vendor_shop_name or product.user.get_full_name(),
+        category_id=product.category_id,
+        category_title=product.category.title,
+        thumbnail=get_thumbnail_url(image) if image else '',
+        sources=get_sources(image) if image else {},
+        last_update=product.last_update,
+    )
+
+
+def refresh_cards(product_ids):
+    """
+    Rebuilds the cards of the given products from one batch of queries.
+    Products that are no longer visible lose their card. The product rows are
+    locked before they are read, so concurrent refreshes of a card, such as a
+    product save and a queued vendor refresh, run one after the other and the
+    last one writes what it read last.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return 0
+
+    with transaction.atomic():
+        # Locking in id order keeps overlapping batches from deadlocking
+        list(Product.objects.select_for_update().filter(
+            pk__in=product_ids).order_by('pk').values_list('pk', flat=True))
+        products = Product.objects.for_listing().filter(pk__in=product_ids).prefetch_related(Prefetch(
+            'productimages', queryset=ProductImage.objects.filter(default=True).order_by('id').prefetch_related('variants')))
+        cards = [build_card(product) for product in products]
+
+        ProductCard.objects.filter(pk__in=product_ids).delete()
+        ProductCard.objects.bulk_create(cards)
+        transaction.on_commit(invalidate_product_counts)
+    return len(cards)
+
+
+def refresh_cards_for(batch_size=BATCH_SIZE, **filters):
+    products = Product.objects.filter(**filters).order_by('id')
+    refreshed = 0
+    last_id = 0
+    while True:
+        product_ids = list(products.filter(id__gt=last_id).values_list(
+            'id', flat=True)[:batch_size])
+        if not product_ids:
+            return refreshed
+        refreshed += refresh_cards(product_ids)
+        last_id = product_ids[-1]
+
+
+def rebuild_cards(batch_size=BATCH_SIZE):
+    return refresh_cards_for(batch_size=batch_size)
@@ -3,48 +3,98 @@ from django.conf import settings
 from django.db.models import Prefetch
 from store.models import Product, ProductImage
 
+CENTS = Decimal('0.00')
+
+
+def to_price(value):
+    return Decimal(str(value)).quantize(CENTS, rounding=ROUND_DOWN)
+
+
+def compact_line(line):
+    # Older sessions stored the whole product, only the quantity and price snapshot are kept
+    return {'quantity': int(line['quantity']), 'unit_price': str(to_price(line['unit_price']))}
+
+
+def get_cart_count(session):
+    count = session.get(settings.CART_COUNT_SESSION_ID)
+    if count is None:
+        # Sessions written before the count was stored
+        cart = session.get(settings.CART_SESSION_ID) or {}
+        count = sum(int(line['quantity']) for line in cart.values())
+    return count
+
 
 class Cart(object):
+    """
+    Session cart that only stores quantities and price snapshots. Product
+    details and thumbnails are loaded in one batch the first time the cart is
+    read during a request, and totals are computed once from that batch.
+    """
+
     def __init__(self, request):
         self.session = request.session
 
-        cart = self.session.get(settings.CART_SESSION_ID)
-
-        if not cart:
-            cart = self.session[settings.CART_SESSION_ID] = {}
+        cart = self.session.get(settings.CART_SESSION_ID) or {}
 
-        self.cart = cart
+        self.cart = {product_id: compact_line(line)
+                     for product_id, line in cart.items()}
+        self._items = None
+        self._total_cost = None
 
     def __iter__(self):
-        for item in self.cart.values():
-            item['total_price'] = item['unit_price'] * item['quantity']
-            item['total_price'] = Decimal(item['total_price']).quantize(
-                Decimal('0.00'), rounding=ROUND_DOWN)
-            item['total_price'] = str(item['total_price'])
-            yield item
+        return iter(self.get_items())
 
     def __len__(self):
-        return sum(item['quantity'] for item in self.cart.values())
+        return sum(line['quantity'] for line in self.cart.values())
+
+    def get_products(self):
+        products = Product.objects.only(
+            'id', 'title', 'description', 'inventory', 'category').prefetch_related(
+            Prefetch('productimages', queryset=ProductImage.objects.filter(default=True)))
+        return products.in_bulk([int(product_id) for product_id in self.cart])
+
+    def get_items(self):
+        if self._items is None:
+            products = self.get_products() if self.cart else {}
+            items = []
+            for product_id, line in self.cart.items():
+                product = products.get(int(product_id))
+                if product is None:
+                    continue
+                unit_price = Decimal(line['unit_price'])
+                items.append({
+                    'id': product.id,
+                    'quantity': line['quantity'],
+                    'title': product.title,
+                    'unit_price': unit_price,
+                    'total_price': to_price(unit_price * line['quantity']),
+                    'inventory': product.inventory,
+                    'description': product.description,
+                    'get_thumbnail': [product_image.get_thumbnail() for product_image in product.productimages.all()],
+                    'category_id': product.category_id,
+                })
+            self._items = items
+        return self._items
 
     def save(self):
-        self.session[settings.CART_SESSION_ID] = self.cart
+        if self.cart:
+            self.session[settings.CART_SESSION_ID] = self.cart
+            self.session[settings.CART_COUNT_SESSION_ID] = len(self)
+        else:
+            self.session.pop(settings.CART_SESSION_ID, None)
+            self.session.pop(settings.CART_COUNT_SESSION_ID, None)
         self.session.modified = True
+        self._items = None
+        self._total_cost = None
 
     def add(self, product_id, quantity=1, update_quantity=False):
-        product = Product.objects.prefetch_related(
-            Prefetch(
-                'productimages', queryset=ProductImage.objects.filter(default=True))).get(pk=product_id)
         product_id = str(product_id)
         if product_id not in self.cart:
+            unit_price = Product.objects.values_list(
+                'unit_price', flat=True).get(pk=product_id)
             self.cart[product_id] = {
-                'id': int(product.id),
                 'quantity': int(quantity),
-                'title': str(product.title),
-                'unit_price': float(product.unit_price),
-                'inventory': int(product.inventory),
-                'description': str(product.description),
-                'get_thumbnail': [str(product_image.get_thumbnail()) for product_image in product.productimages.all()],
-                'category_id': int(product.category.id)
+                'unit_price': str(to_price(unit_price)),
             }
         else:
             update_quantity = True
@@ -55,15 +105,21 @@ class Cart(object):
         self.save()
 
     def remove(self, product_id):
+        product_id = str(product_id)
         if product_id in self.cart:
             del self.cart[product_id]
 
             self.save()
 
     def get_total_cost(self):
-        return sum([Decimal(item['total_price']) for item in self]).quantize(
-            Decimal('0.00'), rounding=ROUND_DOWN)
+        if self._total_cost is None:
+            self._total_cost = sum((item['total_price'] for item in self.get_items()), CENTS)
+        return self._total_cost
 
     def clear(self):
-        del self.session[settings.CART_SESSION_ID]
+        self.session.pop(settings.CART_SESSION_ID, None)
+        self.session.pop(settings.CART_COUNT_SESSION_ID, None)
         self.session.modified = True
+        self.cart = {}
+        self._items = None
+        self._total_cost = None
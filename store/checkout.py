@@ -0,0 +1,110 @@
+from collections import namedtuple
+from decimal import Decimal
+from django.db import transaction
+
+from .cart import to_price
+from .inventory import InsufficientStock, commit_stock, reserve_stock
+from .models import Order, OrderItem, Product
+from .signals import order_completed
+
+OrderLine = namedtuple('OrderLine', ['product', 'quantity', 'unit_price'])
+
+
+class CheckoutError(Exception):
+    pass
+
+
+def get_order_lines(cart):
+    """
+    Loads every product in the cart with one query and checks the lines
+    against it in memory. Lines are priced at the price the cart showed. If
+    a product's price has changed since, the cart takes the new price and
+    checkout stops so the customer can review it.
+    """
+    products = Product.objects.only('id', 'title', 'unit_price', 'inventory', 'status', 'deleted').in_bulk(
+        [int(product_id) for product_id in cart.cart])
+
+    lines = []
+    repriced = []
+    for product_id, line in cart.cart.items():
+        product = products.get(int(product_id))
+        quantity = line['quantity']
+        if product is None or product.deleted or product.status != Product.ACTIVE:
+            raise CheckoutError(
+                'One of the products in your cart is no longer available.')
+        if quantity > product.inventory:
+            raise CheckoutError(
+                f'Sorry, only {product.inventory} of {product.title} left in stock.')
+        unit_price = Decimal(line['unit_price'])
+        if unit_price != to_price(product.unit_price):
+            line['unit_price'] = str(to_price(product.unit_price))
+            repriced.append(product.title)
+        lines.append(OrderLine(product, quantity, unit_price))
+
+    if repriced:
+        cart.save()
+        raise CheckoutError(
+            f'The price of {", ".join(repriced)} has changed. Please review your cart.')
+    if not lines:
+        raise CheckoutError('Your cart is empty.')
+    return lines
+
+
+def create_order(customer, cart):
+    lines = get_order_lines(cart)
+
+    try:
+        with transaction.atomic():
+            order = Order.objects.create(customer=customer, total_price=sum(
+                (line.unit_price * line.quantity for line in lines), Decimal('0.00')))
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=line.product,
+                          quantity=line.quantity, unit_price=line.unit_price)
+                for line in lines])
+            reserve_stock(
+                order, [(line.product.id, line.quantity) for line in lines])
+    except InsufficientStock as exc:
+        # Another shopper bought the stock between the check above and the reservation
+        title = next(line.product.title for line in lines if line.product.id == exc.product_id)
+        raise CheckoutError(f'Sorry, {title} just sold out.')
+    return order
+
+
+def get_line_items(order):
+    order_items = order.orderitems.select_related(
+        'product').only('quantity', 'unit_price', 'product__title')
+    return [{
+        'price_data': {
+            'currency': 'usd',
+            'product_data': {
+                'name': order_item.product.title,
+            },
+            'unit_amount': int(order_item.unit_price * 100),
+        },
+        'quantity': order_item.quantity,
+    } for order_item in order_items]
+
+
+def complete_order(order):
+    """
+    Marks the order paid and commits its stock. Only the first call for an
+    order does anything: order_completed receivers run inside the same
+    transaction, and the order_created receivers and the confirmation email
+    are queued to run after it commits. The receivers keep ledgers that can
+    be rebuilt from orders, so they are sent robustly: a failing receiver
+    rolls back its own savepoint and is logged, and the payment still goes
+    through.
+    """
+    from .tasks import enqueue_paid_order
+
+    with transaction.atomic():
+        completed = Order.objects.filter(pk=order.pk).exclude(
+            payment_status=Order.PAYMENT_STATUS_COMPLETE).update(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        if not completed:
+            return False
+
+        order.payment_status = Order.PAYMENT_STATUS_COMPLETE
+        commit_stock(order)
+        order_completed.send_robust(Order, order=order)
+        transaction.on_commit(lambda: enqueue_paid_order(order.pk))
+    return True
@@ -1,5 +1,8 @@
-from .cart import Cart
+from django.utils.functional import SimpleLazyObject
+
+from .cart import get_cart_count
+
 
 def cart_count(request):
-    cart = Cart(request)
-    return {'cart_count': len(cart)}
+    # Only templates that show the count read the session
+    return {'cart_count': SimpleLazyObject(lambda: get_cart_count(request.session))}
@@ -0,0 +1,58 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+
+COUNT_VERSION_KEY = 'store:product_count:version'
+
+
+def get_count_version():
+    version = cache.get(COUNT_VERSION_KEY)
+    if version is None:
+        cache.add(COUNT_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(COUNT_VERSION_KEY)
+    return version
+
+
+def invalidate_product_counts():
+    try:
+        cache.incr(COUNT_VERSION_KEY)
+    except ValueError:
+        cache.set(COUNT_VERSION_KEY, time.time_ns(), None)
+
+
+def get_count_cache_key(queryset):
+    # The compiled WHERE clause is the normalized form of the filter parameters:
+    # it already folds in the category, vendor, search and price filters
+    sql = str(queryset.order_by().query)
+    digest = hashlib.md5(sql.encode()).hexdigest()
+    return f'store:product_count:{get_count_version()}:{digest}'
+
+
+def is_estimate(count):
+    threshold = settings.PRODUCT_COUNT_ESTIMATE_THRESHOLD
+    return threshold is not None and count > threshold
+
+
+def count_products(queryset):
+    try:
+        key = get_count_cache_key(queryset)
+    except EmptyResultSet:
+        # Filters such as id__in=[] can never match and compile to no SQL
+        return 0
+    count = cache.get(key)
+    if count is None:
+        threshold = settings.PRODUCT_COUNT_ESTIMATE_THRESHOLD
+        if threshold is None:
+            count = queryset.order_by().count()
+        else:
+            count = queryset.order_by()[:threshold + 1].count()
+        cache.set(key, count, settings.PRODUCT_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def format_product_count(count):
+    if is_estimate(count):
+        return f'{settings.PRODUCT_COUNT_ESTIMATE_THRESHOLD:,}+'
+    return count
@@ -0,0 +1,83 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyProductEarnings, Order, OrderItem, VendorEarnings
+
+AMOUNT = DecimalField(max_digits=12, decimal_places=2)
+
+
+def get_earnings(user):
+    earnings = VendorEarnings.objects.filter(user=user).first()
+    return earnings or VendorEarnings(user=user)
+
+
+def get_vendor_order_items(user):
+    return OrderItem.objects.filter(product__user=user).select_related(
+        'product', 'order__customer__user').only(
+        'quantity', 'unit_price', 'product__title', 'order__created_at', 'order__payment_status',
+        'order__customer__user__first_name', 'order__customer__user__last_name'
+    ).annotate(sub_total=F('unit_price') * F('quantity')).order_by('-order__created_at', '-id')
+
+
+def sum_lines(order_items, **group_by):
+    return order_items.values('product_id', vendor_id=F('product__user_id'), **group_by).annotate(
+        items_sold=Sum('quantity'), total=Sum(F('unit_price') * F('quantity'), output_field=AMOUNT)).order_by()
+
+
+def record_earnings(order):
+    """
+    Adds a paid order to its vendors' ledgers. Rows are created and updated in
+    key order, so concurrent orders for the same vendors lock them in the same
+    order and can not deadlock.
+    """
+    rows = sorted(sum_lines(order.orderitems.all()),
+                  key=lambda row: (row['vendor_id'], row['product_id']))
+    if not rows:
+        return
+
+    date = timezone.localdate(order.created_at)
+    vendors = defaultdict(lambda: {'total': 0, 'items_sold': 0})
+    for row in rows:
+        vendors[row['vendor_id']]['total'] += row['total']
+        vendors[row['vendor_id']]['items_sold'] += row['items_sold']
+
+    # Create missing rows first so concurrent orders only ever increment
+    VendorEarnings.objects.bulk_create(
+        [VendorEarnings(user_id=vendor_id) for vendor_id in vendors], ignore_conflicts=True)
+    DailyProductEarnings.objects.bulk_create(
+        [DailyProductEarnings(user_id=row['vendor_id'], product_id=row['product_id'], date=date) for row in rows],
+        ignore_conflicts=True)
+
+    now = timezone.now()
+    for vendor_id, totals in sorted(vendors.items()):
+        VendorEarnings.objects.filter(user_id=vendor_id).update(
+            total=F('total') + totals['total'], items_sold=F('items_sold') + totals['items_sold'],
+            orders=F('orders') + 1, updated_at=now)
+    for row in rows:
+        DailyProductEarnings.objects.filter(user_id=row['vendor_id'], product_id=row['product_id'], date=date).update(
+            total=F('total') + row['total'], items_sold=F('items_sold') + row['items_sold'])
+
+
+def rebuild_earnings():
+    order_items = OrderItem.objects.filter(
+        order__payment_status=Order.PAYMENT_STATUS_COMPLETE)
+
+    vendors = order_items.values(vendor_id=F('product__user_id')).annotate(
+        total=Sum(F('unit_price') * F('quantity'), output_field=AMOUNT),
+        items_sold=Sum('quantity'), orders=Count('order_id', distinct=True)).order_by()
+    days = sum_lines(order_items, date=TruncDate('order__created_at'))
+
+    with transaction.atomic():
+        VendorEarnings.objects.all().delete()
+        DailyProductEarnings.objects.all().delete()
+        VendorEarnings.objects.bulk_create(
+            [VendorEarnings(user_id=row['vendor_id'], total=row['total'], items_sold=row['items_sold'], orders=row['orders'])
+             for row in vendors], batch_size=1000)
+        DailyProductEarnings.objects.bulk_create(
+            [DailyProductEarnings(user_id=row['vendor_id'], product_id=row['product_id'], date=row['date'],
+                                  total=row['total'], items_sold=row['items_sold'])
+             for row in days.iterator()], batch_size=1000)
+    return len(vendors)
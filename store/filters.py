@@ -1,6 +1,6 @@
 import django_filters
 from django_filters.rest_framework import FilterSet
-from .models import Vendor, Product
+from .models import Vendor, Product, ProductCard
 
 
 class ProductViewFilter(FilterSet):
@@ -59,3 +59,24 @@ class ProductFilter(django_filters.FilterSet):
     class Meta:
         model = Product
         fields = ['vendor', 'unit_price', 'status', 'title']
+
+
+class ProductCardViewFilter(FilterSet):
+    class Meta:
+        model = ProductCard
+        fields = {
+            'user_id': ['exact'],
+            'category_id': ['exact'],
+            'unit_price': ['gt', 'lt']
+        }
+
+
+class ProductCardFilter(ProductFilter):
+    vendor = django_filters.MultipleChoiceFilter(
+        field_name='vendor_id', choices=ProductFilter.VENDOR_CHOICES)
+    # Cards only exist for active products
+    status = None
+
+    class Meta:
+        model = ProductCard
+        fields = ['vendor', 'unit_price', 'title']
@@ -0,0 +1,19 @@
+import time
+from django.core.cache import cache
+
+MENU_VERSION_KEY = 'store:menu:version'
+
+
+def get_menu_version():
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        cache.add(MENU_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(MENU_VERSION_KEY)
+    return version
+
+
+def invalidate_menu():
+    try:
+        cache.incr(MENU_VERSION_KEY)
+    except ValueError:
+        cache.set(MENU_VERSION_KEY, time.time_ns(), None)
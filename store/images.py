@@ -0,0 +1,38 @@
+from django.conf import settings
+from PIL import features
+
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+}
+
+
+def get_variant_formats():
+    # AVIF and WebP depend on how Pillow was built, so skip what it can't encode
+    return [format for format in settings.PRODUCT_IMAGE_VARIANT_FORMATS
+            if format not in ('avif', 'webp') or features.check(format)]
+
+
+def get_variant_widths(original_width):
+    widths = [width for width in settings.PRODUCT_IMAGE_VARIANT_WIDTHS
+              if width <= original_width]
+    return widths or [original_width]
+
+
+def build_srcset(variants, format):
+    return ', '.join(f'{variant.file.url} {variant.width}w'
+                     for variant in sorted(variants, key=lambda variant: variant.width)
+                     if variant.format == format)
+
+
+def get_sources(product_image):
+    """Returns a {mime type: srcset} mapping, best format first."""
+    variants = list(product_image.variants.all())
+    sources = {}
+    for format in settings.PRODUCT_IMAGE_VARIANT_FORMATS:
+        srcset = build_srcset(variants, format)
+        if srcset:
+            sources[MIME_TYPES[format]] = srcset
+    return sources
@@ -0,0 +1,122 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Order, Product, StockReservation
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, quantity):
+        self.product_id = product_id
+        self.quantity = quantity
+        super().__init__(
+            f'Product {product_id} does not have {quantity} items in stock')
+
+
+def get_reservation_expiry():
+    return timezone.now() + timedelta(minutes=settings.STOCK_RESERVATION_MINUTES)
+
+
+def take_stock(product_id, quantity):
+    # The conditional update only locks this product's row, so checkouts for
+    # other products never wait on each other
+    return Product.objects.filter(pk=product_id, inventory__gte=quantity).update(
+        inventory=F('inventory') - quantity)
+
+
+def return_stock(product_id, quantity):
+    Product.objects.filter(pk=product_id).update(
+        inventory=F('inventory') + quantity)
+
+
+def reserve_stock(order, lines):
+    """
+    Takes `lines` of (product_id, quantity) out of inventory for the order.
+    Either every line is reserved or InsufficientStock is raised and nothing is.
+    """
+    quantities = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    expires_at = get_reservation_expiry()
+    with transaction.atomic():
+        # Locking rows in id order keeps concurrent multi-line checkouts from deadlocking
+        for product_id in sorted(quantities):
+            if not take_stock(product_id, quantities[product_id]):
+                raise InsufficientStock(product_id, quantities[product_id])
+
+        StockReservation.objects.bulk_create([
+            StockReservation(order=order, product_id=product_id,
+                             quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in quantities.items()])
+    return expires_at
+
+
+def extend_reservations(order):
+    expires_at = get_reservation_expiry()
+    order.reservations.filter(status=StockReservation.RESERVED).update(
+        expires_at=expires_at)
+    return expires_at
+
+
+def commit_stock(order):
+    with transaction.atomic():
+        order.reservations.filter(status=StockReservation.RESERVED).update(
+            status=StockReservation.COMMITTED)
+
+        # Paid after the reservation ran out, so take the stock again if it is still there
+        sold_out = []
+        for reservation in order.reservations.filter(status=StockReservation.RELEASED).order_by('product_id'):
+            if take_stock(reservation.product_id, reservation.quantity):
+                StockReservation.objects.filter(pk=reservation.pk).update(
+                    status=StockReservation.COMMITTED)
+            else:
+                sold_out.append(reservation.product_id)
+
+        if sold_out:
+            Order.objects.filter(pk=order.pk).update(oversold_at=timezone.now())
+            logger.error(
+                f'Order {order.id} was paid but products {sold_out} are out of stock, it needs a refund or manual review')
+
+
+def release_reservation(reservation):
+    with transaction.atomic():
+        released = StockReservation.objects.filter(
+            pk=reservation.pk, status=StockReservation.RESERVED).update(status=StockReservation.RELEASED)
+        if released:
+            return_stock(reservation.product_id, reservation.quantity)
+    return bool(released)
+
+
+def release_order(order):
+    """
+    Gives back the reserved stock of an unpaid order and marks it failed, the
+    same as when its reservations run out. Returns whether it was released.
+    """
+    with transaction.atomic():
+        failed = Order.objects.filter(pk=order.pk, payment_status=Order.PAYMENT_STATUS_PENDING).update(
+            payment_status=Order.PAYMENT_STATUS_FAILED)
+        if failed:
+            for reservation in order.reservations.filter(status=StockReservation.RESERVED).order_by('product_id'):
+                release_reservation(reservation)
+    return bool(failed)
+
+
+def release_expired_reservations():
+    expired = StockReservation.objects.filter(
+        status=StockReservation.RESERVED, expires_at__lt=timezone.now())
+    released = 0
+    order_ids = set()
+    for reservation in expired.iterator():
+        if release_reservation(reservation):
+            released += 1
+            order_ids.add(reservation.order_id)
+
+    Order.objects.filter(pk__in=order_ids, payment_status=Order.PAYMENT_STATUS_PENDING).update(
+        payment_status=Order.PAYMENT_STATUS_FAILED)
+    return released
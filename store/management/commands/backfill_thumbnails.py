@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+
+from store.models import ProductImage
+from store.tasks import enqueue_thumbnail, generate_image_variants, generate_thumbnail
+
+
+def process_image(product_image_id):
+    try:
+        generate_thumbnail(product_image_id)
+        generate_image_variants(product_image_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Generates missing product image thumbnails and variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true',
+                            help='Process images in this process instead of queueing Celery tasks')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of parallel threads used with --sync')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Also retry images previously marked as failed')
+
+    def handle(self, *args, **options):
+        missing = ProductImage.objects.exclude(Q(image='') | Q(image__isnull=True)).filter(
+            Q(thumbnail='') | Q(thumbnail__isnull=True) | ~Q(thumbnail_status=ProductImage.THUMBNAIL_READY))
+        if not options['retry_failed']:
+            missing = missing.exclude(
+                thumbnail_status=ProductImage.THUMBNAIL_FAILED)
+        else:
+            missing.filter(thumbnail_status=ProductImage.THUMBNAIL_FAILED).update(
+                thumbnail_status=ProductImage.THUMBNAIL_PENDING)
+
+        product_image_ids = list(missing.values_list('id', flat=True))
+        self.stdout.write(
+            f'{len(product_image_ids)} product images are missing a thumbnail.')
+
+        if not options['sync']:
+            for product_image_id in product_image_ids:
+                enqueue_thumbnail(product_image_id)
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(product_image_ids)} thumbnails were queued.'))
+            return
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {executor.submit(process_image, product_image_id): product_image_id
+                       for product_image_id in product_image_ids}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(
+                        f'Product image {futures[future]} failed: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(product_image_ids) - failed} thumbnails were generated.'))
@@ -0,0 +1,54 @@
+from importlib import import_module
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+ENGINES = ['django.contrib.sessions.backends.db', 'store.sessions']
+
+
+class Command(BaseCommand):
+    help = 'Compares database queries and time spent on sessions per session engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=100,
+                            help='Number of simulated shoppers')
+        parser.add_argument('--requests', type=int, default=10,
+                            help='Requests per shopper, every third one changes the cart')
+
+    def handle(self, *args, **options):
+        for engine in ENGINES:
+            queries, seconds = self.run_engine(
+                engine, options['sessions'], options['requests'])
+            total = options['sessions'] * options['requests']
+            self.stdout.write(
+                f'{engine}: {queries} queries ({queries / total:.2f} per request), {seconds * 1000 / total:.3f} ms per request')
+
+    def run_engine(self, engine, sessions, requests):
+        SessionStore = import_module(engine).SessionStore
+        session_keys = []
+        for index in range(sessions):
+            session = SessionStore()
+            session['cart'] = {str(index): {'quantity': 1, 'unit_price': '9.99'}}
+            session['cart_count'] = 1
+            session.save()
+            session_keys.append(session.session_key)
+
+        started = perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            for request_index in range(requests):
+                for session_key in session_keys:
+                    # Mirrors SessionMiddleware: load on access, save only when modified
+                    session = SessionStore(session_key)
+                    cart = session.get('cart', {})
+                    if request_index % 3 == 0:
+                        cart[str(request_index)] = {'quantity': 1, 'unit_price': '1.00'}
+                        session['cart'] = cart
+                        session['cart_count'] = len(cart)
+                    if session.modified:
+                        session.save()
+        seconds = perf_counter() - started
+
+        for session_key in session_keys:
+            SessionStore(session_key).delete()
+        return len(captured), seconds
@@ -0,0 +1,62 @@
+import posixpath
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.models import ProductImage, ProductImageVariant
+
+IMAGE_FIELDS = [
+    (ProductImage, 'image'),
+    (ProductImage, 'thumbnail'),
+    (ProductImageVariant, 'file'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Moves stored product images to content addressed names and removes duplicate files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without touching files or rows')
+
+    def handle(self, *args, **options):
+        for model, field_name in IMAGE_FIELDS:
+            moved, removed = self.dedupe_field(
+                model, field_name, options['dry_run'])
+            self.stdout.write(
+                f'{model.__name__}.{field_name}: {moved} files renamed, {removed} duplicates removed.')
+
+    def dedupe_field(self, model, field_name, dry_run):
+        field = model._meta.get_field(field_name)
+        storage = field.storage
+        names = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True}).values_list(
+            field_name, flat=True).distinct().order_by(field_name)
+
+        moved = removed = 0
+        for name in list(names):
+            if not storage.exists(name):
+                self.stderr.write(f'{name} is missing from storage')
+                continue
+
+            upload_name = posixpath.join(
+                field.upload_to, posixpath.basename(name))
+            with storage.open(name, 'rb') as content:
+                new_name = storage.get_content_name(upload_name, content)
+                if new_name == name:
+                    continue
+                duplicate = storage.exists(new_name)
+                if dry_run:
+                    moved += not duplicate
+                    removed += duplicate
+                    continue
+                # Saving locks the new name until the rows point at it
+                with transaction.atomic():
+                    new_name = storage.save(upload_name, content)
+                    model.objects.filter(
+                        **{field_name: name}).update(**{field_name: new_name})
+                    if model is ProductImage and field_name == 'image':
+                        ProductImageVariant.objects.filter(
+                            source=name).update(source=new_name)
+            storage.delete(name)
+            moved += not duplicate
+            removed += duplicate
+        return moved, removed
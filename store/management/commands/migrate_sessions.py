@@ -0,0 +1,31 @@
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from store.sessions import SessionStore, dumps
+
+
+class Command(BaseCommand):
+    help = 'Copies live database sessions into the cache session store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true',
+                            help='Delete each database session once it has been copied')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        decoder = DBSessionStore()
+        copied = 0
+
+        for db_session in Session.objects.filter(expire_date__gt=now).iterator(chunk_size=1000):
+            store = SessionStore(db_session.session_key)
+            timeout = int((db_session.expire_date - now).total_seconds())
+            session_data = decoder.decode(db_session.session_data)
+            store._cache.set(store.cache_key, dumps(session_data), timeout)
+            if options['delete']:
+                db_session.delete()
+            copied += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{copied} sessions were copied to the cache.'))
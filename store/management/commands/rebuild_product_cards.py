@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from store.cards import rebuild_cards
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product listing cards from the catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding product cards...')
+        cards = rebuild_cards(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{cards} product cards were built.'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from store.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding the search index...')
+        indexed = get_search_backend().rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{indexed} products were indexed.'))
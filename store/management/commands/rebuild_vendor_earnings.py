@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from store.earnings import rebuild_earnings
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the vendor earnings ledger from paid orders'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding vendor earnings...')
+        vendors = rebuild_earnings()
+        self.stdout.write(self.style.SUCCESS(
+            f'Earnings were rebuilt for {vendors} vendors.'))
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:09
+
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of the tokenizer and weights in store.search when this index was added,
+# so later changes there do not change what this migration builds
+TOKEN_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+MAX_WEIGHT = 32767
+TITLE_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall((text or '').lower())]
+
+
+def get_terms(product):
+    terms = Counter()
+    for token in tokenize(product.title):
+        terms[token] += TITLE_WEIGHT
+    for token in tokenize(product.description):
+        terms[token] += DESCRIPTION_WEIGHT
+    return terms
+
+
+def build_search_index(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    SearchIndexEntry = apps.get_model('store', 'SearchIndexEntry')
+
+    entries = []
+    for product in Product.objects.only('id', 'title', 'description').iterator(chunk_size=500):
+        entries.extend(SearchIndexEntry(product_id=product.pk, term=term, weight=min(weight, MAX_WEIGHT))
+                       for term, weight in get_terms(product).items())
+        if len(entries) >= 500:
+            SearchIndexEntry.objects.bulk_create(entries, batch_size=500)
+            entries = []
+    SearchIndexEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0023_alter_vendor_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='store.product')),
+            ],
+            options={
+                'verbose_name_plural': 'search index entries',
+                'unique_together': {('term', 'product')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
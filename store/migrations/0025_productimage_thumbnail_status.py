@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:11
+
+from django.db import migrations, models
+
+
+def mark_existing_thumbnails_ready(apps, schema_editor):
+    ProductImage = apps.get_model('store', 'ProductImage')
+    ProductImage.objects.exclude(thumbnail__isnull=True).exclude(
+        thumbnail='').update(thumbnail_status='R')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0024_searchindexentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='thumbnail_status',
+            field=models.CharField(choices=[('P', 'Pending'), ('R', 'Ready'), ('F', 'Failed')], default='P', max_length=1),
+        ),
+        migrations.RunPython(mark_existing_thumbnails_ready,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0025_productimage_thumbnail_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255)),
+                ('file', models.FileField(upload_to='uploads/product_images/variants/')),
+                ('format', models.CharField(max_length=10)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField()),
+                ('product_image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='store.productimage')),
+            ],
+            options={
+                'unique_together': {('product_image', 'format', 'width')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:16
+
+import store.storage
+import store.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0026_productimagevariant'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, max_length=255, null=True, storage=store.storage.get_media_storage, upload_to='uploads/product_images/', validators=[store.validators.validate_file_size]),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, db_index=True, max_length=255, null=True, storage=store.storage.get_media_storage, upload_to='uploads/product_images/thumbnails/'),
+        ),
+        migrations.AlterField(
+            model_name='productimagevariant',
+            name='file',
+            field=models.FileField(db_index=True, max_length=255, storage=store.storage.get_media_storage, upload_to='uploads/product_images/variants/'),
+        ),
+        migrations.AlterField(
+            model_name='productimagevariant',
+            name='source',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:21
+
+from datetime import timedelta
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+def build_popular_products(apps, schema_editor):
+    OrderItem = apps.get_model('store', 'OrderItem')
+    PopularProduct = apps.get_model('store', 'PopularProduct')
+    order_items = OrderItem.objects.filter(order__payment_status='C')
+    window_days = getattr(settings, 'POPULAR_PRODUCTS_WINDOW_DAYS', None)
+    if window_days:
+        order_items = order_items.filter(
+            order__created_at__gte=timezone.now() - timedelta(days=window_days))
+    scores = order_items.values('product_id').annotate(
+        score=Count('id')).order_by()
+    PopularProduct.objects.bulk_create(
+        [PopularProduct(product_id=row['product_id'], score=row['score']) for row in scores], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0027_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularProduct',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='store.product')),
+                ('score', models.PositiveIntegerField(db_index=True, default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_popular_products,
+                             migrations.RunPython.noop),
+    ]
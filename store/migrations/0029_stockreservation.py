@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0028_popularproduct'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(choices=[('R', 'Reserved'), ('C', 'Committed'), ('X', 'Released')], default='R', max_length=1)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='store.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='reservations', to='store.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='store_stock_status_0aac22_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0029_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='confirmation_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def build_vendor_earnings(apps, schema_editor):
+    OrderItem = apps.get_model('store', 'OrderItem')
+    VendorEarnings = apps.get_model('store', 'VendorEarnings')
+    DailyProductEarnings = apps.get_model('store', 'DailyProductEarnings')
+    order_items = OrderItem.objects.filter(order__payment_status='C')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    vendors = order_items.values(vendor_id=F('product__user_id')).annotate(
+        total=Sum(F('unit_price') * F('quantity'), output_field=amount),
+        items_sold=Sum('quantity'), orders=Count('order_id', distinct=True)).order_by()
+    VendorEarnings.objects.bulk_create(
+        [VendorEarnings(user_id=row['vendor_id'], total=row['total'], items_sold=row['items_sold'], orders=row['orders'])
+         for row in vendors], batch_size=1000)
+    days = order_items.values('product_id', vendor_id=F('product__user_id'), date=TruncDate('order__created_at')).annotate(
+        total=Sum(F('unit_price') * F('quantity'), output_field=amount), items_sold=Sum('quantity')).order_by()
+    DailyProductEarnings.objects.bulk_create(
+        [DailyProductEarnings(user_id=row['vendor_id'], product_id=row['product_id'], date=row['date'],
+                              total=row['total'], items_sold=row['items_sold'])
+         for row in days.iterator()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('store', '0031_stripeevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorEarnings',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='earnings', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('items_sold', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyProductEarnings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('items_sold', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_earnings', to='store.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_earnings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'product', 'date')},
+            },
+        ),
+        migrations.RunPython(build_vendor_earnings,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Prefetch
+
+DEFAULT_IMAGE_URL = '/media/uploads/product_images/default-image.jpg'
+
+# A frozen copy of store.images.get_sources when cards were added
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+
+
+def get_sources(image):
+    variants = sorted(image.variants.all(), key=lambda variant: variant.width)
+    sources = {}
+    for format, mime_type in MIME_TYPES.items():
+        srcset = ', '.join(f'{variant.file.url} {variant.width}w' for variant in variants if variant.format == format)
+        if srcset:
+            sources[mime_type] = srcset
+    return sources
+
+
+def build_product_cards(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    ProductCard = apps.get_model('store', 'ProductCard')
+    ProductImage = apps.get_model('store', 'ProductImage')
+    Vendor = apps.get_model('store', 'Vendor')
+    vendors = {vendor.user_id: vendor for vendor in Vendor.objects.all()}
+    products = Product.objects.filter(status=2, deleted=False).select_related('user', 'category').prefetch_related(Prefetch(
+        'productimages', queryset=ProductImage.objects.filter(default=True).order_by('id').prefetch_related('variants')))
+
+    cards = []
+    for product in products.iterator(chunk_size=500):
+        vendor = vendors.get(product.user_id)
+        images = list(product.productimages.all())
+        image = images[0] if images else None
+        thumbnail = ''
+        if image is not None:
+            thumbnail = image.thumbnail.url if image.thumbnail and image.thumbnail_status == 'R' else DEFAULT_IMAGE_URL
+        cards.append(ProductCard(
+            product_id=product.id, title=product.title, unit_price=product.unit_price, user_id=product.user_id,
+            vendor=vendor, vendor_name=vendor.shop_name if vendor else f'{product.user.first_name} {product.user.last_name}'.strip(),
+            category_id=product.category_id, category_title=product.category.title, thumbnail=thumbnail,
+            sources=get_sources(image) if image else {}, last_update=product.last_update))
+        if len(cards) == 500:
+            ProductCard.objects.bulk_create(cards)
+            cards = []
+    ProductCard.objects.bulk_create(cards)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0033_catalog_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='store.product')),
+                ('title', models.CharField(max_length=255)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('vendor_name', models.CharField(blank=True, max_length=255)),
+                ('category_title', models.CharField(max_length=50)),
+                ('thumbnail', models.CharField(blank=True, max_length=255)),
+                ('sources', models.JSONField(default=dict)),
+                ('last_update', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_cards', to='store.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_cards', to=settings.AUTH_USER_MODEL)),
+                ('vendor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='product_cards', to='store.vendor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['unit_price'], name='store_produ_unit_pr_17f19e_idx'), models.Index(fields=['title'], name='store_produ_title_2946e2_idx'), models.Index(fields=['category', 'unit_price'], name='store_produ_categor_dcecb8_idx'), models.Index(fields=['last_update'], name='store_produ_last_up_45e60f_idx')],
+            },
+        ),
+        migrations.RunPython(build_product_cards,
+                             migrations.RunPython.noop),
+    ]
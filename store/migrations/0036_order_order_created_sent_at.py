@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:01
+
+from django.db import migrations, models
+
+
+def mark_confirmed_orders(apps, schema_editor):
+    # Confirmed orders already notified their receivers along with the email
+    Order = apps.get_model('store', 'Order')
+    Order.objects.filter(confirmation_sent_at__isnull=False).update(
+        order_created_sent_at=models.F('confirmation_sent_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0035_storedfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='order_created_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_confirmed_orders,
+                             migrations.RunPython.noop),
+    ]
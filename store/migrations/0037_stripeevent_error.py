@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0036_order_order_created_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stripeevent',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0038_stripeevent_retries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='oversold_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+import os
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
@@ -7,6 +9,7 @@ from io import BytesIO
 from PIL import Image
 from store import permissions
 
+from store.storage import get_media_storage
 from store.validators import validate_file_size
 
 
@@ -21,6 +24,58 @@ class Category(models.Model):
         return self.title
 
 
+class StoredFile(models.Model):
+    """
+    Lock row for a content addressed file, see lock_file.
+    """
+    name = models.CharField(max_length=255, primary_key=True)
+
+
+def lock_file(name):
+    """
+    Locks a stored file name until the current transaction ends. Adding a
+    reference to a shared file and deleting its last reference both hold
+    this lock, so a file can not be deleted while a new row points at it.
+    """
+    if StoredFile.objects.select_for_update().filter(name=name).exists():
+        return
+    try:
+        with transaction.atomic():
+            StoredFile.objects.create(name=name)
+    except IntegrityError:
+        StoredFile.objects.select_for_update().get(name=name)
+
+
+def release_file(model, field_name, field_file):
+    """
+    Deletes a stored file once no row references it any more. Uploads are
+    content addressed, so several rows can point at the same file.
+    """
+    if not field_file or not field_file.name:
+        return
+    with transaction.atomic():
+        lock_file(field_file.name)
+        if not model.objects.filter(**{field_name: field_file.name}).exists():
+            field_file.storage.delete(field_file.name)
+            StoredFile.objects.filter(name=field_file.name).delete()
+
+
+class ProductQuerySet(models.QuerySet):
+    # Columns a listing card shows, which store.cards copies into ProductCard
+    listing_fields = ['title', 'unit_price', 'last_update', 'user', 'user__first_name', 'user__last_name',
+                      'category', 'category__title']
+
+    def visible(self):
+        return self.filter(status=Product.ACTIVE, deleted=False)
+
+    def with_vendor(self):
+        return self.select_related('user').annotate(vendor_shop_name=models.F('user__vendors__shop_name'))
+
+    def for_listing(self):
+        return self.visible().with_vendor().select_related('category').annotate(
+            vendor_id=models.F('user__vendors')).only(*self.listing_fields)
+
+
 class Product(models.Model):
     DRAFT = 0
     WAITING_APPROVAL = 1
@@ -47,22 +102,63 @@ class Product(models.Model):
     status = models.SmallIntegerField(choices=STATUS_CHOICES, default=ACTIVE)
     deleted = models.BooleanField(default=False)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        # Storefront listings filter on status and deleted, then sort by price or title
+        indexes = [
+            models.Index(fields=['status', 'deleted', 'unit_price']),
+            models.Index(fields=['status', 'deleted', 'title']),
+            models.Index(fields=['category', 'status', 'deleted', 'unit_price']),
+            models.Index(fields=['user', 'status', 'deleted']),
+            models.Index(fields=['last_update']),
+        ]
+
     def __str__(self) -> str:
         return self.title
 
 
 class ProductImage(models.Model):
+    DEFAULT_IMAGE_URL = '/media/uploads/product_images/default-image.jpg'
+
+    THUMBNAIL_PENDING = 'P'
+    THUMBNAIL_READY = 'R'
+    THUMBNAIL_FAILED = 'F'
+    THUMBNAIL_STATUS_CHOICES = [
+        (THUMBNAIL_PENDING, 'Pending'),
+        (THUMBNAIL_READY, 'Ready'),
+        (THUMBNAIL_FAILED, 'Failed')
+    ]
+
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name='productimages')
     image = models.ImageField(
-        upload_to='uploads/product_images/', blank=True, null=True, validators=[validate_file_size])
+        upload_to='uploads/product_images/', storage=get_media_storage, max_length=255, db_index=True, blank=True, null=True, validators=[validate_file_size])
     thumbnail = models.ImageField(
-        upload_to='uploads/product_images/thumbnails/', blank=True, null=True)
+        upload_to='uploads/product_images/thumbnails/', storage=get_media_storage, max_length=255, db_index=True, blank=True, null=True)
+    thumbnail_status = models.CharField(
+        max_length=1, choices=THUMBNAIL_STATUS_CHOICES, default=THUMBNAIL_PENDING)
     default = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['product', 'default'])]
+
     def __str__(self):
         return f"{self.image}"
 
+    def save(self, *args, **kwargs):
+        # Holds the storage lock on new files until this row is written
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def release_files(self):
+        release_file(ProductImage, 'image', self.image)
+        release_file(ProductImage, 'thumbnail', self.thumbnail)
+
+    def mark_thumbnail_pending(self):
+        self.thumbnail = None
+        self.thumbnail_status = self.THUMBNAIL_PENDING
+
     def make_thumbnail(self, image, size=(300, 300)):
         img = Image.open(image)
         img = img.convert('RGB')
@@ -79,17 +175,71 @@ class ProductImage(models.Model):
 
         return thumbnail
 
+    def resize_variant(self, img, width):
+        # Very tall images are capped by height, so the result can be narrower than asked for
+        variant = img.copy()
+        variant.thumbnail((width, width * 4))
+        return variant
+
+    def make_variant(self, variant, format):
+        width = variant.width
+        if format == 'jpeg' or variant.mode not in ('RGB', 'RGBA'):
+            variant = variant.convert('RGB')
+
+        variant_io = BytesIO()
+        variant.save(variant_io, format.upper(),
+                     quality=settings.PRODUCT_IMAGE_VARIANT_QUALITY)
+
+        base_name = os.path.splitext(os.path.basename(self.image.name))[0]
+        return File(variant_io, name=f'{base_name}_{width}w.{format}')
+
     def get_thumbnail(self):
-        if self.thumbnail:
+        if self.thumbnail and self.thumbnail_status == self.THUMBNAIL_READY:
             return self.thumbnail.url
         else:
-            if self.image:
-                self.thumbnail = self.make_thumbnail(self.image)
-                self.save()
+            if self.image and self.pk and self.thumbnail_status != self.THUMBNAIL_FAILED:
+                from store.tasks import queue_missing_thumbnail
+                queue_missing_thumbnail(self.pk)
+            return self.DEFAULT_IMAGE_URL
+
+
+class ProductImageVariant(models.Model):
+    product_image = models.ForeignKey(
+        ProductImage, on_delete=models.CASCADE, related_name='variants')
+    source = models.CharField(max_length=255, db_index=True)
+    file = models.FileField(
+        upload_to='uploads/product_images/variants/', storage=get_media_storage, max_length=255, db_index=True)
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = [['product_image', 'format', 'width']]
 
-                return self.thumbnail.url
-            else:
-                return '/media/uploads/product_images/default-image.jpg'
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def release_files(self):
+        release_file(ProductImageVariant, 'file', self.file)
+
+    def __str__(self) -> str:
+        return f'{self.file} ({self.width}x{self.height} {self.format})'
+
+
+class SearchIndexEntry(models.Model):
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='search_entries')
+    term = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = [['term', 'product']]
+        verbose_name_plural = 'search index entries'
+
+    def __str__(self) -> str:
+        return self.term
 
 
 class Review(models.Model):
@@ -155,6 +305,17 @@ class Order(models.Model):
     payment_intent = models.CharField(max_length=255)
     total_price = models.DecimalField(
         max_digits=6, decimal_places=2, validators=[MinValueValidator(1)], blank=True, null=True)
+    confirmation_sent_at = models.DateTimeField(null=True, blank=True)
+    order_created_sent_at = models.DateTimeField(null=True, blank=True)
+    # Set when the order was paid for stock that had sold out; it needs a refund or manual review
+    oversold_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', 'created_at']),
+            models.Index(fields=['payment_status', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
 
     def __str__(self) -> str:
         return f'{self.customer.user.first_name} {self.customer.user.last_name}'
@@ -173,6 +334,73 @@ class OrderItem(models.Model):
         max_digits=6, decimal_places=2, validators=[MinValueValidator(1)])
 
 
+class StockReservation(models.Model):
+    RESERVED = 'R'
+    COMMITTED = 'C'
+    RELEASED = 'X'
+    STATUS_CHOICES = [
+        (RESERVED, 'Reserved'),
+        (COMMITTED, 'Committed'),
+        (RELEASED, 'Released')
+    ]
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(
+        Product, on_delete=models.PROTECT, related_name='reservations')
+    quantity = models.PositiveSmallIntegerField()
+    status = models.CharField(
+        max_length=1, choices=STATUS_CHOICES, default=RESERVED)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'expires_at'])]
+
+
+class StripeEvent(models.Model):
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=255)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return self.event_id
+
+
+class PopularProduct(models.Model):
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='popularity')
+    score = models.PositiveIntegerField(default=0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class VendorEarnings(models.Model):
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='earnings')
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class DailyProductEarnings(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='daily_earnings')
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='daily_earnings')
+    date = models.DateField()
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [['user', 'product', 'date']]
+
+
 class Vendor(models.Model):
     user = models.OneToOneField(
         User, on_delete=models.CASCADE, related_name='vendors')
@@ -180,3 +408,43 @@ class Vendor(models.Model):
 
     def __str__(self) -> str:
         return f'{self.shop_name}'
+
+
+class ProductCard(models.Model):
+    """
+    Flattened copy of what a listing card shows, so listing pages read a
+    single table. Only visible products have a card, and store.cards
+    rebuilds it when the product, its images, its vendor or its category
+    changes.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    title = models.CharField(max_length=255)
+    unit_price = models.DecimalField(max_digits=6, decimal_places=2)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='product_cards')
+    vendor = models.ForeignKey(
+        Vendor, on_delete=models.SET_NULL, null=True, related_name='product_cards')
+    vendor_name = models.CharField(max_length=255, blank=True)
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name='product_cards')
+    category_title = models.CharField(max_length=50)
+    thumbnail = models.CharField(max_length=255, blank=True)
+    sources = models.JSONField(default=dict)
+    last_update = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['unit_price']),
+            models.Index(fields=['title']),
+            models.Index(fields=['category', 'unit_price']),
+            models.Index(fields=['last_update']),
+        ]
+
+    @property
+    def id(self):
+        return self.product_id
+
+    def __str__(self) -> str:
+        return self.title
@@ -0,0 +1,162 @@
+import smtplib
+import threading
+from functools import lru_cache
+from time import monotonic
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import get_connection
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast once `failure_threshold` failures happen within
+    `reset_seconds` with no success in between. After `reset_seconds` a single
+    trial call is let through while the others keep failing fast: its success
+    closes the circuit and its failure opens it again. State lives in the
+    cache so every worker stops calling a struggling service together.
+    """
+
+    def __init__(self, name, failure_threshold, reset_seconds, is_failure):
+        self.failures_key = f'store:circuit:{name}:failures'
+        self.open_key = f'store:circuit:{name}:open'
+        self.tripped_key = f'store:circuit:{name}:tripped'
+        self.trial_key = f'store:circuit:{name}:trial'
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.is_failure = is_failure
+
+    def is_open(self):
+        return cache.get(self.open_key) is not None
+
+    def open(self):
+        cache.set(self.open_key, True, self.reset_seconds)
+        # Outlives the open key, so the circuit stays half open until a trial succeeds
+        cache.set(self.tripped_key, True, None)
+        cache.delete_many([self.failures_key, self.trial_key])
+
+    def allow_call(self):
+        if self.is_open():
+            return False
+        if cache.get(self.tripped_key) is None:
+            return True
+        # A trial that never reports back frees the slot after reset_seconds
+        return cache.add(self.trial_key, True, self.reset_seconds)
+
+    def record_failure(self):
+        if cache.get(self.tripped_key) is not None:
+            self.open()
+            return
+
+        if cache.add(self.failures_key, 1, self.reset_seconds):
+            failures = 1
+        else:
+            try:
+                failures = cache.incr(self.failures_key)
+            except ValueError:
+                failures = 1
+                cache.set(self.failures_key, failures, self.reset_seconds)
+
+        if failures >= self.failure_threshold:
+            self.open()
+
+    def record_success(self):
+        cache.delete_many(
+            [self.failures_key, self.tripped_key, self.trial_key])
+
+    def call(self, func, *args, **kwargs):
+        if not self.allow_call():
+            raise CircuitOpenError(f'{self.open_key} is open')
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as exc:
+            if self.is_failure(exc):
+                self.record_failure()
+            else:
+                # The service answered, it just refused this request
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+
+def is_stripe_outage(exc):
+    return isinstance(exc, stripe.APIConnectionError) or (
+        isinstance(exc, stripe.APIError) and (exc.http_status or 500) >= 500)
+
+
+stripe_breaker = CircuitBreaker(
+    'stripe', settings.STRIPE_CIRCUIT_FAILURE_THRESHOLD, settings.STRIPE_CIRCUIT_RESET_SECONDS, is_stripe_outage)
+
+
+@lru_cache
+def get_stripe_client():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1, pool_maxsize=settings.STRIPE_POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    http_client = stripe.RequestsClient(
+        timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT), session=session)
+    base_addresses = {'api': settings.STRIPE_API_BASE} if settings.STRIPE_API_BASE else None
+    return stripe.StripeClient(settings.STRIPE_SECRET_KEY, http_client=http_client, base_addresses=base_addresses,
+                               max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES)
+
+
+def create_checkout_session(**params):
+    return stripe_breaker.call(get_stripe_client().v1.checkout.sessions.create, params=params)
+
+
+class MailSender:
+    """
+    Keeps one SMTP connection per worker process open and reuses it for
+    transactional mail. A connection the server already dropped is replaced
+    once before the error is raised.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connection = None
+        self.opened_at = None
+
+    def get_connection(self):
+        if self.connection is not None and monotonic() - self.opened_at > settings.EMAIL_CONNECTION_MAX_AGE:
+            self.close()
+        if self.connection is None:
+            self.connection = get_connection(timeout=settings.EMAIL_TIMEOUT)
+            self.connection.open()
+            self.opened_at = monotonic()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self.connection = None
+
+    def send(self, message, to):
+        with self.lock:
+            for attempt in range(2):
+                message.connection = self.get_connection()
+                try:
+                    return message.send(to)
+                except smtplib.SMTPServerDisconnected:
+                    self.close()
+                    if attempt:
+                        raise
+                except (smtplib.SMTPException, OSError):
+                    self.close()
+                    raise
+
+
+mail_sender = MailSender()
@@ -1,5 +1,115 @@
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Q
 from rest_framework.pagination import PageNumberPagination
 
 
 class DefaultPagination(PageNumberPagination):
     page_size = 10
+
+
+class CountedPaginator(Paginator):
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class KeysetPage:
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Seeks from the last row of the current page instead of using OFFSET, so
+    every page costs the same regardless of how deep the shopper has paged.
+    Rows are ordered by the sort field with the primary key as tie-breaker.
+    """
+    cursor_salt = 'store.pagination.cursor'
+
+    def __init__(self, object_list, per_page, ordering=None):
+        ordering = ordering or 'pk'
+        self.object_list = object_list
+        self.per_page = per_page
+        self.field = ordering.lstrip('-')
+        self.descending = ordering.startswith('-')
+
+    def encode_cursor(self, obj, direction):
+        value = getattr(obj, self.field)
+        position = {'v': str(value), 'id': obj.pk, 'd': direction}
+        return signing.dumps(position, salt=self.cursor_salt, compress=True)
+
+    def decode_cursor(self, cursor):
+        try:
+            position = signing.loads(cursor, salt=self.cursor_salt)
+        except signing.BadSignature:
+            return None
+
+        if not isinstance(position, dict) or position.get('d') not in ('n', 'p'):
+            return None
+        return position
+
+    def get_ordering(self, backwards=False):
+        descending = self.descending != backwards
+        prefix = '-' if descending else ''
+        if self.field in ('id', 'pk'):
+            return [f'{prefix}pk']
+        return [f'{prefix}{self.field}', f'{prefix}pk']
+
+    def get_seek_filter(self, position, backwards=False):
+        lookup = 'lt' if self.descending != backwards else 'gt'
+        if self.field in ('id', 'pk'):
+            return Q(**{f'pk__{lookup}': position['id']})
+
+        return (Q(**{f'{self.field}__{lookup}': position['v']}) |
+                Q(**{self.field: position['v'], f'pk__{lookup}': position['id']}))
+
+    def get_page(self, cursor=None):
+        position = self.decode_cursor(cursor) if cursor else None
+        backwards = position is not None and position['d'] == 'p'
+
+        queryset = self.object_list.order_by(*self.get_ordering(backwards))
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_seek_filter(position, backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        next_cursor = None
+        previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1], 'n')
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], 'p')
+
+        return KeysetPage(rows, next_cursor, previous_cursor)
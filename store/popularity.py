@@ -0,0 +1,45 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Order, OrderItem, PopularProduct, Product
+
+
+def get_popular_product_ids(limit=16):
+    # Scores outlive drafted and deleted products, so they are skipped before the limit
+    return list(PopularProduct.objects.filter(
+        score__gt=0, product__status=Product.ACTIVE, product__deleted=False).order_by(
+        '-score', 'product_id').values_list('product_id', flat=True)[:limit])
+
+
+def record_order(order):
+    product_ids = set(order.orderitems.values_list('product_id', flat=True))
+    if not product_ids:
+        return
+
+    # Create missing rows first so concurrent orders only ever increment
+    PopularProduct.objects.bulk_create(
+        [PopularProduct(product_id=product_id) for product_id in product_ids], ignore_conflicts=True)
+    PopularProduct.objects.filter(product_id__in=product_ids).update(
+        score=F('score') + 1, updated_at=timezone.now())
+
+
+def rebuild_popular_products():
+    order_items = OrderItem.objects.filter(
+        order__payment_status=Order.PAYMENT_STATUS_COMPLETE)
+    window_days = settings.POPULAR_PRODUCTS_WINDOW_DAYS
+    if window_days:
+        order_items = order_items.filter(
+            order__created_at__gte=timezone.now() - timedelta(days=window_days))
+
+    scores = order_items.values('product_id').annotate(
+        score=Count('id')).order_by()
+    rows = [PopularProduct(product_id=row['product_id'], score=row['score'])
+            for row in scores]
+
+    with transaction.atomic():
+        PopularProduct.objects.all().delete()
+        PopularProduct.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,24 @@
+import json
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class StreamingJSONRenderer:
+    """
+    Renders an iterable of serializable objects as one JSON array, an object
+    at a time. Memory is bounded by what the iterable holds at once, which for
+    the order export is ORDER_EXPORT_CHUNK_SIZE orders and their prefetches.
+    """
+    media_type = 'application/json'
+    charset = 'utf-8'
+
+    def render(self, objects):
+        yield b'['
+        separator = b''
+        for data in objects:
+            yield separator + json.dumps(data, cls=JSONEncoder, separators=(',', ':')).encode(self.charset)
+            separator = b','
+        yield b']'
+
+    @property
+    def content_type(self):
+        return f'{self.media_type}; charset={self.charset}'
@@ -0,0 +1,109 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils.module_loading import import_string
+
+from .models import Product, SearchIndexEntry
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+MAX_WEIGHT = 32767
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall((text or '').lower())]
+
+
+class DatabaseSearchBackend:
+    """
+    Substring match on title and description. Needs no index but scans every
+    row, so it is only meant as a fallback.
+    """
+
+    def search(self, queryset, query):
+        matches = Product.objects.filter(
+            Q(title__icontains=query) | Q(description__icontains=query)).values('id')
+        return queryset.filter(pk__in=matches).annotate(relevance=Value(0))
+
+    def index_product(self, product):
+        pass
+
+    def remove_product(self, product_id):
+        pass
+
+    def rebuild(self, batch_size=500):
+        return 0
+
+
+class InvertedIndexSearchBackend:
+    """
+    Token index over product titles and descriptions stored in
+    SearchIndexEntry. Every query token is matched as a prefix of an indexed
+    term, and results are ranked by the summed weight of the matching terms.
+    """
+    title_weight = 3
+    description_weight = 1
+    exact_match_boost = 2
+
+    def get_terms(self, product):
+        terms = Counter()
+        for token in tokenize(product.title):
+            terms[token] += self.title_weight
+        for token in tokenize(product.description):
+            terms[token] += self.description_weight
+        return terms
+
+    def build_entries(self, product):
+        return [SearchIndexEntry(product_id=product.pk, term=term, weight=min(weight, MAX_WEIGHT))
+                for term, weight in self.get_terms(product).items()]
+
+    def index_product(self, product):
+        with transaction.atomic():
+            SearchIndexEntry.objects.filter(product_id=product.pk).delete()
+            SearchIndexEntry.objects.bulk_create(self.build_entries(product))
+
+    def remove_product(self, product_id):
+        SearchIndexEntry.objects.filter(product_id=product_id).delete()
+
+    def rebuild(self, batch_size=500):
+        indexed = 0
+        entries = []
+        with transaction.atomic():
+            SearchIndexEntry.objects.all().delete()
+            products = Product.objects.only(
+                'id', 'title', 'description').iterator(chunk_size=batch_size)
+            for product in products:
+                entries.extend(self.build_entries(product))
+                indexed += 1
+                if len(entries) >= batch_size:
+                    SearchIndexEntry.objects.bulk_create(
+                        entries, batch_size=batch_size)
+                    entries = []
+            SearchIndexEntry.objects.bulk_create(
+                entries, batch_size=batch_size)
+        return indexed
+
+    def search(self, queryset, query):
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return queryset.annotate(relevance=Value(0))
+
+        matches = Q()
+        for token in tokens:
+            queryset = queryset.filter(pk__in=SearchIndexEntry.objects.filter(
+                term__startswith=token).values('product_id'))
+            matches |= Q(term__startswith=token)
+
+        scores = SearchIndexEntry.objects.filter(matches, product=OuterRef('pk')).values('product').annotate(
+            score=Sum(Case(When(term__in=tokens, then=F('weight') * self.exact_match_boost), default=F('weight'), output_field=IntegerField()))).values('score')
+
+        return queryset.annotate(relevance=Coalesce(Subquery(scores), Value(0), output_field=IntegerField()))
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    return import_string(settings.SEARCH_BACKEND)()
@@ -1,6 +1,7 @@
 from decimal import ROUND_DOWN, Decimal
 from rest_framework import serializers
-from .models import Order, OrderItem, Product, Category, ProductImage, Review, Customer, Vendor
+from .images import get_sources
+from .models import Order, OrderItem, Product, ProductCard, Category, ProductImage, Review, Customer, Vendor
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -21,14 +22,18 @@ class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
         fields = ['id', 'product', 'image',
-                  'thumbnail', 'default', 'get_thumbnail']
+                  'thumbnail', 'default', 'get_thumbnail', 'srcset']
 
     get_thumbnail = serializers.SerializerMethodField(
         method_name='show_get_thumbnail')
+    srcset = serializers.SerializerMethodField(method_name='get_srcset')
 
     def show_get_thumbnail(self, productimage: ProductImage):
         return productimage.get_thumbnail()
 
+    def get_srcset(self, productimage: ProductImage):
+        return get_sources(productimage)
+
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
@@ -71,6 +76,15 @@ class CustomerSerializer(serializers.ModelSerializer):
                   'email', 'birth_date', 'phone']
 
 
+class ProductCardSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductCard
+        fields = ['id', 'title', 'unit_price', 'user', 'vendor', 'vendor_name', 'category',
+                  'category_title', 'thumbnail', 'sources', 'last_update']
+
+    id = serializers.IntegerField(source='product_id', read_only=True)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
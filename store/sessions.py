@@ -0,0 +1,71 @@
+import json
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError, UpdateError
+from django.contrib.sessions.backends.cache import SessionStore as CacheSessionStore
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+
+KEY_PREFIX = 'store.sessions.'
+
+
+def dumps(session_data):
+    return json.dumps(session_data, separators=(',', ':'), sort_keys=True)
+
+
+class SessionStore(CacheSessionStore):
+    """
+    Cache backed sessions for the cart and checkout state, so requests no
+    longer read and write the catalog database. Sessions are stored as compact
+    JSON and expire after SESSION_COOKIE_AGE. Saving a session whose contents
+    did not change only refreshes its expiry. With SESSION_MIGRATE_FROM_DB a
+    session missing from the cache is moved over from the database backend the
+    first time it is used.
+    """
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._stored_payload = None
+
+    def load(self):
+        try:
+            payload = self._cache.get(self.cache_key)
+        except Exception:
+            payload = None
+
+        if payload is None and settings.SESSION_MIGRATE_FROM_DB:
+            payload = self.migrate_from_db()
+
+        if payload is None:
+            self._session_key = None
+            return {}
+
+        self._stored_payload = payload
+        return json.loads(payload)
+
+    def migrate_from_db(self):
+        db_session = DBSessionStore(self.session_key)
+        session_data = db_session.load()
+        if db_session.session_key is None:
+            return None
+
+        payload = dumps(session_data)
+        self._cache.set(self.cache_key, payload, db_session.get_expiry_age())
+        db_session.delete()
+        return payload
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+
+        payload = dumps(self._get_session(no_load=must_create))
+        if must_create:
+            if not self._cache.add(self.cache_key, payload, self.get_expiry_age()):
+                raise CreateError
+        elif payload == self._stored_payload:
+            self._cache.touch(self.cache_key, self.get_expiry_age())
+            return
+        else:
+            if self._stored_payload is None and self._cache.get(self.cache_key) is None:
+                raise UpdateError
+            self._cache.set(self.cache_key, payload, self.get_expiry_age())
+        self._stored_payload = payload
@@ -1,11 +1,124 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
 
-from ..models import Customer
+from . import order_completed, order_created
+
+from ..cards import refresh_cards
+from ..counts import invalidate_product_counts
+from ..earnings import record_earnings
+from ..fragments import invalidate_menu
+from ..models import Category, Customer, Product, ProductImage, ProductImageVariant, Vendor
+from ..popularity import record_order
+from ..search import get_search_backend
+from ..suggestions import suggestion_index
+from ..tasks import schedule_card_refresh
 
 
 @receiver(post_save, sender=User)
 def create_customer_for_new_user(sender, **kwargs):
     if kwargs['created']:
         Customer.objects.create(user=kwargs['instance'])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_counts_for_product(sender, **kwargs):
+    # A count read before the commit would otherwise be cached under the new version
+    transaction.on_commit(invalidate_product_counts)
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, **kwargs):
+    get_search_backend().index_product(kwargs['instance'])
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search(sender, **kwargs):
+    get_search_backend().remove_product(kwargs['instance'].pk)
+
+
+@receiver(post_save, sender=Product)
+def update_product_suggestion(sender, **kwargs):
+    # Every worker replays published changes, so they wait until the write commits
+    product = kwargs['instance']
+    transaction.on_commit(lambda: suggestion_index.update_product(product))
+
+
+@receiver(post_save, sender=Category)
+def update_category_suggestion(sender, **kwargs):
+    category = kwargs['instance']
+    transaction.on_commit(lambda: suggestion_index.update_category(category))
+
+
+@receiver(post_save, sender=Vendor)
+def update_vendor_suggestion(sender, **kwargs):
+    vendor = kwargs['instance']
+    transaction.on_commit(lambda: suggestion_index.update_vendor(vendor))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Vendor)
+def remove_suggestion(sender, **kwargs):
+    type, id = sender._meta.model_name, kwargs['instance'].pk
+    transaction.on_commit(lambda: suggestion_index.remove(type, id))
+
+
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=ProductImageVariant)
+def release_image_files(sender, **kwargs):
+    transaction.on_commit(kwargs['instance'].release_files)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_menu(sender, **kwargs):
+    invalidate_menu()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+def refresh_card(sender, **kwargs):
+    instance = kwargs['instance']
+    refresh_cards([instance.product_id if sender is ProductImage else instance.pk])
+
+
+@receiver(post_delete, sender=ProductImage)
+def refresh_card_for_deleted_image(sender, **kwargs):
+    # The product may be deleted along with its images, so wait until it is gone
+    product_id = kwargs['instance'].product_id
+    transaction.on_commit(lambda: refresh_cards([product_id]))
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_cards(sender, **kwargs):
+    if not kwargs['created']:
+        schedule_card_refresh(category_id=kwargs['instance'].pk)
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+def refresh_vendor_cards(sender, **kwargs):
+    schedule_card_refresh(user_id=kwargs['instance'].user_id)
+
+
+@receiver(post_save, sender=User)
+def refresh_user_cards(sender, **kwargs):
+    # Logins only change last_login, which cards do not show
+    update_fields = kwargs['update_fields']
+    if kwargs['created'] or (update_fields and set(update_fields) == {'last_login'}):
+        return
+    schedule_card_refresh(user_id=kwargs['instance'].pk)
+
+
+@receiver(order_created)
+def record_order_popularity(sender, **kwargs):
+    record_order(kwargs['order'])
+
+
+@receiver(order_completed)
+def record_vendor_earnings(sender, **kwargs):
+    with transaction.atomic():
+        record_earnings(kwargs['order'])
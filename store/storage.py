@@ -0,0 +1,49 @@
+import hashlib
+import posixpath
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores files under the SHA-256 of their bytes, so identical uploads share
+    one file on disk. Saving content that is already stored writes nothing and
+    returns the existing name. Saving locks the name with lock_file, so callers
+    that write the referencing row in the same transaction can not lose the
+    file to a concurrent release_file.
+    """
+
+    def get_content_hash(self, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return digest.hexdigest()
+
+    def get_content_name(self, name, content):
+        digest = self.get_content_hash(content)
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.get_content_name(name, content)
+        from .models import lock_file
+        with transaction.atomic():
+            lock_file(name)
+            if self.exists(name):
+                return name
+            return super().save(name, content, max_length=max_length)
+
+
+def get_media_storage():
+    return ContentAddressedStorage()
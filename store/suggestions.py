@@ -0,0 +1,237 @@
+import heapq
+import threading
+import time
+from collections import namedtuple
+from django.core.cache import cache
+from django.urls import reverse
+
+from .models import Category, Product, Vendor
+
+SUGGESTION_VERSION_KEY = 'store:suggestions:version'
+SUGGESTION_CHANGE_KEY = 'store:suggestions:change:{}'
+# Workers further behind than this rebuild instead of replaying the log
+MAX_REPLAY = 500
+CHANGE_TIMEOUT = 60 * 60
+MAX_KEY_LENGTH = 32
+TOP_K = 20
+
+Suggestion = namedtuple('Suggestion', ['type', 'id', 'label', 'url', 'weight'])
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def suggestion_keys(label):
+    # Every word starts a key so "apple" also finds "Red apple pie"
+    words = normalize(label).split(' ')
+    return {' '.join(words[index:])[:MAX_KEY_LENGTH] for index in range(len(words)) if words[index]}
+
+
+def sort_key(suggestion):
+    return (-suggestion.weight, suggestion.label.lower(), suggestion.type, suggestion.id)
+
+
+class TrieNode:
+    __slots__ = ('children', 'suggestions', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.suggestions = set()
+        self.top = None
+
+
+class PrefixTrie:
+    """
+    Character trie where each node lazily caches the best TOP_K suggestions of
+    its subtree. Inserting or removing a key only clears the cache along that
+    key's path, so incremental updates stay cheap.
+    """
+
+    def __init__(self, limit=TOP_K):
+        self.root = TrieNode()
+        self.limit = limit
+
+    def insert(self, key, suggestion):
+        node = self.root
+        node.top = None
+        for char in key:
+            node = node.children.setdefault(char, TrieNode())
+            node.top = None
+        node.suggestions.add(suggestion)
+
+    def remove(self, key, suggestion):
+        path = [self.root]
+        for char in key:
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+
+        path[-1].suggestions.discard(suggestion)
+        for node in path:
+            node.top = None
+
+        for index in range(len(key), 0, -1):
+            node = path[index]
+            if node.children or node.suggestions:
+                break
+            del path[index - 1].children[key[index - 1]]
+
+    def get_top(self, node):
+        if node.top is None:
+            candidates = set(node.suggestions)
+            for child in node.children.values():
+                candidates.update(self.get_top(child))
+            node.top = heapq.nsmallest(self.limit, candidates, key=sort_key)
+        return node.top
+
+    def search(self, prefix, limit):
+        node = self.root
+        for char in prefix[:MAX_KEY_LENGTH]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        suggestions = self.get_top(node)
+        if len(prefix) > MAX_KEY_LENGTH:
+            suggestions = [suggestion for suggestion in suggestions
+                           if prefix in normalize(suggestion.label)]
+        return suggestions[:limit]
+
+
+class SuggestionIndex:
+    """
+    Per-process suggestion trie built from active products, categories and
+    vendor shops. Change signals publish each change to a log in the cache
+    under the next shared version. Other workers replay the changes they
+    missed on their next lookup, and rebuild from the database only when the
+    log no longer covers the gap.
+    """
+    weights = {'category': 3, 'vendor': 2, 'product': 1}
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.trie = None
+        self.version = None
+        self.suggestions = {}
+
+    def make_suggestion(self, type, id, label, url):
+        return Suggestion(type, id, label, url, self.weights[type])
+
+    def product_suggestion(self, product):
+        return self.make_suggestion('product', product.pk, product.title, reverse('product_detail', args=[product.pk]))
+
+    def category_suggestion(self, category):
+        return self.make_suggestion('category', category.pk, category.title, reverse('category_detail', args=[category.pk]))
+
+    def vendor_suggestion(self, vendor):
+        return self.make_suggestion('vendor', vendor.pk, vendor.shop_name, reverse('vendor_detail', args=[vendor.user_id]))
+
+    def load_suggestions(self):
+        products = Product.objects.filter(
+            status=Product.ACTIVE, deleted=False).only('id', 'title')
+        yield from (self.product_suggestion(product) for product in products.iterator())
+        yield from (self.category_suggestion(category) for category in Category.objects.only('id', 'title'))
+        yield from (self.vendor_suggestion(vendor) for vendor in Vendor.objects.only('id', 'shop_name', 'user_id'))
+
+    def add(self, suggestion):
+        self.discard(suggestion.type, suggestion.id)
+        for key in suggestion_keys(suggestion.label):
+            self.trie.insert(key, suggestion)
+        self.suggestions[(suggestion.type, suggestion.id)] = suggestion
+
+    def discard(self, type, id):
+        suggestion = self.suggestions.pop((type, id), None)
+        if suggestion is not None:
+            for key in suggestion_keys(suggestion.label):
+                self.trie.remove(key, suggestion)
+
+    def apply_change(self, change):
+        action, value = change
+        if action == 'add':
+            self.add(value)
+        else:
+            self.discard(*value)
+
+    def rebuild(self, version):
+        with self.lock:
+            self.trie = PrefixTrie()
+            self.suggestions = {}
+            for suggestion in self.load_suggestions():
+                self.add(suggestion)
+            self.version = version
+
+    def replay(self, version):
+        if not self.version < version <= self.version + MAX_REPLAY:
+            return False
+        keys = [SUGGESTION_CHANGE_KEY.format(missed)
+                for missed in range(self.version + 1, version + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return False
+        for key in keys:
+            self.apply_change(changes[key])
+        self.version = version
+        return True
+
+    def ensure_current(self):
+        version = get_suggestion_version()
+        if self.trie is None or (version != self.version and not self.replay(version)):
+            self.rebuild(version)
+
+    def suggest(self, prefix, limit=8):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        with self.lock:
+            self.ensure_current()
+            return self.trie.search(prefix, limit)
+
+    def publish(self, change):
+        with self.lock:
+            version = publish_suggestion_change(change)
+            if self.trie is not None and not self.replay(version):
+                self.trie = None
+
+    def update_product(self, product):
+        if product.status == Product.ACTIVE and not product.deleted:
+            self.publish(('add', self.product_suggestion(product)))
+        else:
+            self.remove('product', product.pk)
+
+    def update_category(self, category):
+        self.publish(('add', self.category_suggestion(category)))
+
+    def update_vendor(self, vendor):
+        self.publish(('add', self.vendor_suggestion(vendor)))
+
+    def remove(self, type, id):
+        self.publish(('discard', (type, id)))
+
+
+def get_suggestion_version():
+    version = cache.get(SUGGESTION_VERSION_KEY)
+    if version is None:
+        cache.add(SUGGESTION_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(SUGGESTION_VERSION_KEY)
+    return version
+
+
+def bump_suggestion_version():
+    try:
+        return cache.incr(SUGGESTION_VERSION_KEY)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(SUGGESTION_VERSION_KEY, version, None)
+        return version
+
+
+def publish_suggestion_change(change):
+    version = bump_suggestion_version()
+    cache.set(SUGGESTION_CHANGE_KEY.format(version), change, CHANGE_TIMEOUT)
+    return version
+
+
+suggestion_index = SuggestionIndex()
@@ -1,5 +1,29 @@
+import logging
+from datetime import timedelta
 from time import sleep
-from celery import shared_task
+from celery import chain, shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import BadHeaderError
+from django.db import transaction
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+from PIL import Image, UnidentifiedImageError
+from templated_mail.mail import BaseEmailMessage
+
+from .cards import refresh_cards, refresh_cards_for
+from .images import get_variant_formats, get_variant_widths
+from .inventory import release_expired_reservations as release_expired
+from .models import Order, ProductImage, ProductImageVariant, lock_file
+from .outbound import mail_sender
+from .popularity import rebuild_popular_products as rebuild_popularity
+from .signals import order_created
+from .webhooks import process_events
+
+logger = logging.getLogger(__name__)
+
+CONFIRMATION_SENDING_KEY = 'store:confirmation:sending:{}'
+CONFIRMATION_SENDING_TIMEOUT = 600
 
 
 @shared_task
@@ -8,3 +32,227 @@ def notify_customers(message):
     print(message)
     sleep(10)
     print('Emails were successfully sent!')
+
+
+def enqueue_thumbnail(product_image_id):
+    pipeline = chain(generate_thumbnail.si(product_image_id),
+                     generate_image_variants.si(product_image_id))
+    try:
+        pipeline.delay()
+    except OperationalError:
+        logger.error(
+            f'Thumbnail for product image {product_image_id} could not be queued')
+
+
+def schedule_thumbnail(product_image_id):
+    transaction.on_commit(lambda: enqueue_thumbnail(product_image_id))
+
+
+def queue_missing_thumbnail(product_image_id):
+    # Every page showing the image asks for it, so only the first one queues it
+    key = f'store:thumbnail:queued:{product_image_id}'
+    if cache.add(key, True, settings.THUMBNAIL_QUEUE_DEDUP_SECONDS):
+        schedule_thumbnail(product_image_id)
+
+
+@shared_task(bind=True, max_retries=3)
+def generate_thumbnail(self, product_image_id):
+    product_image = ProductImage.objects.filter(pk=product_image_id).first()
+    if product_image is None:
+        return
+
+    if product_image.thumbnail and product_image.thumbnail_status == ProductImage.THUMBNAIL_READY:
+        return
+
+    if not product_image.image:
+        ProductImage.objects.filter(pk=product_image_id).update(
+            thumbnail_status=ProductImage.THUMBNAIL_FAILED)
+        return
+
+    # Identical uploads share one stored image, so reuse a finished thumbnail
+    shared_thumbnail = ProductImage.objects.filter(
+        image=product_image.image.name, thumbnail_status=ProductImage.THUMBNAIL_READY
+    ).exclude(thumbnail='').exclude(thumbnail__isnull=True).values_list('thumbnail', flat=True).first()
+    if shared_thumbnail:
+        with transaction.atomic():
+            # The other rows may have released the file since the query above
+            lock_file(shared_thumbnail)
+            reused = product_image.thumbnail.storage.exists(shared_thumbnail)
+            if reused:
+                ProductImage.objects.filter(pk=product_image_id, image=product_image.image.name).update(
+                    thumbnail=shared_thumbnail, thumbnail_status=ProductImage.THUMBNAIL_READY)
+        if reused:
+            refresh_cards([product_image.product_id])
+            return
+
+    try:
+        thumbnail = product_image.make_thumbnail(product_image.image)
+    except UnidentifiedImageError:
+        logger.warning(f'Image {product_image.image.name} can not be read')
+        ProductImage.objects.filter(pk=product_image_id).update(
+            thumbnail_status=ProductImage.THUMBNAIL_FAILED)
+        return
+    except OSError as exc:
+        if self.request.retries >= self.max_retries:
+            ProductImage.objects.filter(pk=product_image_id).update(
+                thumbnail_status=ProductImage.THUMBNAIL_FAILED)
+            raise
+        raise self.retry(exc=exc, countdown=2 ** self.request.retries)
+
+    with transaction.atomic():
+        product_image.thumbnail.save(thumbnail.name, thumbnail, save=False)
+        ProductImage.objects.filter(pk=product_image_id, image=product_image.image.name).update(
+            thumbnail=product_image.thumbnail.name, thumbnail_status=ProductImage.THUMBNAIL_READY)
+    refresh_cards([product_image.product_id])
+
+
+@shared_task(bind=True, max_retries=3)
+def generate_image_variants(self, product_image_id):
+    product_image = ProductImage.objects.filter(pk=product_image_id).first()
+    if product_image is None or not product_image.image:
+        return
+
+    source = product_image.image.name
+    product_image.variants.exclude(source=source).delete()
+
+    existing = set(product_image.variants.values_list('format', 'width'))
+    shared_variants = ProductImageVariant.objects.filter(source=source).exclude(
+        product_image=product_image).order_by('id')
+    for shared_variant in shared_variants:
+        if (shared_variant.format, shared_variant.width) in existing:
+            continue
+        with transaction.atomic():
+            lock_file(shared_variant.file.name)
+            if not shared_variant.file.storage.exists(shared_variant.file.name):
+                continue
+            ProductImageVariant.objects.create(
+                product_image=product_image, source=source, file=shared_variant.file.name, format=shared_variant.format,
+                width=shared_variant.width, height=shared_variant.height, size=shared_variant.size)
+        existing.add((shared_variant.format, shared_variant.width))
+
+    try:
+        with product_image.image.open('rb') as image_file:
+            img = Image.open(image_file)
+            img.load()
+    except UnidentifiedImageError:
+        logger.warning(f'Image {source} can not be read')
+        return
+    except OSError as exc:
+        raise self.retry(exc=exc, countdown=2 ** self.request.retries)
+
+    for width in get_variant_widths(img.width):
+        resized = product_image.resize_variant(img, width)
+        for format in get_variant_formats():
+            # Variants are stored under the width they came out at, which srcset describes
+            if (format, resized.width) in existing:
+                continue
+            variant_file = product_image.make_variant(resized, format)
+            variant = ProductImageVariant(product_image=product_image, source=source, format=format,
+                                          width=resized.width, height=resized.height, size=variant_file.size)
+            with transaction.atomic():
+                variant.file.save(variant_file.name, variant_file, save=False)
+                variant.save()
+            existing.add((format, resized.width))
+
+    refresh_cards([product_image.product_id])
+
+
+@shared_task
+def rebuild_popular_products():
+    return rebuild_popularity()
+
+
+@shared_task
+def release_expired_reservations():
+    return release_expired()
+
+
+def enqueue_paid_order(order_id):
+    try:
+        process_paid_order.delay(order_id)
+    except OperationalError:
+        logger.error(f'Confirmation for order {order_id} could not be queued')
+
+
+@shared_task(bind=True, max_retries=5)
+def process_paid_order(self, order_id):
+    order = Order.objects.select_related('customer__user').filter(
+        pk=order_id, payment_status=Order.PAYMENT_STATUS_COMPLETE).first()
+    if order is None:
+        return
+
+    # The receivers keep their own marker so a failing mail server can not hold them back
+    if Order.objects.filter(pk=order_id, order_created_sent_at__isnull=True).update(order_created_sent_at=timezone.now()):
+        order_created.send_robust(Order, order=order)
+    if order.confirmation_sent_at is not None:
+        return
+
+    # The sweep may queue an order whose own task is still running, so only one of them sends
+    sending_key = CONFIRMATION_SENDING_KEY.format(order_id)
+    if not cache.add(sending_key, True, CONFIRMATION_SENDING_TIMEOUT):
+        return
+
+    items = [{'title': order_item.product.title, 'quantity': order_item.quantity, 'unit_price': order_item.unit_price}
+             for order_item in order.orderitems.select_related('product')]
+    try:
+        message = BaseEmailMessage(
+            template_name='emails/checkout_email.html',
+            context={'customer': order.customer,
+                     'cart': items, 'total_cost': order.total_price}
+        )
+        mail_sender.send(message, [order.customer.user.email])
+    except BadHeaderError:
+        # Left unconfirmed so the order does not read as sent
+        logger.error(f'Confirmation for order {order_id} has an invalid header')
+    except OSError as exc:
+        raise self.retry(exc=exc, countdown=2 ** self.request.retries * 30)
+    else:
+        Order.objects.filter(pk=order_id, confirmation_sent_at__isnull=True).update(
+            confirmation_sent_at=timezone.now())
+    finally:
+        cache.delete(sending_key)
+
+
+@shared_task
+def send_missing_confirmations():
+    # Picks up paid orders whose confirmation failed or could not be queued
+    since = timezone.now() - timedelta(days=settings.ORDER_CONFIRMATION_SWEEP_DAYS)
+    order_ids = list(Order.objects.filter(
+        payment_status=Order.PAYMENT_STATUS_COMPLETE, confirmation_sent_at__isnull=True,
+        created_at__gte=since).values_list('id', flat=True))
+    for order_id in order_ids:
+        enqueue_paid_order(order_id)
+    return len(order_ids)
+
+
+def enqueue_card_refresh(**filters):
+    try:
+        refresh_product_cards.delay(**filters)
+    except OperationalError:
+        logger.error(f'Product cards for {filters} could not be queued')
+
+
+def schedule_card_refresh(**filters):
+    transaction.on_commit(lambda: enqueue_card_refresh(**filters))
+
+
+@shared_task
+def refresh_product_cards(**filters):
+    return refresh_cards_for(**filters)
+
+
+def enqueue_stripe_events():
+    try:
+        process_stripe_events.delay()
+    except OperationalError:
+        logger.error('Stripe events could not be queued')
+
+
+@shared_task
+def process_stripe_events():
+    processed = 0
+    while True:
+        count = process_events()
+        if not count:
+            return processed
+        processed += count
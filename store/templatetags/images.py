@@ -0,0 +1,21 @@
+from django import template
+
+from store.images import build_srcset, get_sources
+
+register = template.Library()
+
+
+@register.simple_tag
+def srcset(product_image, format='webp'):
+    return build_srcset(product_image.variants.all(), format)
+
+
+@register.inclusion_tag('partials/responsive_image.html')
+def responsive_image(product_image, sizes='100vw', css_class='', alt='', src=None):
+    return {
+        'sources': get_sources(product_image),
+        'src': src or product_image.get_thumbnail(),
+        'sizes': sizes,
+        'css_class': css_class,
+        'alt': alt
+    }
@@ -1,4 +1,5 @@
 from django import template
+from store.fragments import get_menu_version
 from store.models import Category
 
 register = template.Library()
@@ -6,5 +7,6 @@ register = template.Library()
 
 @register.inclusion_tag('menu.html')
 def menu():
+    # The queryset is only evaluated when the cached fragment is missing
     categories = Category.objects.all()
-    return {'categories': categories}
+    return {'categories': categories, 'menu_version': get_menu_version()}
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core import signing
+from model_bakery import baker
+import pytest
+
+from store.breadcrumbs import BREADCRUMB_SALT
+from store.models import Category
+
+
+@pytest.fixture
+def category():
+    return baker.make(Category, title='Fruit')
+
+
+def read_cookie(response):
+    return signing.loads(response.cookies[settings.BREADCRUMB_COOKIE_NAME].value, salt=BREADCRUMB_SALT)
+
+
+@pytest.mark.django_db
+class TestBreadcrumbs:
+    def test_if_page_is_visited_stores_trail_in_cookie(self, client, category):
+        response = client.get(f'/category/{category.id}/')
+
+        assert response.status_code == 200
+        assert read_cookie(response) == [
+            {'label': 'Fruit', 'url': f'/category/{category.id}/'}]
+        assert response.context['breadcrumbs'] == read_cookie(response)
+        assert 'sessionid' not in response.cookies
+
+    def test_if_trail_is_unchanged_sends_no_cookie(self, client, category):
+        client.get(f'/category/{category.id}/')
+
+        response = client.get(f'/category/{category.id}/')
+
+        assert settings.BREADCRUMB_COOKIE_NAME not in response.cookies
+        assert response.context['breadcrumbs'][-1]['label'] == 'Fruit'
+
+    def test_if_pages_are_visited_keeps_last_four(self, client):
+        categories = baker.make(Category, _quantity=5)
+        for visited in categories:
+            response = client.get(f'/category/{visited.id}/')
+
+        assert [item['label'] for item in read_cookie(response)] == [
+            visited.title for visited in categories[1:]]
+
+    def test_if_cookie_is_tampered_starts_new_trail(self, client, category):
+        client.cookies[settings.BREADCRUMB_COOKIE_NAME] = 'forged'
+
+        response = client.get(f'/category/{category.id}/')
+
+        assert len(read_cookie(response)) == 1
+
+    def test_if_frontpage_is_visited_clears_trail(self, client, category):
+        client.get(f'/category/{category.id}/')
+
+        response = client.get('/')
+
+        assert response.cookies[settings.BREADCRUMB_COOKIE_NAME].value == ''
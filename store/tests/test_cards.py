@@ -0,0 +1,157 @@
+from datetime import timedelta
+from unittest.mock import patch
+import warnings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+import pytest
+
+from store.cards import refresh_cards, refresh_cards_for
+from store.counts import invalidate_product_counts
+from store.models import Category, Product, ProductCard, ProductImage, Vendor
+
+
+@pytest.fixture
+def vendor():
+    user = baker.make(User, first_name='Ada', last_name='Lovelace')
+    return baker.make(Vendor, user=user, shop_name='Tea House')
+
+
+@pytest.fixture
+def product(vendor):
+    category = baker.make(Category, title='Tea')
+    return baker.make(Product, user=vendor.user, category=category, title='Green tea', unit_price=5, status=Product.ACTIVE)
+
+
+@pytest.mark.django_db
+class TestProductCard:
+    def test_if_product_is_saved_builds_card(self, product, vendor):
+        card = ProductCard.objects.get(pk=product.pk)
+
+        assert (card.title, card.unit_price, card.vendor_name, card.category_title) == (
+            'Green tea', 5, 'Tea House', 'Tea')
+        assert card.vendor == vendor
+        assert card.thumbnail == ''
+
+    def test_if_price_changes_updates_card(self, product):
+        product.unit_price = 7
+        product.save()
+
+        assert ProductCard.objects.get(pk=product.pk).unit_price == 7
+
+    def test_if_product_is_soft_deleted_removes_card(self, product):
+        product.deleted = True
+        product.save()
+
+        assert not ProductCard.objects.filter(pk=product.pk).exists()
+
+    def test_if_default_image_is_added_sets_thumbnail(self, product):
+        baker.make(ProductImage, product=product, default=True)
+
+        assert ProductCard.objects.get(pk=product.pk).thumbnail == ProductImage.DEFAULT_IMAGE_URL
+
+    def test_if_thumbnail_is_pending_refresh_queues_nothing(self, product, django_capture_on_commit_callbacks):
+        baker.make(ProductImage, product=product, default=True, image='uploads/product_images/tea.jpg')
+        cache.clear()
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            refresh_cards([product.pk])
+
+        assert callbacks == [invalidate_product_counts]
+        assert ProductCard.objects.get(pk=product.pk).thumbnail == ProductImage.DEFAULT_IMAGE_URL
+
+    def test_if_image_is_deleted_refreshes_after_commit(self, product, django_capture_on_commit_callbacks):
+        product_image = baker.make(ProductImage, product=product, default=True)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image.delete()
+
+        assert ProductCard.objects.get(pk=product.pk).thumbnail == ''
+
+    def test_if_product_with_images_is_deleted_removes_card(self, product, django_capture_on_commit_callbacks):
+        baker.make(ProductImage, product=product, default=True)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product.delete()
+
+        assert not ProductCard.objects.exists()
+
+    def test_if_vendor_is_renamed_queues_refresh(self, product, vendor, django_capture_on_commit_callbacks):
+        vendor.shop_name = 'Leaf & Co'
+        with patch('store.tasks.refresh_product_cards.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                vendor.save()
+
+        delay.assert_called_once_with(user_id=vendor.user_id)
+        refresh_cards_for(user_id=vendor.user_id)
+        assert ProductCard.objects.get(pk=product.pk).vendor_name == 'Leaf & Co'
+
+    def test_if_user_logs_in_does_not_queue_refresh(self, product, vendor, django_capture_on_commit_callbacks):
+        with patch('store.tasks.refresh_product_cards.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                vendor.user.save(update_fields=['last_login'])
+
+        delay.assert_not_called()
+
+    def test_if_refreshed_locks_products_before_reading_them(self, product):
+        if not connection.features.has_select_for_update:
+            pytest.skip(f'{connection.vendor} has no row locks')
+
+        with CaptureQueriesContext(connection) as queries:
+            refresh_cards([product.pk])
+
+        reads = [query['sql'] for query in queries if 'FROM' in query['sql'] and 'store_product' in query['sql']]
+        assert reads[0].endswith('FOR UPDATE')
+
+    def test_if_command_runs_rebuilds_cards(self, product, capsys):
+        ProductCard.objects.all().delete()
+
+        call_command('rebuild_product_cards')
+
+        assert ProductCard.objects.filter(pk=product.pk).exists()
+        assert '1 product cards' in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+class TestCardListings:
+    def test_if_category_is_listed_reads_cards_without_joins(self, client, product):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/category/{product.category_id}/?vendor={product.user.vendors.id}')
+
+        card_queries = [query['sql'] for query in queries if 'store_productcard' in query['sql']]
+        assert response.status_code == 200
+        assert [card.id for card in response.context['products']] == [product.id]
+        assert card_queries and not any('JOIN' in sql for sql in card_queries)
+        assert 'By Tea House' in response.content.decode()
+
+    def test_if_category_is_not_sorted_lists_newest_cards_first(self, client, product):
+        newer = baker.make(Product, user=product.user, category=product.category, status=Product.ACTIVE)
+        Product.objects.filter(pk=product.pk).update(last_update=newer.last_update - timedelta(days=1))
+        refresh_cards([product.pk])
+        cache.clear()
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            response = client.get(f'/category/{product.category_id}/')
+
+        assert [card.id for card in response.context['products']] == [newer.id, product.id]
+
+    def test_if_cards_are_listed_returns_visible_products(self, api_client, product):
+        baker.make(Product, status=Product.DRAFT)
+
+        response = api_client.get('/product-cards/', {'category_id': product.category_id})
+
+        assert response.status_code == 200
+        assert response.data['count'] == 1
+        assert response.data['results'][0]['id'] == product.id
+        assert response.data['results'][0]['vendor_name'] == 'Tea House'
+
+    def test_if_products_are_listed_keeps_product_fields(self, api_client, product):
+        response = api_client.get('/products/')
+
+        assert response.status_code == 200
+        assert {'slug', 'description', 'inventory', 'productimages', 'vendors'} <= set(response.data['results'][0])
@@ -0,0 +1,139 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+import pytest
+
+from store.cart import Cart
+from store.context_processors import cart_count
+from store.models import Product
+
+
+class FakeSession(dict):
+    modified = False
+
+
+@pytest.fixture
+def request_with_session():
+    return SimpleNamespace(session=FakeSession())
+
+
+@pytest.fixture
+def products():
+    return baker.make(Product, unit_price=Decimal('2.50'), inventory=10, _quantity=3)
+
+
+def count_product_queries(queries):
+    return sum(1 for query in queries if 'FROM "store_product"' in query['sql'])
+
+
+@pytest.mark.django_db
+class TestCart:
+    def test_if_product_is_added_stores_compact_line(self, request_with_session, products):
+        cart = Cart(request_with_session)
+
+        cart.add(products[0].id, 2)
+
+        assert request_with_session.session['cart'] == {
+            str(products[0].id): {'quantity': 2, 'unit_price': '2.50'}}
+        assert request_with_session.session['cart_count'] == 2
+
+    def test_if_quantity_is_changed_runs_no_query(self, request_with_session, products, django_assert_num_queries):
+        cart = Cart(request_with_session)
+        cart.add(products[0].id)
+
+        with django_assert_num_queries(0):
+            cart.add(products[0].id, 4, True)
+            cart.remove(str(products[0].id))
+
+        assert len(cart) == 0
+
+    def test_if_cart_is_read_twice_loads_products_once(self, request_with_session, products):
+        cart = Cart(request_with_session)
+        for product in products:
+            cart.add(product.id, 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            items = list(cart)
+            total_cost = cart.get_total_cost()
+            list(cart)
+
+        assert count_product_queries(queries) == 1
+        assert [item['total_price'] for item in items] == [Decimal('5.00')] * 3
+        assert total_cost == Decimal('15.00')
+
+    def test_if_cart_is_only_read_leaves_session_untouched(self, request_with_session):
+        cart = Cart(request_with_session)
+
+        assert len(cart) == 0
+        assert list(cart) == []
+        assert request_with_session.session == {}
+        assert not request_with_session.session.modified
+
+    def test_if_last_line_is_removed_drops_cart_from_session(self, request_with_session, products):
+        cart = Cart(request_with_session)
+        cart.add(products[0].id)
+
+        cart.remove(products[0].id)
+
+        assert request_with_session.session == {}
+
+    def test_if_session_has_legacy_lines_reads_them(self, request_with_session, products):
+        request_with_session.session['cart'] = {str(products[0].id): {
+            'id': products[0].id, 'quantity': 3, 'title': 'Old title', 'unit_price': 2.5, 'inventory': 10}}
+
+        cart = Cart(request_with_session)
+
+        assert cart.get_total_cost() == Decimal('7.50')
+        assert list(cart)[0]['title'] == products[0].title
+
+    def test_if_product_was_deleted_skips_it(self, request_with_session, products):
+        cart = Cart(request_with_session)
+        cart.add(products[0].id)
+        cart.add(products[1].id)
+        products[1].delete()
+
+        assert [item['id'] for item in Cart(request_with_session)] == [products[0].id]
+
+
+@pytest.mark.django_db
+class TestCartView:
+    def test_if_cart_grows_runs_same_number_of_queries(self, client, products):
+        client.get(f'/add_to_cart/{products[0].id}/')
+        with CaptureQueriesContext(connection) as one_item:
+            client.get('/cart/')
+
+        for product in products[1:]:
+            client.get(f'/add_to_cart/{product.id}/')
+        with CaptureQueriesContext(connection) as three_items:
+            response = client.get('/cart/')
+
+        assert response.status_code == 200
+        assert len(three_items) == len(one_item)
+        assert count_product_queries(three_items) == 1
+
+
+@pytest.mark.django_db
+class TestCartCount:
+    def test_if_count_is_not_rendered_does_not_read_session(self):
+        request = SimpleNamespace(session=MagicMock())
+
+        cart_count(request)
+
+        assert not request.session.mock_calls
+
+    def test_if_count_is_rendered_reads_stored_count(self, request_with_session, products):
+        Cart(request_with_session).add(products[0].id, 3)
+
+        context = cart_count(request_with_session)
+
+        assert context['cart_count'] > 0
+        assert str(context['cart_count']) == '3'
+
+    def test_if_anonymous_visitor_browses_creates_no_session(self, client):
+        response = client.get('/')
+
+        assert response.status_code == 200
+        assert 'sessionid' not in response.cookies
@@ -0,0 +1,136 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+import pytest
+
+from store.cart import Cart
+from store.checkout import CheckoutError, create_order, get_line_items
+from store.models import Customer, Order, OrderItem, Product, StockReservation
+
+
+class FakeSession(dict):
+    modified = False
+
+
+def make_cart(products, quantity=1):
+    cart = Cart(SimpleNamespace(session=FakeSession()))
+    for product in products:
+        cart.cart[str(product.id)] = {'quantity': quantity, 'unit_price': str(product.unit_price)}
+    return cart
+
+
+@pytest.fixture
+def customer():
+    return baker.make(Customer)
+
+
+def make_products(count, **kwargs):
+    kwargs.setdefault('inventory', 10)
+    return baker.make(Product, unit_price=Decimal('3.00'), status=Product.ACTIVE, _quantity=count, **kwargs)
+
+
+@pytest.mark.django_db
+class TestCreateOrder:
+    def test_if_cart_is_valid_creates_order_and_items(self, customer):
+        products = make_products(3)
+
+        order = create_order(customer, make_cart(products, 2))
+
+        assert order.total_price == Decimal('18.00')
+        assert OrderItem.objects.filter(order=order).count() == 3
+        assert {product.inventory for product in Product.objects.all()} == {8}
+
+    def test_if_cart_grows_adds_one_stock_update_per_product(self, customer):
+        small_cart = make_cart(make_products(2))
+        large_cart = make_cart(make_products(20))
+
+        with CaptureQueriesContext(connection) as small:
+            create_order(customer, small_cart)
+        with CaptureQueriesContext(connection) as large:
+            create_order(customer, large_cart)
+
+        product_updates = 20 - 2
+        assert len(large) == len(small) + product_updates
+
+    def test_if_stock_is_short_creates_nothing(self, customer):
+        products = make_products(1, inventory=1)
+
+        with pytest.raises(CheckoutError):
+            create_order(customer, make_cart(products, 2))
+
+        assert not Order.objects.exists()
+
+    def test_if_product_was_removed_raises(self, customer):
+        products = make_products(1)
+        Product.objects.update(deleted=True)
+
+        with pytest.raises(CheckoutError):
+            create_order(customer, make_cart(products))
+
+    def test_if_price_changed_updates_cart_and_raises(self, customer):
+        products = make_products(2)
+        cart = make_cart(products)
+        Product.objects.filter(pk=products[0].pk).update(unit_price=Decimal('4.50'))
+
+        with pytest.raises(CheckoutError, match=products[0].title):
+            create_order(customer, cart)
+
+        assert cart.cart[str(products[0].id)]['unit_price'] == '4.50'
+        assert cart.cart[str(products[1].id)]['unit_price'] == '3.00'
+        assert not Order.objects.exists()
+        assert create_order(customer, cart).total_price == Decimal('7.50')
+
+    def test_if_order_exists_builds_stripe_line_items(self, customer):
+        products = make_products(1)
+        order = create_order(customer, make_cart(products, 2))
+
+        assert get_line_items(order) == [{
+            'price_data': {'currency': 'usd', 'product_data': {'name': products[0].title}, 'unit_amount': 300},
+            'quantity': 2}]
+
+
+@pytest.mark.django_db
+class TestStripeCheckout:
+    def test_if_summary_is_confirmed_creates_stripe_session_for_order(self, client, customer):
+        products = make_products(2)
+        user = baker.make(User)
+        client.force_login(user)
+        order = create_order(customer, make_cart(products))
+        session = client.session
+        session['cart'] = make_cart(products).cart
+        session['order_id'] = order.id
+        session.save()
+
+        with patch('store.views.create_checkout_session', return_value={'id': 'cs_test'}) as create:
+            response = client.post('/cart/checkout/')
+
+        assert response.status_code == 200
+        kwargs = create.call_args.kwargs
+        assert len(kwargs['line_items']) == 2
+        assert kwargs['metadata'] == {'order_id': str(order.id)}
+
+    def test_if_address_is_submitted_twice_holds_stock_once(self, client):
+        product = make_products(1)[0]
+        user = baker.make(User)
+        customer = baker.make(Customer, user=user)
+        client.force_login(user)
+        session = client.session
+        session['cart'] = make_cart([product], quantity=2).cart
+        session['customer_id'] = customer.id
+        session.save()
+        address = {'address_form_submit': '', 'street': 'Main street 1', 'city': 'Oslo',
+                   'country': 'Norway', 'zip_code': '0150'}
+
+        client.post('/cart/checkout/', address)
+        first_order_id = client.session['order_id']
+        client.post('/cart/checkout/', address)
+
+        product.refresh_from_db()
+        assert product.inventory == 8
+        assert client.session['order_id'] != first_order_id
+        assert Order.objects.get(pk=first_order_id).payment_status == Order.PAYMENT_STATUS_FAILED
+        assert StockReservation.objects.filter(status=StockReservation.RESERVED).count() == 1
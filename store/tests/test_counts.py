@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+import pytest
+
+from store.counts import count_products, format_product_count
+from store.models import Category, Product
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestCountProducts:
+    def test_if_count_is_cached_runs_no_query(self, django_assert_num_queries):
+        category = baker.make(Category)
+        baker.make(Product, category=category, _quantity=3)
+        queryset = Product.objects.filter(category=category)
+        count_products(queryset)
+
+        with django_assert_num_queries(0):
+            count = count_products(queryset)
+
+        assert count == 3
+
+    def test_if_product_is_saved_invalidates_count(self, django_capture_on_commit_callbacks):
+        category = baker.make(Category)
+        baker.make(Product, category=category, _quantity=3)
+        queryset = Product.objects.filter(category=category)
+        count_products(queryset)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            baker.make(Product, category=category)
+
+        assert count_products(queryset) == 4
+
+    def test_if_save_is_not_committed_keeps_count(self, django_capture_on_commit_callbacks):
+        category = baker.make(Category)
+        baker.make(Product, category=category, _quantity=3)
+        queryset = Product.objects.filter(category=category)
+        count_products(queryset)
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            baker.make(Product, category=category)
+            assert count_products(queryset) == 3
+
+        for callback in callbacks:
+            callback()
+        assert count_products(queryset) == 4
+
+    def test_if_count_is_above_threshold_returns_estimate(self, settings):
+        settings.PRODUCT_COUNT_ESTIMATE_THRESHOLD = 1000
+        category = baker.make(Category)
+        baker.make(Product, category=category, _quantity=3)
+
+        count = count_products(Product.objects.filter(category=category))
+
+        assert format_product_count(count) == 3
+        assert format_product_count(1001) == '1,000+'
+
+    def test_if_filter_can_never_match_returns_0(self, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            count = count_products(Product.objects.filter(id__in=[]))
+
+        assert count == 0
+
+
+@pytest.mark.django_db
+class TestListingCount:
+    def test_if_listing_is_rendered_runs_one_count_query(self, client):
+        category = baker.make(Category)
+        baker.make(Product, category=category,
+                   status=Product.ACTIVE, _quantity=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/category/{category.id}/')
+
+        count_queries = [query for query in queries.captured_queries
+                         if 'COUNT(' in query['sql'] and 'store_product' in query['sql']]
+        assert response.status_code == 200
+        assert response.context['product_count'] == 3
+        assert len(count_queries) == 1
@@ -0,0 +1,138 @@
+from decimal import Decimal
+import re
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+import pytest
+
+from store.checkout import complete_order
+from store.earnings import rebuild_earnings
+from store.models import Customer, DailyProductEarnings, Order, OrderItem, Product, VendorEarnings
+from userprofile.models import Userprofile
+
+
+@pytest.fixture
+def vendor():
+    return baker.make(User)
+
+
+@pytest.fixture
+def make_order(vendor):
+    customer = baker.make(Customer, user=baker.make(User))
+    tea = baker.make(Product, user=vendor, title='Green tea', inventory=10)
+    cake = baker.make(Product, title='Cake', inventory=10)
+
+    def do_make_order():
+        order = baker.make(Order, customer=customer, total_price=11)
+        baker.make(OrderItem, order=order, product=tea, quantity=2, unit_price=Decimal('3.00'))
+        baker.make(OrderItem, order=order, product=cake, quantity=1, unit_price=Decimal('5.00'))
+        return order
+    return do_make_order
+
+
+def complete(order):
+    with patch('store.tasks.process_paid_order.delay'):
+        return complete_order(order)
+
+
+@pytest.mark.django_db
+class TestRecordEarnings:
+    def test_if_order_is_completed_adds_to_each_vendor(self, vendor, make_order):
+        complete(make_order())
+
+        earnings = VendorEarnings.objects.get(user=vendor)
+        assert earnings.total == Decimal('6.00')
+        assert earnings.items_sold == 2
+        assert earnings.orders == 1
+        assert VendorEarnings.objects.count() == 2
+
+    def test_if_order_is_completed_twice_counts_it_once(self, vendor, make_order):
+        order = make_order()
+
+        complete(order)
+        complete(order)
+
+        assert VendorEarnings.objects.get(user=vendor).total == Decimal('6.00')
+
+    def test_if_orders_share_a_day_updates_one_bucket(self, vendor, make_order):
+        complete(make_order())
+        complete(make_order())
+
+        bucket = DailyProductEarnings.objects.get(user=vendor)
+        assert bucket.total == Decimal('12.00')
+        assert bucket.items_sold == 4
+
+    def test_if_order_is_pending_records_nothing(self, make_order):
+        make_order()
+
+        assert not VendorEarnings.objects.exists()
+
+    def test_if_order_has_several_vendors_updates_them_in_key_order(self, make_order):
+        order = make_order()
+        OrderItem.objects.filter(order=order, product__title='Cake').update(
+            product=baker.make(Product, user=baker.make(User), inventory=10))
+
+        with CaptureQueriesContext(connection) as queries:
+            complete(order)
+
+        updated = [int(re.search(r'"user_id" = (\d+)', query['sql']).group(1)) for query in queries
+                   if query['sql'].startswith('UPDATE "store_vendorearnings"')]
+        assert len(updated) == 2
+        assert updated == sorted(updated)
+
+    def test_if_ledger_fails_still_completes_order(self, vendor, make_order):
+        order = make_order()
+
+        def broken_ledger(order):
+            VendorEarnings.objects.create(user=vendor)
+            raise DatabaseError('Ledger is unavailable')
+        with patch('store.signals.handlers.record_earnings', side_effect=broken_ledger):
+            assert complete(order)
+
+        order.refresh_from_db()
+        assert order.payment_status == Order.PAYMENT_STATUS_COMPLETE
+        assert not VendorEarnings.objects.exists()
+
+
+@pytest.mark.django_db
+class TestRebuildEarnings:
+    def test_if_rebuilt_matches_recorded_earnings(self, vendor, make_order):
+        complete(make_order())
+        complete(make_order())
+        make_order()
+        recorded = VendorEarnings.objects.get(user=vendor)
+
+        rebuild_earnings()
+
+        rebuilt = VendorEarnings.objects.get(user=vendor)
+        assert (rebuilt.total, rebuilt.items_sold, rebuilt.orders) == (
+            recorded.total, recorded.items_sold, recorded.orders)
+        assert DailyProductEarnings.objects.get(user=vendor).total == Decimal('12.00')
+
+    def test_if_command_runs_reports_vendors(self, make_order, capsys):
+        complete(make_order())
+        VendorEarnings.objects.all().delete()
+
+        call_command('rebuild_vendor_earnings')
+
+        assert 'for 2 vendors' in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+class TestMyStore:
+    def test_if_vendor_opens_store_reads_ledger_and_pages_items(self, client, vendor, make_order, django_assert_max_num_queries):
+        Userprofile.objects.create(user=vendor)
+        for _ in range(30):
+            complete(make_order())
+        client.force_login(vendor)
+
+        with django_assert_max_num_queries(20):
+            response = client.get('/mystore/')
+
+        assert response.status_code == 200
+        assert response.context['total_earnings'] == Decimal('180.00')
+        assert len(response.context['order_items']) == 25
+        assert response.context['order_items'].paginator.count == 30
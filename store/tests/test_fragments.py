@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+import pytest
+
+from store.models import Category, Product, ProductImage
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def product():
+    return baker.make(Product, title='Green tea', status=Product.ACTIVE, category=baker.make(Category, title='Drinks'))
+
+
+@pytest.mark.django_db
+class TestProductCardCache:
+    def test_if_product_is_unchanged_reuses_card(self, client, product):
+        client.get(f'/category/{product.category_id}/')
+        Product.objects.filter(pk=product.pk).update(title='Black tea')
+
+        response = client.get(f'/category/{product.category_id}/')
+
+        assert 'Green tea' in response.content.decode()
+
+    def test_if_product_is_saved_renders_new_card(self, client, product):
+        client.get(f'/category/{product.category_id}/')
+        product.title = 'Black tea'
+        product.save()
+
+        response = client.get(f'/category/{product.category_id}/')
+
+        assert 'Black tea' in response.content.decode()
+        assert 'Green tea' not in response.content.decode()
+
+    def test_if_image_is_added_renders_new_card(self, client, product):
+        client.get(f'/category/{product.category_id}/')
+
+        baker.make(ProductImage, product=product, default=True,
+                   thumbnail='uploads/product_images/thumbnails/tea.jpg', thumbnail_status=ProductImage.THUMBNAIL_READY)
+
+        response = client.get(f'/category/{product.category_id}/')
+        assert 'thumbnails/tea.jpg' in response.content.decode()
+
+
+@pytest.mark.django_db
+class TestMenuCache:
+    def test_if_menu_is_cached_runs_no_category_query(self, client, product):
+        client.get('/')
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/')
+
+        assert not [query for query in queries if 'FROM "store_category"' in query['sql']]
+
+    def test_if_category_is_saved_renders_new_menu(self, client, product):
+        client.get('/')
+
+        baker.make(Category, title='Snacks')
+
+        assert 'Snacks' in client.get('/').content.decode()
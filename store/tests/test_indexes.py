@@ -0,0 +1,88 @@
+import re
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+from model_bakery import baker
+import pytest
+
+from store.models import Category, Customer, Order, Product, ProductImage
+
+
+def full_scans(queryset, table):
+    """
+    Returns the plan lines where the database reads the whole table instead
+    of seeking an index.
+    """
+    if connection.vendor == 'sqlite':
+        pattern = re.compile(rf'\bSCAN {table}\b(?! USING (COVERING )?INDEX)')
+        return [line for line in queryset.explain().splitlines() if pattern.search(line)]
+    if connection.vendor == 'mysql':
+        # TEXT is the tabular plan, where a full scan has the access type ALL.
+        # Newer servers default to the TREE format, which has no such column.
+        plan = queryset.explain(format='TEXT')
+        return [line for line in plan.splitlines() if f' {table} ' in line and ' ALL ' in line]
+    pytest.skip(f'No plan check for {connection.vendor}')
+
+
+def listing():
+    return Product.objects.select_related('user').annotate(
+        vendor_shop_name=F('user__vendors__shop_name')).filter(status=Product.ACTIVE, deleted=False)
+
+
+@pytest.fixture
+def catalog():
+    # Listed products, one customer's orders and paid orders are each a small
+    # share of their table, as in production, so an index is always the cheaper
+    # plan and MySQL's cost model picks it as reliably as SQLite does
+    category = baker.make(Category)
+    Product.objects.bulk_create(baker.prepare(
+        Product, user=baker.make(User), category=baker.make(Category), status=Product.DRAFT, _quantity=300))
+    products = baker.make(Product, category=category, status=Product.ACTIVE, _quantity=10)
+    for product in products:
+        baker.make(ProductImage, product=product, default=False, _quantity=2)
+        baker.make(ProductImage, product=product)
+    Order.objects.bulk_create([Order(customer=customer)
+                               for customer in baker.make(Customer, _quantity=20) for _ in range(10)])
+    return category
+
+
+@pytest.mark.django_db
+class TestHotQueryPlans:
+    def test_if_listing_is_sorted_by_price_uses_index(self, catalog):
+        assert not full_scans(listing().order_by('unit_price'), 'store_product')
+
+    def test_if_listing_is_sorted_by_title_uses_index(self, catalog):
+        assert not full_scans(listing().order_by('-title', '-id'), 'store_product')
+
+    def test_if_category_is_listed_uses_index(self, catalog):
+        queryset = listing().filter(category=catalog).order_by('unit_price', 'id')
+
+        assert not full_scans(queryset, 'store_product')
+
+    def test_if_vendor_products_are_listed_uses_index(self, catalog):
+        vendor = Product.objects.filter(status=Product.ACTIVE).first().user
+
+        assert not full_scans(listing().filter(user=vendor), 'store_product')
+
+    def test_if_default_images_are_prefetched_uses_index(self, catalog):
+        product_ids = list(Product.objects.values_list('id', flat=True)[:10])
+        queryset = ProductImage.objects.filter(product_id__in=product_ids, default=True)
+
+        assert not full_scans(queryset, 'store_productimage')
+
+    def test_if_customer_orders_are_listed_uses_index(self, catalog):
+        customer = Customer.objects.first()
+        queryset = Order.objects.filter(customer=customer).order_by('-created_at', '-id')
+
+        assert not full_scans(queryset, 'store_order')
+
+    def test_if_paid_orders_in_window_are_counted_uses_index(self, catalog):
+        queryset = Order.objects.filter(
+            payment_status=Order.PAYMENT_STATUS_COMPLETE, created_at__gte=timezone.now() - timedelta(days=30))
+
+        assert not full_scans(queryset, 'store_order')
+
+    def test_if_column_has_no_index_reports_full_scan(self, catalog):
+        assert full_scans(Product.objects.filter(description='Tea'), 'store_product')
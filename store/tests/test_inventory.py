@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Barrier
+from django.db import OperationalError, connection
+from django.utils import timezone
+from model_bakery import baker
+import pytest
+
+from store.inventory import InsufficientStock, commit_stock, release_expired_reservations, reserve_stock
+from store.models import Order, Product, StockReservation
+
+
+def make_product(inventory):
+    return baker.make(Product, inventory=inventory)
+
+
+@pytest.mark.django_db
+class TestReserveStock:
+    def test_if_stock_is_available_takes_it(self):
+        product = make_product(5)
+        order = baker.make(Order)
+
+        reserve_stock(order, [(product.id, 2), (product.id, 1)])
+
+        product.refresh_from_db()
+        assert product.inventory == 2
+        assert order.reservations.get().quantity == 3
+
+    def test_if_one_line_is_short_reserves_nothing(self):
+        available, short = make_product(5), make_product(1)
+        order = baker.make(Order)
+
+        with pytest.raises(InsufficientStock) as exc_info:
+            reserve_stock(order, [(available.id, 2), (short.id, 2)])
+
+        available.refresh_from_db()
+        assert exc_info.value.product_id == short.id
+        assert available.inventory == 5
+        assert not StockReservation.objects.exists()
+
+    def test_if_reservation_expires_returns_stock(self):
+        product = make_product(5)
+        order = baker.make(Order)
+        reserve_stock(order, [(product.id, 2)])
+        order.reservations.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        assert release_expired_reservations() == 1
+        assert release_expired_reservations() == 0
+
+        product.refresh_from_db()
+        order.refresh_from_db()
+        assert product.inventory == 5
+        assert order.payment_status == Order.PAYMENT_STATUS_FAILED
+
+    def test_if_stock_is_committed_never_returns_it(self):
+        product = make_product(5)
+        order = baker.make(Order)
+        reserve_stock(order, [(product.id, 2)])
+        commit_stock(order)
+        order.reservations.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        release_expired_reservations()
+
+        product.refresh_from_db()
+        assert product.inventory == 3
+        assert order.reservations.get().status == StockReservation.COMMITTED
+
+    def test_if_order_is_paid_after_expiry_takes_stock_again(self):
+        product = make_product(5)
+        order = baker.make(Order)
+        reserve_stock(order, [(product.id, 2)])
+        order.reservations.update(expires_at=timezone.now() - timedelta(minutes=1))
+        release_expired_reservations()
+
+        commit_stock(order)
+
+        product.refresh_from_db()
+        assert product.inventory == 3
+        assert order.reservations.get().status == StockReservation.COMMITTED
+
+    def test_if_order_is_paid_after_stock_sold_out_flags_it(self, caplog):
+        product = make_product(2)
+        order = baker.make(Order)
+        reserve_stock(order, [(product.id, 2)])
+        order.reservations.update(expires_at=timezone.now() - timedelta(minutes=1))
+        release_expired_reservations()
+        reserve_stock(baker.make(Order), [(product.id, 2)])
+
+        commit_stock(order)
+
+        product.refresh_from_db()
+        order.refresh_from_db()
+        assert product.inventory == 0
+        assert order.oversold_at is not None
+        assert order.reservations.get().status == StockReservation.RELEASED
+        assert any(record.levelname == 'ERROR' for record in caplog.records)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentCheckout:
+    def test_if_many_buyers_race_for_one_sku_never_oversells(self):
+        product = make_product(10)
+        orders = baker.make(Order, _quantity=40)
+        barrier = Barrier(8)
+
+        def buy(order):
+            try:
+                barrier.wait(timeout=5)
+            except Exception:
+                pass
+            try:
+                while True:
+                    try:
+                        reserve_stock(order, [(product.id, 1)])
+                        return True
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting like MySQL row locks do
+                        continue
+                    except InsufficientStock:
+                        return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(buy, orders))
+
+        product.refresh_from_db()
+        assert results.count(True) == 10
+        assert product.inventory == 0
+        assert StockReservation.objects.count() == 10
@@ -0,0 +1,88 @@
+import json
+from django.contrib.auth.models import User
+from model_bakery import baker
+import pytest
+
+from store.models import Customer, Order, OrderItem, Product
+
+
+@pytest.fixture
+def buyer():
+    return baker.make(User)
+
+
+@pytest.fixture
+def orders(buyer):
+    customer = baker.make(Customer, user=buyer)
+    product = baker.make(Product, title='Green tea')
+    orders = baker.make(Order, customer=customer, total_price=6, _quantity=12)
+    for order in orders:
+        baker.make(OrderItem, order=order, product=product, quantity=2, unit_price=3)
+    return orders
+
+
+@pytest.mark.django_db
+class TestListOrders:
+    def test_if_html_is_requested_returns_first_page(self, client, buyer, orders):
+        client.force_login(buyer)
+
+        response = client.get('/myorders/')
+
+        assert response.status_code == 200
+        assert len(response.context['orders']) == 10
+        assert response.context['page_obj'].has_next()
+        assert response.context['orders'][0]['id'] == orders[-1].id
+
+    def test_if_second_page_is_requested_returns_remaining_orders(self, client, buyer, orders):
+        client.force_login(buyer)
+
+        response = client.get('/myorders/?page=2')
+
+        assert [order['id'] for order in response.context['orders']] == [
+            orders[1].id, orders[0].id]
+
+    def test_if_json_is_requested_returns_paginated_orders(self, client, buyer, orders):
+        client.force_login(buyer)
+
+        response = client.get('/myorders/?format=json')
+
+        assert response.status_code == 200
+        assert response.data['count'] == 12
+        assert len(response.data['results']) == 10
+        assert response.data['next'] is not None
+
+    def test_if_user_has_orders_of_others_returns_only_own(self, client, orders):
+        client.force_login(baker.make(User))
+
+        response = client.get('/myorders/?format=json')
+
+        assert response.data['count'] == 0
+
+
+@pytest.mark.django_db
+class TestExportOrders:
+    def test_if_exported_streams_every_order_in_chunks(self, client, buyer, orders, settings, django_assert_max_num_queries):
+        settings.ORDER_EXPORT_CHUNK_SIZE = 5
+        client.force_login(buyer)
+
+        response = client.get('/myorders/export/')
+        assert response.streaming
+        with django_assert_max_num_queries(30):
+            data = json.loads(b''.join(response.streaming_content))
+
+        assert [order['id'] for order in data] == [
+            order.id for order in reversed(orders)]
+        assert data[0]['orderitems'][0]['product']['title'] == 'Green tea'
+
+    def test_if_user_is_staff_exports_all_orders(self, client, orders):
+        client.force_login(baker.make(User, is_staff=True))
+        baker.make(Order, customer=baker.make(Customer))
+
+        response = client.get('/myorders/export/')
+
+        assert len(json.loads(b''.join(response.streaming_content))) == 13
+
+    def test_if_user_is_anonymous_returns_403(self, client, orders):
+        response = client.get('/myorders/export/')
+
+        assert response.status_code in (401, 403)
@@ -0,0 +1,200 @@
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep
+from django.core.cache import cache
+from model_bakery import baker
+from templated_mail.mail import BaseEmailMessage
+import pytest
+import stripe
+
+from store.outbound import CircuitBreaker, CircuitOpenError, MailSender, create_checkout_session, get_stripe_client
+
+
+class StripeStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.requests.append(self.client_address)
+        sleep(self.server.delay)
+        body = json.dumps({'id': f'cs_test_{len(self.server.requests)}', 'object': 'checkout.session'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 stub ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 stub')
+            elif command == 'DATA':
+                self.reply('354 go ahead')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.server.messages += 1
+                self.reply('250 queued')
+                if self.server.drop_after_message:
+                    return
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+def serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def stripe_stub(settings):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StripeStubHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.delay = 0
+    serve(server)
+    settings.STRIPE_SECRET_KEY = 'sk_test_stub'
+    settings.STRIPE_API_BASE = f'http://127.0.0.1:{server.server_address[1]}'
+    settings.STRIPE_READ_TIMEOUT = 0.1
+    settings.STRIPE_MAX_NETWORK_RETRIES = 0
+    get_stripe_client.cache_clear()
+    cache.clear()
+    yield server
+    server.shutdown()
+    server.server_close()
+    get_stripe_client.cache_clear()
+
+
+@pytest.fixture
+def smtp_stub(settings):
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPStubHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.messages = 0
+    server.drop_after_message = False
+    serve(server)
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_HOST = '127.0.0.1'
+    settings.EMAIL_PORT = server.server_address[1]
+    settings.EMAIL_USE_TLS = False
+    settings.EMAIL_HOST_USER = ''
+    settings.EMAIL_HOST_PASSWORD = ''
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_message():
+    return BaseEmailMessage(template_name='emails/checkout_email.html', context={'cart': [], 'total_cost': 0})
+
+
+class TestStripeClient:
+    def test_if_sessions_are_created_reuses_one_connection(self, stripe_stub):
+        first = create_checkout_session(mode='payment')
+        second = create_checkout_session(mode='payment')
+
+        assert (first.id, second.id) == ('cs_test_1', 'cs_test_2')
+        assert stripe_stub.requests[0] == stripe_stub.requests[1]
+
+    def test_if_stripe_is_slow_opens_circuit(self, stripe_stub):
+        stripe_stub.delay = 0.3
+
+        for _ in range(5):
+            with pytest.raises(stripe.APIConnectionError):
+                create_checkout_session(mode='payment')
+        with pytest.raises(CircuitOpenError):
+            create_checkout_session(mode='payment')
+
+        assert len(stripe_stub.requests) == 5
+
+    def test_if_stripe_recovers_closes_circuit(self, stripe_stub, settings):
+        stripe_stub.delay = 0.3
+        for _ in range(4):
+            with pytest.raises(stripe.APIConnectionError):
+                create_checkout_session(mode='payment')
+        stripe_stub.delay = 0
+
+        create_checkout_session(mode='payment')
+
+        assert cache.get('store:circuit:stripe:failures') is None
+
+
+class TestCircuitBreaker:
+    def fail(self):
+        raise ConnectionError('down')
+
+    def make_tripped_breaker(self, name):
+        breaker = CircuitBreaker(name, 2, 30, lambda exc: isinstance(exc, ConnectionError))
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                breaker.call(self.fail)
+        # Let the cool down pass
+        cache.delete(breaker.open_key)
+        return breaker
+
+    def test_if_cool_down_passed_lets_one_trial_through(self):
+        breaker = self.make_tripped_breaker('trial')
+        calls = []
+
+        def trial():
+            with pytest.raises(CircuitOpenError):
+                breaker.call(calls.append, 'concurrent')
+            calls.append('trial')
+        breaker.call(trial)
+
+        assert calls == ['trial']
+        breaker.call(calls.append, 'after')
+        assert calls == ['trial', 'after']
+
+    def test_if_trial_fails_opens_circuit_again(self):
+        breaker = self.make_tripped_breaker('trial_fails')
+
+        with pytest.raises(ConnectionError):
+            breaker.call(self.fail)
+
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: None)
+
+
+@pytest.mark.django_db
+class TestMailSender:
+    def test_if_several_emails_are_sent_uses_one_connection(self, smtp_stub):
+        sender = MailSender()
+
+        for _ in range(3):
+            sender.send(make_message(), ['buyer@example.com'])
+        sender.close()
+
+        assert smtp_stub.messages == 3
+        assert smtp_stub.connections == 1
+
+    def test_if_server_drops_connection_reconnects(self, smtp_stub):
+        smtp_stub.drop_after_message = True
+        sender = MailSender()
+
+        sender.send(make_message(), ['buyer@example.com'])
+        sender.send(make_message(), ['buyer@example.com'])
+        sender.close()
+
+        assert smtp_stub.messages == 2
+        assert smtp_stub.connections == 2
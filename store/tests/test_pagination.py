@@ -0,0 +1,86 @@
+from decimal import Decimal
+from model_bakery import baker
+import pytest
+
+from store.models import Category, Product
+from store.pagination import KeysetPaginator
+
+
+@pytest.fixture
+def products():
+    category = baker.make(Category)
+    return [baker.make(Product, category=category, title=f'Product {index:02}', unit_price=Decimal(10 + index % 5), status=Product.ACTIVE)
+            for index in range(25)]
+
+
+def walk_forward(paginator):
+    pages = [paginator.get_page()]
+    while pages[-1].has_next():
+        pages.append(paginator.get_page(pages[-1].next_cursor))
+    return pages
+
+
+@pytest.mark.django_db
+class TestKeysetPaginator:
+    def test_if_walking_forward_returns_every_product_once(self, products):
+        paginator = KeysetPaginator(Product.objects.all(), 10, 'unit_price')
+
+        pages = walk_forward(paginator)
+
+        ids = [product.id for page in pages for product in page]
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert sorted(ids) == sorted(product.id for product in products)
+        assert list(Product.objects.order_by('unit_price', 'id').values_list('id', flat=True)) == ids
+
+    def test_if_descending_ordering_returns_products_in_order(self, products):
+        paginator = KeysetPaginator(Product.objects.all(), 10, '-title')
+
+        pages = walk_forward(paginator)
+
+        titles = [product.title for page in pages for product in page]
+        assert titles == sorted(titles, reverse=True)
+
+    def test_if_previous_cursor_returns_previous_page(self, products):
+        paginator = KeysetPaginator(Product.objects.all(), 10, '-unit_price')
+        first_page = paginator.get_page()
+        second_page = paginator.get_page(first_page.next_cursor)
+
+        previous_page = paginator.get_page(second_page.previous_cursor)
+
+        assert [product.id for product in previous_page] == [
+            product.id for product in first_page]
+        assert previous_page.has_next()
+
+    def test_if_first_page_has_no_previous_page(self, products):
+        page = KeysetPaginator(Product.objects.all(), 10).get_page()
+
+        assert not page.has_previous()
+        assert page.has_next()
+
+    def test_if_cursor_is_tampered_returns_first_page(self, products):
+        paginator = KeysetPaginator(Product.objects.all(), 10, 'title')
+        first_page = paginator.get_page()
+
+        page = paginator.get_page(first_page.next_cursor[:-2] + 'xx')
+
+        assert [product.id for product in page] == [
+            product.id for product in first_page]
+
+
+@pytest.mark.django_db
+class TestCategoryPagination:
+    def test_if_result_set_is_small_returns_numbered_pages(self, client, products):
+        response = client.get(f'/category/{products[0].category_id}/')
+
+        assert response.status_code == 200
+        assert not getattr(response.context['products'], 'is_keyset', False)
+
+    def test_if_result_set_is_large_returns_keyset_pages(self, client, products, settings):
+        settings.KEYSET_PAGINATION_THRESHOLD = 20
+
+        response = client.get(
+            f'/category/{products[0].category_id}/?sort_by=price_desc')
+
+        assert response.status_code == 200
+        assert response.context['products'].is_keyset
+        assert response.context['products'].has_next()
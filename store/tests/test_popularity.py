@@ -0,0 +1,89 @@
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from model_bakery import baker
+import pytest
+
+from store.models import Order, OrderItem, PopularProduct, Product
+from store.popularity import rebuild_popular_products
+from store.signals import order_created
+
+
+@pytest.fixture
+def products():
+    return baker.make(Product, status=Product.ACTIVE, _quantity=3)
+
+
+def place_order(*products, status=Order.PAYMENT_STATUS_COMPLETE):
+    order = baker.make(Order, payment_status=status)
+    for product in products:
+        baker.make(OrderItem, order=order, product=product,
+                   quantity=1, unit_price=product.unit_price or 1)
+    return order
+
+
+def get_scores():
+    return dict(PopularProduct.objects.values_list('product_id', 'score'))
+
+
+@pytest.mark.django_db
+class TestRecordOrder:
+    def test_if_order_is_created_increments_scores(self, products):
+        for order in [place_order(products[0], products[1]), place_order(products[0])]:
+            order_created.send_robust(None, order=order)
+
+        assert get_scores() == {products[0].id: 2, products[1].id: 1}
+
+
+@pytest.mark.django_db
+class TestRebuildPopularProducts:
+    def test_if_rebuilt_counts_only_recent_paid_orders(self, products, settings):
+        settings.POPULAR_PRODUCTS_WINDOW_DAYS = 30
+        place_order(products[0], products[1])
+        place_order(products[0])
+        place_order(products[2], status=Order.PAYMENT_STATUS_PENDING)
+        old_order = place_order(products[1])
+        Order.objects.filter(pk=old_order.pk).update(
+            created_at=timezone.now() - timedelta(days=31))
+
+        rebuild_popular_products()
+
+        assert get_scores() == {products[0].id: 2, products[1].id: 1}
+
+    def test_if_window_is_disabled_counts_all_orders(self, products, settings):
+        settings.POPULAR_PRODUCTS_WINDOW_DAYS = None
+        old_order = place_order(products[1])
+        Order.objects.filter(pk=old_order.pk).update(
+            created_at=timezone.now() - timedelta(days=365))
+
+        rebuild_popular_products()
+
+        assert get_scores() == {products[1].id: 1}
+
+
+@pytest.mark.django_db
+class TestFrontpage:
+    def test_if_frontpage_is_rendered_lists_most_popular_first(self, client, products):
+        PopularProduct.objects.bulk_create([
+            PopularProduct(product=products[0], score=1),
+            PopularProduct(product=products[2], score=5)])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/')
+
+        assert [product.id for product in response.context['products']] == [
+            products[2].id, products[0].id]
+        assert not [query for query in queries if 'FROM "store_orderitem"' in query['sql']]
+
+    def test_if_popular_products_are_hidden_fills_page_with_visible_ones(self, client):
+        products = baker.make(Product, status=Product.ACTIVE, _quantity=18)
+        Product.objects.filter(pk=products[0].pk).update(status=Product.DRAFT)
+        Product.objects.filter(pk=products[1].pk).update(deleted=True)
+        PopularProduct.objects.bulk_create([
+            PopularProduct(product=product, score=100 - rank) for rank, product in enumerate(products)])
+
+        response = client.get('/')
+
+        assert [product.id for product in response.context['products']] == [
+            product.id for product in products[2:]]
@@ -4,7 +4,7 @@ from django.contrib.auth.models import User
 from decimal import Decimal
 import pytest
 
-from store.models import Category, Order, OrderItem, Product
+from store.models import Category, Order, OrderItem, Product, Vendor
 
 
 @pytest.fixture
@@ -215,3 +215,34 @@ class TestDeleteproduct:
         response = delete_product(99999)
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestProductListing:
+    def test_if_product_is_draft_or_deleted_is_not_visible(self):
+        visible = baker.make(Product, status=Product.ACTIVE)
+        baker.make(Product, status=Product.DRAFT)
+        baker.make(Product, status=Product.ACTIVE, deleted=True)
+
+        assert list(Product.objects.visible()) == [visible]
+
+    def test_if_listed_loads_vendor_and_category_with_card_columns_only(self, django_assert_num_queries):
+        user = baker.make(User, first_name='Ada')
+        vendor = baker.make(Vendor, user=user, shop_name='Tea House')
+        baker.make(Product, user=user, status=Product.ACTIVE, category=baker.make(Category, title='Tea'))
+
+        with django_assert_num_queries(1):
+            product = Product.objects.for_listing().get()
+            assert (product.vendor_id, product.vendor_shop_name) == (vendor.id, 'Tea House')
+            assert product.user.first_name == 'Ada'
+            assert product.category.title == 'Tea'
+
+        assert {'description', 'inventory', 'slug'} <= product.get_deferred_fields()
+
+    def test_if_category_page_is_rendered_links_vendor(self, client):
+        user = baker.make(User)
+        product = baker.make(Product, user=user, status=Product.ACTIVE)
+
+        response = client.get(f'/category/{product.category_id}/')
+
+        assert f'/vendor_detail/{user.id}/' in response.content.decode()
@@ -0,0 +1,90 @@
+from django.core.management import call_command
+from model_bakery import baker
+import pytest
+
+from store.models import Product, SearchIndexEntry
+from store.search import InvertedIndexSearchBackend, tokenize
+
+
+@pytest.fixture
+def backend():
+    return InvertedIndexSearchBackend()
+
+
+def search_titles(backend, query):
+    products = backend.search(Product.objects.all(), query).order_by('-relevance', 'id')
+    return [product.title for product in products]
+
+
+@pytest.mark.django_db
+class TestSearchIndex:
+    def test_if_product_is_saved_indexes_title_and_description(self):
+        product = baker.make(Product, title='Red Apple',
+                             description='Crisp apple')
+
+        terms = dict(SearchIndexEntry.objects.filter(
+            product=product).values_list('term', 'weight'))
+
+        assert terms == {'red': 3, 'apple': 4, 'crisp': 1}
+
+    def test_if_product_is_deleted_removes_entries(self):
+        product = baker.make(Product, title='Red Apple')
+
+        product.delete()
+
+        assert not SearchIndexEntry.objects.exists()
+
+    def test_if_index_is_rebuilt_restores_entries(self):
+        baker.make(Product, title='Red Apple', description='')
+        SearchIndexEntry.objects.all().delete()
+
+        call_command('rebuild_search_index', stdout=None)
+
+        assert set(SearchIndexEntry.objects.values_list('term', flat=True)) == {
+            'red', 'apple'}
+
+
+@pytest.mark.django_db
+class TestInvertedIndexSearch:
+    def test_if_query_is_prefix_returns_matching_products(self, backend):
+        baker.make(Product, title='Banana bread', description='')
+        baker.make(Product, title='Apple pie', description='')
+
+        assert search_titles(backend, 'ban') == ['Banana bread']
+
+    def test_if_query_has_several_tokens_returns_products_matching_all(self, backend):
+        baker.make(Product, title='Apple pie', description='')
+        baker.make(Product, title='Apple juice', description='')
+
+        assert search_titles(backend, 'apple ju') == ['Apple juice']
+
+    def test_if_title_matches_ranks_above_description_match(self, backend):
+        baker.make(Product, title='Fruit basket', description='Has a pear')
+        baker.make(Product, title='Pear', description='')
+
+        assert search_titles(backend, 'pear') == ['Pear', 'Fruit basket']
+
+    def test_if_query_is_empty_returns_all_products(self, backend):
+        baker.make(Product, _quantity=3)
+
+        assert len(search_titles(backend, '')) == 3
+
+    def test_tokenize_lowercases_and_splits_words(self):
+        assert tokenize('Red-Apple, 2kg!') == ['red', 'apple', '2kg']
+
+
+@pytest.mark.django_db
+class TestSearchView:
+    def test_if_results_are_paged_by_cursor_returns_every_match(self, client, settings):
+        settings.KEYSET_PAGINATION_THRESHOLD = 1
+        baker.make(Product, title='Pear', description='',
+                   status=Product.ACTIVE, _quantity=20)
+
+        first_page = client.get('/search/?query=pea').context['products']
+        second_page = client.get(
+            f'/search/?query=pea&cursor={first_page.next_cursor}').context['products']
+
+        ids = [product.id for product in first_page] + \
+            [product.id for product in second_page]
+        assert len(set(ids)) == 20
+        assert not second_page.has_next()
@@ -0,0 +1,88 @@
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+import pytest
+
+from store.sessions import SessionStore
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def make_session(**data):
+    session = SessionStore()
+    session.update(data)
+    session.save()
+    return session
+
+
+@pytest.mark.django_db
+class TestSessionStore:
+    def test_if_session_is_saved_loads_it_back(self, django_assert_num_queries):
+        session = make_session(cart={'1': {'quantity': 2, 'unit_price': '9.99'}})
+
+        with django_assert_num_queries(0):
+            loaded = SessionStore(session.session_key)
+            assert loaded['cart'] == {'1': {'quantity': 2, 'unit_price': '9.99'}}
+
+    def test_if_session_is_saved_stores_compact_json(self):
+        session = make_session(cart_count=1)
+
+        assert cache.get(session.cache_key) == '{"cart_count":1}'
+
+    def test_if_session_is_unchanged_only_refreshes_expiry(self):
+        session = make_session(cart_count=1)
+        loaded = SessionStore(session.session_key)
+        loaded['cart_count'] = 1
+
+        with patch.object(cache, 'set') as cache_set, patch.object(cache, 'touch') as cache_touch:
+            loaded.save()
+
+        cache_set.assert_not_called()
+        cache_touch.assert_called_once_with(loaded.cache_key, 86400)
+
+    def test_if_session_is_missing_starts_empty(self):
+        session = SessionStore('missingsessionkey0000000000000000')
+
+        assert session.load() == {}
+        assert session.session_key is None
+
+    def test_if_session_is_only_in_database_moves_it(self, settings):
+        settings.SESSION_MIGRATE_FROM_DB = True
+        db_session = DBSessionStore()
+        db_session['order_id'] = 7
+        db_session.create()
+
+        session = SessionStore(db_session.session_key)
+
+        assert session['order_id'] == 7
+        assert cache.get(session.cache_key) == '{"order_id":7}'
+        assert not Session.objects.filter(session_key=db_session.session_key).exists()
+
+
+@pytest.mark.django_db
+class TestMigrateSessions:
+    def test_if_command_runs_copies_live_sessions(self):
+        db_session = DBSessionStore()
+        db_session['customer_id'] = 3
+        db_session.create()
+
+        call_command('migrate_sessions', '--delete', stdout=StringIO())
+
+        assert SessionStore(db_session.session_key)['customer_id'] == 3
+        assert not Session.objects.exists()
+
+
+@pytest.mark.django_db
+class TestBenchmarkSessions:
+    def test_if_command_runs_reports_no_queries_for_cache_sessions(self):
+        out = StringIO()
+
+        call_command('benchmark_sessions', '--sessions', '3', '--requests', '3', stdout=out)
+
+        assert 'store.sessions: 0 queries' in out.getvalue()
@@ -0,0 +1,147 @@
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from PIL import Image
+import pytest
+
+from store.models import ProductImage, StoredFile
+from store.tasks import generate_thumbnail
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def make_image_bytes(color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (400, 300), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def make_upload(name='photo.jpg', color='red'):
+    return SimpleUploadedFile(name, make_image_bytes(color), content_type='image/jpeg')
+
+
+@pytest.mark.django_db
+class TestContentAddressedStorage:
+    def test_if_same_image_is_uploaded_twice_stores_one_file(self, media_root):
+        first = baker.make(ProductImage, image=make_upload('first.jpg'))
+        second = baker.make(ProductImage, image=make_upload('second.JPG'))
+
+        assert first.image.name == second.image.name
+        assert first.image.name.endswith('.jpg')
+        assert len(list((media_root / 'uploads/product_images').rglob('*.jpg'))) == 1
+
+    def test_if_images_differ_stores_both(self):
+        first = baker.make(ProductImage, image=make_upload(color='red'))
+        second = baker.make(ProductImage, image=make_upload(color='blue'))
+
+        assert first.image.name != second.image.name
+
+    def test_if_shared_image_is_deleted_keeps_file_until_last_reference(self, django_capture_on_commit_callbacks):
+        first = baker.make(ProductImage, image=make_upload())
+        second = baker.make(ProductImage, image=make_upload())
+        storage = first.image.storage
+        name = first.image.name
+
+        with django_capture_on_commit_callbacks(execute=True):
+            first.delete()
+        assert storage.exists(name)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            second.delete()
+        assert not storage.exists(name)
+
+    def test_if_thumbnail_exists_for_same_image_reuses_it(self, monkeypatch):
+        first = baker.make(ProductImage, image=make_upload())
+        generate_thumbnail(first.id)
+        first.refresh_from_db()
+        second = baker.make(ProductImage, image=make_upload())
+
+        def fail(*args):
+            raise AssertionError('Thumbnail was generated again')
+        monkeypatch.setattr(ProductImage, 'make_thumbnail', fail)
+        generate_thumbnail(second.id)
+
+        second.refresh_from_db()
+        assert second.thumbnail.name == first.thumbnail.name
+        assert second.thumbnail_status == ProductImage.THUMBNAIL_READY
+
+    def test_if_file_is_saved_or_released_locks_its_name(self, django_capture_on_commit_callbacks):
+        with CaptureQueriesContext(connection) as queries:
+            product_image = baker.make(ProductImage, image=make_upload())
+        name = product_image.image.name
+
+        assert StoredFile.objects.filter(name=name).exists()
+        assert any('store_storedfile' in query['sql'] for query in queries)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image.delete()
+        assert not StoredFile.objects.filter(name=name).exists()
+
+    def test_if_last_reference_was_released_upload_writes_file_again(self, django_capture_on_commit_callbacks):
+        first = baker.make(ProductImage, image=make_upload())
+        with django_capture_on_commit_callbacks(execute=True):
+            first.delete()
+
+        second = baker.make(ProductImage, image=make_upload())
+
+        assert second.image.name == first.image.name
+        assert second.image.storage.exists(second.image.name)
+
+    def test_if_shared_thumbnail_was_released_generates_new_one(self):
+        first = baker.make(ProductImage, image=make_upload())
+        generate_thumbnail(first.id)
+        first.refresh_from_db()
+        first.thumbnail.storage.delete(first.thumbnail.name)
+        second = baker.make(ProductImage, image=make_upload())
+
+        generate_thumbnail(second.id)
+
+        second.refresh_from_db()
+        assert second.thumbnail_status == ProductImage.THUMBNAIL_READY
+        assert second.thumbnail.storage.exists(second.thumbnail.name)
+
+
+@pytest.mark.django_db
+class TestDedupeProductImages:
+    def test_if_legacy_files_are_identical_merges_them(self, media_root):
+        legacy_storage = FileSystemStorage()
+        content = make_image_bytes()
+        first_name = legacy_storage.save(
+            'uploads/product_images/first.jpg', ContentFile(content))
+        second_name = legacy_storage.save(
+            'uploads/product_images/second.jpg', ContentFile(content))
+        first = baker.make(ProductImage)
+        second = baker.make(ProductImage)
+        ProductImage.objects.filter(pk=first.pk).update(image=first_name)
+        ProductImage.objects.filter(pk=second.pk).update(image=second_name)
+
+        call_command('dedupe_product_images')
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert first.image.name == second.image.name
+        assert first.image.storage.exists(first.image.name)
+        assert not legacy_storage.exists(first_name)
+        assert not legacy_storage.exists(second_name)
+
+    def test_if_dry_run_changes_nothing(self, media_root):
+        legacy_storage = FileSystemStorage()
+        name = legacy_storage.save(
+            'uploads/product_images/legacy.jpg', ContentFile(make_image_bytes()))
+        product_image = baker.make(ProductImage)
+        ProductImage.objects.filter(pk=product_image.pk).update(image=name)
+
+        call_command('dedupe_product_images', '--dry-run')
+
+        product_image.refresh_from_db()
+        assert product_image.image.name == name
+        assert legacy_storage.exists(name)
@@ -0,0 +1,151 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.mail import BadHeaderError
+from django.utils import timezone
+from model_bakery import baker
+import pytest
+
+from store.checkout import complete_order
+from store.models import Customer, Order, OrderItem, Product
+from store.signals import order_created
+from store.tasks import process_paid_order, send_missing_confirmations
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def order():
+    customer = baker.make(Customer, user=baker.make(User, email='buyer@example.com'))
+    order = baker.make(Order, customer=customer, total_price=6)
+    baker.make(OrderItem, order=order, product=baker.make(Product, title='Green tea'), quantity=2, unit_price=3)
+    return order
+
+
+@pytest.fixture
+def paid_client(client, order):
+    session = client.session
+    session['customer_id'] = order.customer_id
+    session['order_id'] = order.id
+    session['cart'] = {'1': {'quantity': 1, 'unit_price': '3.00'}}
+    session['cart_count'] = 1
+    session.save()
+    return client
+
+
+@pytest.mark.django_db
+class TestSuccess:
+    def test_if_customer_returns_clears_cart_without_calling_stripe(self, paid_client, order):
+        with patch('stripe.checkout.Session.retrieve') as retrieve:
+            response = paid_client.get('/cart/success/?session_id=cs_test')
+
+        order.refresh_from_db()
+        assert response.status_code == 200
+        assert 'cart' not in paid_client.session
+        retrieve.assert_not_called()
+        assert order.payment_status == Order.PAYMENT_STATUS_PENDING
+
+
+@pytest.mark.django_db
+class TestCompleteOrder:
+    def test_if_order_is_completed_twice_queues_confirmation_once(self, order, django_capture_on_commit_callbacks):
+        with patch('store.tasks.process_paid_order.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                assert complete_order(order)
+                assert not complete_order(order)
+
+        order.refresh_from_db()
+        assert order.payment_status == Order.PAYMENT_STATUS_COMPLETE
+        delay.assert_called_once_with(order.id)
+
+
+@pytest.mark.django_db
+class TestProcessPaidOrder:
+    def test_if_task_runs_twice_sends_one_email_and_signal(self, order, mailoutbox):
+        Order.objects.filter(pk=order.pk).update(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        received = []
+
+        def receiver(sender, **kwargs):
+            received.append(kwargs['order'].id)
+        order_created.connect(receiver)
+        try:
+            process_paid_order(order.id)
+            process_paid_order(order.id)
+        finally:
+            order_created.disconnect(receiver)
+
+        order.refresh_from_db()
+        assert len(mailoutbox) == 1
+        assert 'Green tea' in mailoutbox[0].message().as_string()
+        assert received == [order.id]
+        assert order.confirmation_sent_at is not None
+
+    def test_if_order_is_unpaid_does_nothing(self, order, mailoutbox):
+        process_paid_order(order.id)
+
+        assert mailoutbox == []
+
+    def test_if_mail_server_fails_leaves_order_unconfirmed(self, order):
+        Order.objects.filter(pk=order.pk).update(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+
+        with patch('templated_mail.mail.BaseEmailMessage.send', side_effect=OSError('down')):
+            with pytest.raises(OSError):
+                process_paid_order(order.id)
+
+        order.refresh_from_db()
+        assert order.confirmation_sent_at is None
+
+    def test_if_mail_server_fails_still_signals_order_created_once(self, order):
+        Order.objects.filter(pk=order.pk).update(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        received = []
+
+        def receiver(sender, **kwargs):
+            received.append(kwargs['order'].id)
+        order_created.connect(receiver)
+        try:
+            with patch('templated_mail.mail.BaseEmailMessage.send', side_effect=OSError('down')):
+                for _ in range(2):
+                    with pytest.raises(OSError):
+                        process_paid_order(order.id)
+        finally:
+            order_created.disconnect(receiver)
+
+        order.refresh_from_db()
+        assert received == [order.id]
+        assert order.order_created_sent_at is not None
+
+    def test_if_header_is_invalid_leaves_order_unconfirmed(self, order, mailoutbox):
+        Order.objects.filter(pk=order.pk).update(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+
+        with patch('templated_mail.mail.BaseEmailMessage.send', side_effect=BadHeaderError):
+            process_paid_order(order.id)
+
+        order.refresh_from_db()
+        assert order.confirmation_sent_at is None
+
+    def test_if_confirmation_is_being_sent_does_not_send_it_again(self, order, mailoutbox):
+        Order.objects.filter(pk=order.pk).update(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        cache.add(f'store:confirmation:sending:{order.id}', True)
+
+        process_paid_order(order.id)
+
+        assert mailoutbox == []
+
+
+@pytest.mark.django_db
+class TestSendMissingConfirmations:
+    def test_if_paid_orders_are_unconfirmed_queues_recent_ones(self, order):
+        Order.objects.filter(pk=order.pk).update(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        old_order = baker.make(Order, payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        Order.objects.filter(pk=old_order.pk).update(created_at=timezone.now() - timedelta(days=30))
+        baker.make(Order, payment_status=Order.PAYMENT_STATUS_COMPLETE, confirmation_sent_at=timezone.now())
+        baker.make(Order)
+
+        with patch('store.tasks.process_paid_order.delay') as delay:
+            assert send_missing_confirmations() == 1
+
+        delay.assert_called_once_with(order.id)
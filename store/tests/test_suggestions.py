@@ -0,0 +1,144 @@
+from django.core.cache import cache
+from django.db import transaction
+from model_bakery import baker
+from rest_framework import status
+import pytest
+
+from store.models import Category, Product, Vendor
+from store.suggestions import PrefixTrie, Suggestion, SuggestionIndex, SUGGESTION_CHANGE_KEY, get_suggestion_version, suggestion_index, suggestion_keys
+
+
+@pytest.fixture
+def get_suggestions(client):
+    suggestion_index.trie = None
+
+    def _get_suggestions(query, **params):
+        return client.get('/search/suggestions/', {'query': query, **params})
+    return _get_suggestions
+
+
+def make_suggestion(id, label, weight=1):
+    return Suggestion('product', id, label, f'/product/{id}/', weight)
+
+
+class TestPrefixTrie:
+    def test_if_prefix_matches_any_word_returns_suggestion(self):
+        trie = PrefixTrie()
+        pie = make_suggestion(1, 'Red apple pie')
+        for key in suggestion_keys(pie.label):
+            trie.insert(key, pie)
+
+        assert trie.search('app', 5) == [pie]
+        assert trie.search('red a', 5) == [pie]
+        assert trie.search('pear', 5) == []
+
+    def test_if_suggestion_is_removed_returns_remaining(self):
+        trie = PrefixTrie()
+        apple = make_suggestion(1, 'Apple')
+        apricot = make_suggestion(2, 'Apricot')
+        trie.insert('apple', apple)
+        trie.insert('apricot', apricot)
+        trie.search('ap', 5)
+
+        trie.remove('apple', apple)
+
+        assert trie.search('ap', 5) == [apricot]
+        assert 'p' not in trie.root.children['a'].children['p'].children
+
+    def test_if_limit_is_given_returns_highest_weight_first(self):
+        trie = PrefixTrie()
+        for id in range(10):
+            trie.insert(f'item {id}', make_suggestion(id, f'Item {id}'))
+        heavy = make_suggestion(99, 'Item heavy', weight=3)
+        trie.insert('item heavy', heavy)
+
+        suggestions = trie.search('item', 3)
+
+        assert suggestions[0] == heavy
+        assert len(suggestions) == 3
+
+
+@pytest.mark.django_db
+class TestSearchSuggestions:
+    def test_if_prefix_matches_returns_products_categories_and_vendors(self, get_suggestions):
+        category = baker.make(Category, title='Fruit')
+        baker.make(Product, title='Fresh fruit box',
+                   category=category, status=Product.ACTIVE)
+        baker.make(Vendor, shop_name='Fruitful farm')
+
+        response = get_suggestions('fru')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [suggestion['type'] for suggestion in response.json()['suggestions']] == [
+            'category', 'vendor', 'product']
+        assert 'public' in response['Cache-Control']
+
+    def test_if_index_is_built_runs_no_query_per_keystroke(self, get_suggestions, django_assert_num_queries):
+        baker.make(Product, title='Banana', status=Product.ACTIVE)
+        get_suggestions('b')
+
+        with django_assert_num_queries(0):
+            response = get_suggestions('ban')
+
+        assert response.json()['suggestions'][0]['label'] == 'Banana'
+
+    def test_if_product_is_changed_updates_suggestions(self, get_suggestions, django_capture_on_commit_callbacks):
+        product = baker.make(Product, title='Banana', status=Product.ACTIVE)
+        get_suggestions('ban')
+
+        product.title = 'Mango'
+        with django_capture_on_commit_callbacks(execute=True):
+            product.save()
+
+        assert get_suggestions('ban').json()['suggestions'] == []
+        assert get_suggestions('man').json()['suggestions'][0]['label'] == 'Mango'
+
+    def test_if_product_is_not_active_returns_no_suggestion(self, get_suggestions):
+        baker.make(Product, title='Banana', status=Product.DRAFT)
+
+        assert get_suggestions('ban').json()['suggestions'] == []
+
+
+@pytest.mark.django_db
+class TestSuggestionIndexSync:
+    def test_if_other_worker_changed_rows_replays_changes(self, django_assert_num_queries,
+                                                          django_capture_on_commit_callbacks):
+        product = baker.make(Product, title='Banana', status=Product.ACTIVE)
+        worker = SuggestionIndex()
+        worker.suggest('ban')
+
+        product.title = 'Mango'
+        with django_capture_on_commit_callbacks(execute=True):
+            product.save()
+            baker.make(Category, title='Manuka honey')
+
+        with django_assert_num_queries(0):
+            suggestions = worker.suggest('man')
+
+        assert [suggestion.label for suggestion in suggestions] == ['Manuka honey', 'Mango']
+        assert worker.suggest('ban') == []
+
+    def test_if_change_log_is_gone_rebuilds_from_database(self, django_capture_on_commit_callbacks):
+        product = baker.make(Product, title='Banana', status=Product.ACTIVE)
+        worker = SuggestionIndex()
+        worker.suggest('ban')
+        product.title = 'Mango'
+        with django_capture_on_commit_callbacks(execute=True):
+            product.save()
+        cache.delete(SUGGESTION_CHANGE_KEY.format(get_suggestion_version()))
+
+        suggestions = worker.suggest('man')
+
+        assert [suggestion.label for suggestion in suggestions] == ['Mango']
+
+    def test_if_write_rolls_back_publishes_nothing(self):
+        worker = SuggestionIndex()
+        worker.suggest('ban')
+        version = get_suggestion_version()
+
+        with pytest.raises(RuntimeError), transaction.atomic():
+            baker.make(Product, title='Banana', status=Product.ACTIVE)
+            raise RuntimeError
+
+        assert get_suggestion_version() == version
+        assert worker.suggest('ban') == []
@@ -0,0 +1,181 @@
+from io import BytesIO
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from model_bakery import baker
+from PIL import Image
+import pytest
+
+from store.models import ProductImage, ProductImageVariant
+from store.serializers import ProductImageSerializer
+from store.tasks import generate_image_variants, generate_thumbnail
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def make_upload(name='photo.jpg', size=(800, 600)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@pytest.mark.django_db
+class TestGenerateThumbnail:
+    def test_if_image_is_pending_returns_placeholder(self):
+        product_image = baker.make(ProductImage, image=make_upload())
+
+        assert product_image.get_thumbnail() == ProductImage.DEFAULT_IMAGE_URL
+
+    def test_if_task_runs_creates_thumbnail(self):
+        product_image = baker.make(ProductImage, image=make_upload())
+
+        generate_thumbnail(product_image.id)
+
+        product_image.refresh_from_db()
+        assert product_image.thumbnail_status == ProductImage.THUMBNAIL_READY
+        assert Image.open(product_image.thumbnail).size == (300, 225)
+        assert product_image.get_thumbnail() == product_image.thumbnail.url
+
+    def test_if_task_runs_twice_keeps_first_thumbnail(self):
+        product_image = baker.make(ProductImage, image=make_upload())
+        generate_thumbnail(product_image.id)
+        product_image.refresh_from_db()
+        first_thumbnail = product_image.thumbnail.name
+
+        generate_thumbnail(product_image.id)
+
+        product_image.refresh_from_db()
+        assert product_image.thumbnail.name == first_thumbnail
+
+    def test_if_image_is_unreadable_marks_failed(self):
+        product_image = baker.make(ProductImage, image=SimpleUploadedFile(
+            'broken.jpg', b'not an image', content_type='image/jpeg'))
+
+        generate_thumbnail(product_image.id)
+
+        product_image.refresh_from_db()
+        assert product_image.thumbnail_status == ProductImage.THUMBNAIL_FAILED
+        assert product_image.get_thumbnail() == ProductImage.DEFAULT_IMAGE_URL
+
+    def test_if_image_was_deleted_does_nothing(self):
+        generate_thumbnail(999999)
+
+
+@pytest.mark.django_db
+class TestGetThumbnail:
+    def test_if_thumbnail_is_missing_runs_no_query(self, django_assert_num_queries):
+        product_image = baker.make(ProductImage, image=make_upload())
+        cache.clear()
+
+        with django_assert_num_queries(0):
+            url = product_image.get_thumbnail()
+
+        assert url == ProductImage.DEFAULT_IMAGE_URL
+
+    def test_if_thumbnail_is_missing_queues_it_once(self, django_capture_on_commit_callbacks):
+        product_image = baker.make(ProductImage, image=make_upload())
+        cache.clear()
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            product_image.get_thumbnail()
+            ProductImage.objects.get(pk=product_image.pk).get_thumbnail()
+
+        assert len(callbacks) == 1
+
+    def test_if_thumbnail_failed_queues_nothing(self, django_capture_on_commit_callbacks):
+        product_image = baker.make(ProductImage, image=make_upload(),
+                                   thumbnail_status=ProductImage.THUMBNAIL_FAILED)
+        cache.clear()
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            product_image.get_thumbnail()
+
+        assert callbacks == []
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBackfillThumbnails:
+    def test_if_run_in_sync_mode_generates_missing_thumbnails(self, settings):
+        if connection.vendor == 'sqlite':
+            pytest.skip('The in-memory SQLite test database rejects concurrent writers')
+        settings.PRODUCT_IMAGE_VARIANT_WIDTHS = [160]
+        settings.PRODUCT_IMAGE_VARIANT_FORMATS = ['jpeg']
+        product_images = baker.make(
+            ProductImage, image=make_upload, _quantity=3, _create_files=True)
+
+        call_command('backfill_thumbnails', '--sync',
+                     '--workers=2', stdout=None)
+
+        assert ProductImage.objects.filter(
+            thumbnail_status=ProductImage.THUMBNAIL_READY).count() == 3
+        assert ProductImageVariant.objects.count() == 3
+
+
+@pytest.mark.django_db
+class TestGenerateImageVariants:
+    def test_if_task_runs_creates_each_width_and_format(self, settings):
+        settings.PRODUCT_IMAGE_VARIANT_WIDTHS = [160, 320, 1024]
+        settings.PRODUCT_IMAGE_VARIANT_FORMATS = ['webp', 'jpeg']
+        product_image = baker.make(ProductImage, image=make_upload())
+
+        generate_image_variants(product_image.id)
+
+        variants = ProductImageVariant.objects.filter(
+            product_image=product_image)
+        assert sorted(variants.values_list('format', 'width', 'height')) == [
+            ('jpeg', 160, 120), ('jpeg', 320, 240), ('webp', 160, 120), ('webp', 320, 240)]
+        assert all(variant.size == variant.file.size for variant in variants)
+
+    def test_if_task_runs_twice_creates_no_duplicates(self, settings):
+        settings.PRODUCT_IMAGE_VARIANT_WIDTHS = [160]
+        settings.PRODUCT_IMAGE_VARIANT_FORMATS = ['webp']
+        product_image = baker.make(ProductImage, image=make_upload())
+        generate_image_variants(product_image.id)
+
+        generate_image_variants(product_image.id)
+
+        assert product_image.variants.count() == 1
+
+    def test_if_image_is_very_tall_stores_actual_width(self, settings):
+        settings.PRODUCT_IMAGE_VARIANT_WIDTHS = [160, 320]
+        settings.PRODUCT_IMAGE_VARIANT_FORMATS = ['webp']
+        product_image = baker.make(ProductImage, image=make_upload(size=(400, 2000)))
+        generate_image_variants(product_image.id)
+
+        generate_image_variants(product_image.id)
+
+        assert sorted(product_image.variants.values_list('width', 'height')) == [(128, 640), (256, 1280)]
+        assert all(variant.width == Image.open(variant.file).width for variant in product_image.variants.all())
+
+    def test_if_image_is_replaced_drops_stale_variants(self, settings):
+        settings.PRODUCT_IMAGE_VARIANT_WIDTHS = [160]
+        settings.PRODUCT_IMAGE_VARIANT_FORMATS = ['webp']
+        product_image = baker.make(ProductImage, image=make_upload())
+        generate_image_variants(product_image.id)
+
+        product_image.image = make_upload('other.jpg')
+        product_image.save()
+        generate_image_variants(product_image.id)
+
+        assert list(product_image.variants.values_list('source', flat=True)) == [
+            product_image.image.name]
+
+    def test_if_variants_exist_renders_picture_sources(self, settings):
+        settings.PRODUCT_IMAGE_VARIANT_WIDTHS = [160, 320]
+        settings.PRODUCT_IMAGE_VARIANT_FORMATS = ['webp', 'jpeg']
+        product_image = baker.make(ProductImage, image=make_upload())
+        generate_image_variants(product_image.id)
+
+        html = Template('{% load images %}{% responsive_image product_image %}').render(
+            Context({'product_image': product_image}))
+        srcset = ProductImageSerializer(product_image).data['srcset']
+
+        assert '<source type="image/webp"' in html
+        assert list(srcset) == ['image/webp', 'image/jpeg']
+        assert srcset['image/webp'].endswith('320w')
@@ -0,0 +1,166 @@
+import json
+from unittest.mock import patch
+from django.db import OperationalError
+from django.utils import timezone
+from model_bakery import baker
+import pytest
+
+from store import checkout
+from store.models import Order, OrderItem, Product, StripeEvent
+from store.inventory import reserve_stock
+from store.tasks import process_stripe_events
+
+
+@pytest.fixture
+def order():
+    order = baker.make(Order, total_price=6)
+    product = baker.make(Product, inventory=5)
+    baker.make(OrderItem, order=order, product=product, quantity=2, unit_price=3)
+    reserve_stock(order, [(product.id, 2)])
+    return order
+
+
+@pytest.mark.django_db
+class TestStripeWebhook:
+    def test_if_signature_is_valid_stores_event(self, stripe_stand_in, order, django_capture_on_commit_callbacks):
+        payload = stripe_stand_in.load_event('checkout.session.completed', order_id=order.id)
+
+        with patch('store.tasks.process_stripe_events.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = stripe_stand_in.send(payload)
+
+        event = StripeEvent.objects.get()
+        assert response.status_code == 200
+        assert event.type == 'checkout.session.completed'
+        assert event.payload == json.loads(payload)
+        delay.assert_called_once_with()
+
+    def test_if_signature_is_wrong_returns_400(self, stripe_stand_in, order):
+        payload = stripe_stand_in.load_event('checkout.session.completed', order_id=order.id)
+
+        response = stripe_stand_in.send(payload, stripe_stand_in.sign(payload, secret='whsec_other'))
+
+        assert response.status_code == 400
+        assert not StripeEvent.objects.exists()
+
+    def test_if_event_is_redelivered_stores_it_once(self, stripe_stand_in, order):
+        payload = stripe_stand_in.load_event('checkout.session.completed', order_id=order.id)
+
+        with patch('store.tasks.process_stripe_events.delay'):
+            stripe_stand_in.send(payload)
+            response = stripe_stand_in.send(payload)
+
+        assert response.status_code == 200
+        assert StripeEvent.objects.count() == 1
+
+
+@pytest.mark.django_db
+class TestProcessStripeEvents:
+    def test_if_checkout_completed_marks_order_paid(self, stripe_stand_in, order):
+        with patch('store.tasks.process_stripe_events.delay'), patch('store.tasks.process_paid_order.delay'):
+            stripe_stand_in.send(stripe_stand_in.load_event('checkout.session.completed', order_id=order.id))
+            stripe_stand_in.send(stripe_stand_in.load_event('checkout.session.expired', order_id=order.id))
+
+            assert process_stripe_events() == 2
+
+        order.refresh_from_db()
+        assert order.payment_status == Order.PAYMENT_STATUS_COMPLETE
+        assert order.payment_intent == 'pi_3QfJ2hLkdIwHu7ix0Zb6wQ1c'
+        assert order.reservations.get().status == 'C'
+        assert not StripeEvent.objects.filter(processed_at__isnull=True).exists()
+
+    def test_if_events_are_processed_again_does_nothing(self, stripe_stand_in, order):
+        with patch('store.tasks.process_stripe_events.delay'), patch('store.tasks.process_paid_order.delay'):
+            stripe_stand_in.send(stripe_stand_in.load_event('checkout.session.completed', order_id=order.id))
+            process_stripe_events()
+
+            assert process_stripe_events() == 0
+
+    def test_if_batch_is_small_processes_every_event(self, stripe_stand_in, settings):
+        settings.STRIPE_EVENT_BATCH_SIZE = 2
+        orders = [baker.make(Order) for _ in range(5)]
+        with patch('store.tasks.process_stripe_events.delay'), patch('store.tasks.process_paid_order.delay'):
+            for index, paid_order in enumerate(orders):
+                payload = stripe_stand_in.load_event('checkout.session.completed', order_id=paid_order.id)
+                stripe_stand_in.send(payload.replace('evt_1QfJ2kLkdIwHu7ix8pVfIYxB', f'evt_{index}'))
+
+            assert process_stripe_events() == 5
+
+        assert Order.objects.filter(payment_status=Order.PAYMENT_STATUS_COMPLETE).count() == 5
+
+    def test_if_one_event_fails_processes_rest_of_batch(self, stripe_stand_in, order):
+        failing_order = baker.make(Order, total_price=6)
+        payloads = [
+            stripe_stand_in.load_event('checkout.session.completed', order_id='not-a-number'),
+            stripe_stand_in.load_event('checkout.session.completed', order_id=failing_order.id),
+            stripe_stand_in.load_event('checkout.session.completed', order_id=order.id),
+        ]
+        commit_stock = checkout.commit_stock
+
+        def fail_for_one_order(paid_order):
+            if paid_order.id == failing_order.id:
+                raise RuntimeError('Stock ledger is down')
+            commit_stock(paid_order)
+        with patch('store.tasks.process_stripe_events.delay'), patch('store.tasks.process_paid_order.delay'), \
+                patch('store.checkout.commit_stock', side_effect=fail_for_one_order):
+            for index, payload in enumerate(payloads):
+                stripe_stand_in.send(payload.replace('evt_1QfJ2kLkdIwHu7ix8pVfIYxB', f'evt_{index}'))
+
+            assert process_stripe_events() == 3
+
+        failing_order.refresh_from_db()
+        order.refresh_from_db()
+        assert order.payment_status == Order.PAYMENT_STATUS_COMPLETE
+        assert failing_order.payment_status == Order.PAYMENT_STATUS_PENDING
+        events = {event.event_id: event for event in StripeEvent.objects.all()}
+        assert 'ValueError' in events['evt_0'].error
+        assert events['evt_0'].processed_at is not None
+        assert 'Stock ledger is down' in events['evt_1'].error
+        assert events['evt_1'].processed_at is None
+        assert events['evt_1'].attempts == 1
+        assert events['evt_2'].error == ''
+        assert events['evt_2'].processed_at is not None
+
+    def test_if_payment_fails_once_retries_it_in_a_later_batch(self, stripe_stand_in, order):
+        commit_stock = checkout.commit_stock
+        calls = []
+
+        def fail_once(paid_order):
+            calls.append(paid_order.id)
+            if len(calls) == 1:
+                raise OperationalError('Deadlock found when trying to get lock')
+            commit_stock(paid_order)
+        with patch('store.tasks.process_stripe_events.delay'), patch('store.tasks.process_paid_order.delay'), \
+                patch('store.checkout.commit_stock', side_effect=fail_once):
+            stripe_stand_in.send(stripe_stand_in.load_event('checkout.session.completed', order_id=order.id))
+
+            assert process_stripe_events() == 1
+            event = StripeEvent.objects.get()
+            assert event.processed_at is None
+            assert event.attempts == 1
+            assert event.next_attempt_at > timezone.now()
+            assert process_stripe_events() == 0
+
+            StripeEvent.objects.update(next_attempt_at=timezone.now())
+            assert process_stripe_events() == 1
+
+        order.refresh_from_db()
+        event.refresh_from_db()
+        assert order.payment_status == Order.PAYMENT_STATUS_COMPLETE
+        assert event.processed_at is not None
+        assert event.error == ''
+
+    def test_if_payment_keeps_failing_gives_up_after_max_attempts(self, stripe_stand_in, order, settings):
+        settings.STRIPE_EVENT_MAX_ATTEMPTS = 2
+        with patch('store.tasks.process_stripe_events.delay'), patch('store.tasks.process_paid_order.delay'), \
+                patch('store.checkout.commit_stock', side_effect=OperationalError('Lock wait timeout exceeded')):
+            stripe_stand_in.send(stripe_stand_in.load_event('checkout.session.completed', order_id=order.id))
+
+            process_stripe_events()
+            StripeEvent.objects.update(next_attempt_at=timezone.now())
+            process_stripe_events()
+
+        event = StripeEvent.objects.get()
+        assert event.attempts == 2
+        assert event.processed_at is not None
+        assert 'Lock wait timeout' in event.error
@@ -1,66 +1,95 @@
+import json
 import requests
 import stripe
 import logging
 from django.db import transaction
 from django.conf import settings
 from django.core.paginator import Paginator
-from django.http import BadHeaderError, HttpResponseBadRequest, JsonResponse
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.db.models import Q, F, Prefetch, Count
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.db.models import Prefetch, Count
 from django.contrib.auth.models import User
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import action
-from rest_framework.renderers import TemplateHTMLRenderer
+from rest_framework.renderers import JSONRenderer, TemplateHTMLRenderer
 from rest_framework import status, permissions
-from templated_mail.mail import BaseEmailMessage
 
 
+from .breadcrumbs import add_breadcrumb
 from .cart import Cart
-from .signals import order_created
-from .pagination import DefaultPagination
-from .filters import ProductFilter, ProductViewFilter
+from .counts import count_products, format_product_count, is_estimate
+from .pagination import CountedPaginator, DefaultPagination, KeysetPaginator
+from .filters import ProductCardFilter, ProductCardViewFilter, ProductFilter, ProductViewFilter
+from .checkout import CheckoutError, create_order, get_line_items
+from .inventory import extend_reservations, release_order
+from .outbound import CircuitOpenError, create_checkout_session
 from .forms import AddressForm, CustomerForm, ReviewForm
-from .models import Address, Category, Customer, Order, OrderItem, Product, ProductImage, Review
-from .serializers import CategorySerializer, CustomerSerializer, OrderItemSerializer, OrderSerializer, ProductSerializer, ReviewSerializer
+from .models import Address, Category, Customer, Order, OrderItem, Product, ProductCard, ProductImage, Review
+from .serializers import CategorySerializer, CustomerSerializer, OrderItemSerializer, OrderSerializer, ProductCardSerializer, ProductSerializer, ReviewSerializer
+from .renderers import StreamingJSONRenderer
 from .permissions import IsAdminOrReadOnly, ViewCustomerHistoryPermission
+from .search import get_search_backend
+from .suggestions import suggestion_index
+from .tasks import enqueue_stripe_events
+from .webhooks import record_event
 
 logger = logging.getLogger(__name__)
 
 
-def pagination(request, object, page_Item_numbers=16):
-    paginator = Paginator(object, page_Item_numbers)
+SORT_ORDERINGS = {
+    'price_asc': 'unit_price',
+    'price_desc': '-unit_price',
+    'title_asc': 'title',
+    'title_desc': '-title',
+}
+
+
+def pagination(request, object, page_Item_numbers=16, ordering=None, count=None):
+    if count is not None and (count > settings.KEYSET_PAGINATION_THRESHOLD or is_estimate(count)):
+        paginator = KeysetPaginator(object, page_Item_numbers, ordering)
+        return paginator.get_page(request.GET.get('cursor'))
+
+    if count is not None:
+        paginator = CountedPaginator(object, page_Item_numbers, count)
+    else:
+        paginator = Paginator(object, page_Item_numbers)
     page = request.GET.get('page')
     page_objects = paginator.get_page(page)
 
     return page_objects
 
 
-def sort_filter(request, queryset):
+def sort_filter(request, queryset, default_ordering=None):
     sort_by = request.GET.get('sort_by')
-    if sort_by:
-        if sort_by == 'price_asc':
-            queryset = queryset.order_by('unit_price')
-        elif sort_by == 'price_desc':
-            queryset = queryset.order_by('-unit_price')
-        elif sort_by == 'title_asc':
-            queryset = queryset.order_by('title')
-        elif sort_by == 'title_desc':
-            queryset = queryset.order_by('-title')
-
-    product_filter = ProductFilter(request.GET, queryset=queryset)
-    filtered_products = product_filter.qs.prefetch_related(Prefetch(
-        'productimages', queryset=ProductImage.objects.filter(default=True)))
-    page_products = pagination(request, filtered_products)
-    product_count = filtered_products.count()
+    ordering = SORT_ORDERINGS.get(sort_by, default_ordering)
+    if ordering:
+        queryset = queryset.order_by(ordering)
+
+    if queryset.model is ProductCard:
+        # Cards carry their own thumbnail, so the listing stays a single table query
+        product_filter = ProductCardFilter(request.GET, queryset=queryset)
+        filtered_products = product_filter.qs
+    else:
+        product_filter = ProductFilter(request.GET, queryset=queryset)
+        filtered_products = product_filter.qs.prefetch_related(Prefetch(
+            'productimages', queryset=ProductImage.objects.filter(default=True).prefetch_related('variants')))
+    product_count = count_products(filtered_products)
+    page_products = pagination(
+        request, filtered_products, ordering=ordering, count=product_count)
 
     filter_params = request.GET.copy()
-    if 'page' in filter_params:
-        del filter_params['page']
+    if 'page' in filter_params or 'cursor' in filter_params:
+        filter_params.pop('page', None)
+        filter_params.pop('cursor', None)
         request.GET = filter_params
         request.META['QUERY_STRING'] = filter_params.urlencode()
 
@@ -68,21 +97,13 @@ def sort_filter(request, queryset):
         'product_filter': product_filter,
         'filtered_products': filtered_products,
         'products': page_products,
-        'product_count': product_count
+        'product_count': format_product_count(product_count)
     }
     return context
 
 
 def breadcrumb_navigation(request, label):
-    breadcrumb = {'label': label, 'url': request.path}
-    breadcrumbs = request.session.get('breadcrumbs', [])
-
-    breadcrumbs = [item for item in breadcrumbs if item['label'] != label]
-
-    breadcrumbs.append(breadcrumb)
-    breadcrumbs = breadcrumbs[-4:]
-    request.session['breadcrumbs'] = breadcrumbs
-    return breadcrumbs
+    return add_breadcrumb(request, label)
 
 
 def search(request):
@@ -91,17 +112,17 @@ def search(request):
         query = request.GET.get('query', '')
 
         if query:
-            request.session['search_query'] = query
+            if request.session.get('search_query') != query:
+                request.session['search_query'] = query
         else:
             query = request.session.get('search_query', '')
 
-        products = Product.objects.select_related('user', 'category').annotate(vendor_userid=F('user__vendors'), vendor_shop_name=F('user__vendors__shop_name')).filter(status=Product.ACTIVE, deleted=False).filter(
-            Q(title__icontains=query) | Q(description__icontains=query))
+        products = get_search_backend().search(ProductCard.objects.all(), query)
 
         label = f'Search results for { query }'
         breadcrumbs = breadcrumb_navigation(request, label)
 
-        context = sort_filter(request, products)
+        context = sort_filter(request, products, default_ordering='-relevance')
         logger.info('End of search')
     except requests.ConnectionError:
         logger.critical('search is offline')
@@ -109,11 +130,30 @@ def search(request):
     return render(request, 'search.html', {'query': query, 'breadcrumbs': breadcrumbs, **context})
 
 
+def search_suggestions(request):
+    query = request.GET.get('query', '')
+    try:
+        limit = min(int(request.GET.get('limit', 8)),
+                    settings.SEARCH_SUGGESTION_MAX_LIMIT)
+    except ValueError:
+        limit = 8
+
+    suggestions = suggestion_index.suggest(query, limit)
+
+    response = JsonResponse({
+        'query': query,
+        'suggestions': [{'label': suggestion.label, 'type': suggestion.type, 'url': suggestion.url} for suggestion in suggestions]
+    })
+    patch_cache_control(response, public=True,
+                        max_age=settings.SEARCH_SUGGESTION_CACHE_SECONDS)
+    return response
+
+
 def product_detail(request, pk):
     review_form = None
 
     product = get_object_or_404(
-        Product.objects.select_related('user', 'category').prefetch_related('productimages').annotate(vendor_userid=F('user__vendors'), vendor_shop_name=F('user__vendors__shop_name')), pk=pk, status=Product.ACTIVE, deleted=False)
+        Product.objects.visible().with_vendor().select_related('category').prefetch_related('productimages__variants'), pk=pk)
 
     reviews = Review.objects.filter(product_id=pk)
 
@@ -141,10 +181,9 @@ def product_detail(request, pk):
 
 def category_detail(request, pk):
     category = get_object_or_404(Category, pk=pk)
-    products = category.products.select_related('user').annotate(vendor_userid=F('user__vendors'), vendor_shop_name=F('user__vendors__shop_name')).filter(
-        status=Product.ACTIVE, deleted=False)
+    products = ProductCard.objects.filter(category=category)
 
-    context = sort_filter(request, products)
+    context = sort_filter(request, products, default_ordering='-last_update')
 
     breadcrumbs = breadcrumb_navigation(request, category.title)
 
@@ -154,10 +193,9 @@ def category_detail(request, pk):
 def all_categories(request):
     breadcrumbs = breadcrumb_navigation(request, 'All Categories')
     category = Category.objects.all()
-    products = Product.objects.select_related('user').annotate(vendor_userid=F('user__vendors'), vendor_shop_name=F('user__vendors__shop_name')).filter(
-        status=Product.ACTIVE, deleted=False)
+    products = ProductCard.objects.all()
 
-    context = sort_filter(request, products)
+    context = sort_filter(request, products, default_ordering='-last_update')
 
     return render(request, 'category_detail.html', {'category': category, 'breadcrumbs': breadcrumbs, **context})
 
@@ -195,37 +233,27 @@ def cart_view(request):
 
 
 def success(request):
-    with transaction.atomic():
-        breadcrumbs = breadcrumb_navigation(request, 'Success')
-
-        stripe.api_key = settings.STRIPE_SECRET_KEY
-        session = stripe.checkout.Session.retrieve(
-            request.GET.get('session_id', ''))
-        customer_id = request.session.get('customer_id')
-        order_id = request.session.get('order_id')
+    # The order is completed by the Stripe webhook, so this page only thanks the customer
+    breadcrumbs = breadcrumb_navigation(request, 'Success')
 
-        customer = get_object_or_404(Customer, pk=customer_id)
-        order = get_object_or_404(Order, pk=order_id)
+    customer = get_object_or_404(Customer, pk=request.session.get('customer_id'))
+    Cart(request).clear()
 
-        order.payment_status = Order.PAYMENT_STATUS_COMPLETE
-        order.save()
-        cart = Cart(request)
-        total_cost = cart.get_total_cost()
+    return render(request, 'success.html', {'customer': customer, 'breadcrumbs': breadcrumbs})
 
-        try:
-            message = BaseEmailMessage(
-                template_name='emails/checkout_email.html',
-                context={'customer': customer,
-                         'cart': cart, 'total_cost': total_cost}
-            )
-            message.send([customer.user.email])
-        except BadHeaderError:
-            return HttpResponseBadRequest('Invalid header value')
 
-        cart.clear()
-        order_created.send_robust(request.__class__, order=order)
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    try:
+        stripe.Webhook.construct_event(
+            request.body, request.headers.get('Stripe-Signature', ''), settings.STRIPE_WEBHOOK_SECRET)
+    except (ValueError, stripe.SignatureVerificationError):
+        return HttpResponseBadRequest('Invalid Stripe event')
 
-        return render(request, 'success.html', {'customer': customer, 'breadcrumbs': breadcrumbs})
+    if record_event(json.loads(request.body)):
+        transaction.on_commit(enqueue_stripe_events)
+    return HttpResponse(status=200)
 
 
 @login_required
@@ -283,16 +311,19 @@ def checkout(request):
                 address.customer = customer
                 address.save()
 
-                order.customer = customer
-                order.total_price = total_cost
-                order.save()
+                # Going back and submitting the address again starts a new order, so the
+                # stock held by the previous attempt is given back first
+                pending_order = Order.objects.filter(
+                    pk=request.session.pop('order_id', None), customer=customer).first()
+                if pending_order is not None:
+                    release_order(pending_order)
+
+                try:
+                    order = create_order(customer, cart)
+                except CheckoutError as exc:
+                    messages.error(request, str(exc))
+                    return redirect('cart')
                 request.session['order_id'] = order.id
-                for item in cart:
-                    product = get_object_or_404(Product, pk=int(item['id']))
-                    quantity = int(item['quantity'])
-                    unit_price = float(item['unit_price'])
-                    OrderItem.objects.create(
-                        order=order, product=product, quantity=quantity, unit_price=unit_price)
                 show_customer_form = False
                 show_address_form = False
                 show_summary_form = True
@@ -301,35 +332,28 @@ def checkout(request):
                 show_address_form = True
                 show_summary_form = False
         else:
-            with transaction.atomic():
-                line_items = []
-                for item in cart:
-                    product = get_object_or_404(Product, pk=int(item['id']))
-                    line_items.append({
-                        'price_data': {
-                            'currency': 'usd',
-                            'product_data': {
-                                'name': product.title,
-                            },
-                            'unit_amount': int(product.unit_price * 100),
-                        },
-                        'quantity': int(item['quantity'])
-                    })
-
-                stripe.api_key = settings.STRIPE_SECRET_KEY
-                session = stripe.checkout.Session.create(
+            order = get_object_or_404(
+                Order, pk=request.session.get('order_id'))
+            line_items = get_line_items(order)
+            expires_at = extend_reservations(order)
+
+            try:
+                session = create_checkout_session(
                     line_items=line_items,
+                    expires_at=int(expires_at.timestamp()),
+                    client_reference_id=str(order.id),
+                    metadata={'order_id': str(order.id)},
                     payment_method_types=['card'],
                     mode='payment',
                     success_url=f'{settings.WEBSITE_URL}' +
                     "cart/success?session_id={CHECKOUT_SESSION_ID}",
                     cancel_url=f'{settings.WEBSITE_URL}/cart'
                 )
+            except (CircuitOpenError, stripe.StripeError):
+                logger.exception(f'Stripe session for order {order.id} could not be created')
+                return JsonResponse({'error': 'Payments are unavailable right now, please try again shortly.'}, status=503)
 
-                show_customer_form = False
-                show_address_form = False
-                show_summary_form = False
-                return JsonResponse({'session': session})
+            return JsonResponse({'session': session})
     else:
         show_customer_form = True
         show_address_form = False
@@ -381,7 +405,7 @@ class ProductViewSet(ModelViewSet):
     permission_classes = [IsAdminOrReadOnly]
 
     def get_queryset(self):
-        return Product.objects.select_related('user', 'category').prefetch_related('productimages', 'user__vendors')
+        return Product.objects.select_related('user', 'category').prefetch_related('productimages__variants', 'user__vendors')
 
     def get_serializer_context(self):
         return {'request': self.request}
@@ -393,6 +417,16 @@ class ProductViewSet(ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
+class ProductCardViewSet(ReadOnlyModelViewSet):
+    queryset = ProductCard.objects.order_by('pk')
+    serializer_class = ProductCardSerializer
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_class = ProductCardViewFilter
+    pagination_class = DefaultPagination
+    search_fields = ['title', 'product__description']
+    ordering_fields = ['unit_price', 'last_update']
+
+
 class ReviewViewSet(ModelViewSet):
     serializer_class = ReviewSerializer
 
@@ -430,7 +464,8 @@ class OrderViewSet(ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     http_method_names = ['get', 'head', 'options', 'delete']
-    renderer_classes = [TemplateHTMLRenderer]
+    renderer_classes = [TemplateHTMLRenderer, JSONRenderer]
+    pagination_class = DefaultPagination
 
     def get_permissions(self):
         if self.request.method in permissions.SAFE_METHODS:
@@ -440,32 +475,39 @@ class OrderViewSet(ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = Order.objects.select_related('customer').prefetch_related(
+            'orderitems__product__user__vendors',
+            Prefetch(
+                'orderitems__product__productimages', queryset=ProductImage.objects.filter(default=True))
+        ).order_by('-created_at', '-id')
         if user.is_staff:
-            return Order.objects.select_related('customer').all(
-            ).prefetch_related(
-                'orderitems__product__user__vendors',
-                Prefetch(
-                    'orderitems__product__productimages', queryset=ProductImage.objects.filter(default=True))
-            )
-        else:
-            return Order.objects.select_related('customer').filter(
-                customer__user_id=user
-            ).prefetch_related(
-                'orderitems__product__user__vendors',
-                Prefetch(
-                    'orderitems__product__productimages', queryset=ProductImage.objects.filter(default=True))
-            )
+            return queryset
+        return queryset.filter(customer__user_id=user)
 
     def list(self, request, *args, **kwargs):
-        breadcrumbs = breadcrumb_navigation(request, 'My Orders')
-
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        orders = serializer.data
         if request.accepted_renderer.format == 'html':
-            return render(request, 'myorders.html', {'orders': orders, 'breadcrumbs': breadcrumbs})
-
-        return Response(orders)
+            breadcrumbs = breadcrumb_navigation(request, 'My Orders')
+            page_orders = pagination(
+                request, queryset, page_Item_numbers=DefaultPagination.page_size)
+            serializer = self.get_serializer(page_orders.object_list, many=True)
+            return render(request, 'myorders.html', {'orders': serializer.data, 'page_obj': page_orders, 'breadcrumbs': breadcrumbs})
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        # Orders are fetched and prefetched one chunk at a time while the response is sent
+        orders = self.get_queryset().iterator(
+            chunk_size=settings.ORDER_EXPORT_CHUNK_SIZE)
+        renderer = StreamingJSONRenderer()
+        response = StreamingHttpResponse(
+            renderer.render(self.get_serializer(order).data for order in orders),
+            content_type=renderer.content_type)
+        response['Content-Disposition'] = 'attachment; filename="orders.json"'
+        return response
 
 
 class OrderItemViewSet(ModelViewSet):
@@ -0,0 +1,127 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .checkout import complete_order
+from .models import Order, StripeEvent
+
+logger = logging.getLogger(__name__)
+
+CHECKOUT_COMPLETED = 'checkout.session.completed'
+
+
+def record_event(event):
+    """
+    Stores the verified event as received. Stripe retries deliveries, so an
+    event id that is already stored is ignored. Returns whether it was new.
+    """
+    try:
+        with transaction.atomic():
+            StripeEvent.objects.create(
+                event_id=event['id'], type=event['type'], payload=event)
+    except IntegrityError:
+        return False
+    return True
+
+
+def get_paid_order(event):
+    """
+    Returns the order id and payment intent of a paid checkout session, or
+    None for any other event.
+    """
+    if event.type != CHECKOUT_COMPLETED:
+        return None
+    session = event.payload['data']['object']
+    if session.get('payment_status') != 'paid':
+        return None
+    order_id = (session.get('metadata') or {}).get(
+        'order_id') or session.get('client_reference_id')
+    if not order_id:
+        return None
+    return int(order_id), session.get('payment_intent') or ''
+
+
+def pay_order(order, payment_intent):
+    if payment_intent and order.payment_intent != payment_intent:
+        Order.objects.filter(pk=order.pk).update(payment_intent=payment_intent)
+    complete_order(order)
+
+
+def retry_event(event, error, now):
+    """
+    Records a failed attempt and schedules the next one with exponential
+    backoff. The event is only given up on after STRIPE_EVENT_MAX_ATTEMPTS.
+    """
+    attempts = event.attempts + 1
+    if attempts >= settings.STRIPE_EVENT_MAX_ATTEMPTS:
+        logger.error(
+            f'Stripe event {event.event_id} failed {attempts} times and was given up: {error}')
+        StripeEvent.objects.filter(pk=event.pk).update(
+            attempts=attempts, error=error, processed_at=now)
+        return
+    delay = timedelta(seconds=settings.STRIPE_EVENT_RETRY_SECONDS * 2 ** (attempts - 1))
+    StripeEvent.objects.filter(pk=event.pk).update(
+        attempts=attempts, error=error, next_attempt_at=now + delay)
+
+
+def process_events(batch_size=None):
+    """
+    Handles one batch of due events and returns how many it took.
+    Rows are claimed with SKIP LOCKED so parallel workers take different batches.
+    Each event runs in its own savepoint, so one failure does not roll back the
+    rest of the batch. Malformed events are marked processed with their error;
+    any other failure leaves the event unprocessed and retries it later.
+    """
+    batch_size = batch_size or settings.STRIPE_EVENT_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(StripeEvent.objects.select_for_update(skip_locked=True).filter(
+            Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now),
+            processed_at__isnull=True).order_by('id')[:batch_size])
+        if not events:
+            return 0
+
+        malformed = {}
+        failed = []
+        payments = {}
+        for event in events:
+            try:
+                payment = get_paid_order(event)
+            except (KeyError, TypeError, ValueError) as exc:
+                malformed[event.pk] = f'Malformed event: {exc!r}'
+                logger.error(f'Stripe event {event.event_id} is malformed: {exc!r}')
+                continue
+            if payment is not None:
+                payments[event.pk] = payment
+
+        orders = Order.objects.in_bulk(
+            list({order_id for order_id, _ in payments.values()}))
+        for event in events:
+            if event.pk not in payments:
+                continue
+            order_id, payment_intent = payments[event.pk]
+            order = orders.get(order_id)
+            if order is None:
+                logger.warning(f'Stripe paid for unknown order {order_id}')
+                continue
+            try:
+                with transaction.atomic():
+                    pay_order(order, payment_intent)
+            except Exception as exc:
+                failed.append((event, repr(exc)))
+                logger.exception(
+                    f'Stripe event {event.event_id} for order {order_id} failed')
+
+        failed_pks = {event.pk for event, _ in failed}
+        StripeEvent.objects.filter(pk__in=[
+            event.pk for event in events if event.pk not in malformed and event.pk not in failed_pks
+        ]).update(processed_at=now, error='')
+        for event_pk, error in malformed.items():
+            StripeEvent.objects.filter(pk=event_pk).update(
+                processed_at=now, error=error)
+        for event, error in failed:
+            retry_event(event, error, now)
+    return len(events)
@@ -17,6 +17,8 @@ urlpatterns = [
     path('myprofile/', myprofile, name='myprofile'),
     path('myorders/',
          OrderViewSet.as_view({'get': 'list'}), name='myorders'),
+    path('myorders/export/',
+         OrderViewSet.as_view({'get': 'export'}), name='myorders_export'),
     path('change_password/', change_password, name='change_password'),
     path('change_email/', change_email, name='change_email'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout')
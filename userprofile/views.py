@@ -3,14 +3,18 @@ from django.contrib.auth.models import User
 from django.contrib.auth.forms import AuthenticationForm, PasswordChangeForm
 from django.contrib.auth import login, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
 from django.http import Http404
-from django.db.models import F, Prefetch
+from django.db.models import F
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.text import slugify
 
-from store.models import Product, OrderItem, Vendor, Order, ProductImage
+from analytics.rollups import get_sales_chart, get_vendor_top_products
+from store.models import Product, ProductCard, Vendor, ProductImage
+from store.earnings import get_earnings, get_vendor_order_items
 from store.views import breadcrumb_navigation, pagination, sort_filter
 from store.forms import ProductForm, ProductImageFormSet, VendorForm
+from store.tasks import schedule_thumbnail
 from .models import Userprofile
 from .forms import ChangeEmailForm, UserCreationForm
 
@@ -22,12 +26,11 @@ def mystore(request):
     products = request.user.products.exclude(deleted=True)
     context = sort_filter(request, products)
 
-    order_items = OrderItem.objects.select_related(
-        'product').select_related('order__customer').filter(product__user=request.user)
-
-    total_earnings = 0
-    total_earnings = sum(
-        [order_item.unit_price * order_item.quantity for order_item in order_items if order_item.order.payment_status == Order.PAYMENT_STATUS_COMPLETE])
+    order_items = Paginator(get_vendor_order_items(request.user), 25).get_page(
+        request.GET.get('orders_page'))
+    earnings = get_earnings(request.user)
+    sales_chart = get_sales_chart(request.user)
+    top_products = get_vendor_top_products(request.user)
 
     try:
         if request.user.userprofile.is_vendor:
@@ -51,7 +54,7 @@ def mystore(request):
     else:
         form = VendorForm(instance=vendor)
 
-    return render(request, 'mystore.html', {'order_items': order_items, 'total_earnings': total_earnings, 'form': form, 'breadcrumbs': breadcrumbs, **context})
+    return render(request, 'mystore.html', {'order_items': order_items, 'total_earnings': earnings.total, 'earnings': earnings, 'sales_chart': sales_chart, 'top_products': top_products, 'form': form, 'breadcrumbs': breadcrumbs, **context})
 
 
 @login_required
@@ -76,15 +79,16 @@ def add_product(request):
                     if form.has_changed():
                         productimage = form.save(commit=False)
                         productimage.product = product
-                        productimage.thumbnail = productimage.make_thumbnail(
-                            form.cleaned_data['image'])
+                        image_changed = 'image' in form.changed_data
+                        if image_changed:
+                            productimage.mark_thumbnail_pending()
                         productimage.save()
+                        if image_changed:
+                            schedule_thumbnail(productimage.pk)
 
                     delete_key = f"productimages-{index}-delete"
                     if delete_key in request.POST:
                         productimage = form.instance
-                        productimage.image.delete(save=False)
-                        productimage.thumbnail.delete(save=False)
                         productimage.delete()
 
                 for key in request.FILES.keys():
@@ -94,8 +98,6 @@ def add_product(request):
                             product=product,
                             image=new_image_file,
                         )
-                        productimage.thumbnail = productimage.make_thumbnail(
-                            new_image_file)
 
                         index = key.split('-')[1]
                         default_checkbox_name = f'productimages-{ index }-default'
@@ -106,11 +108,10 @@ def add_product(request):
                             productimage.default = False
 
                         productimage.save()
+                        schedule_thumbnail(productimage.pk)
 
                         delete_key = f"productimages-{index}-delete"
                         if delete_key in request.POST:
-                            productimage.image.delete(save=False)
-                            productimage.thumbnail.delete(save=False)
                             productimage.delete()
 
                 formset.save()
@@ -163,15 +164,16 @@ def edit_product(request, pk):
                     if form.has_changed():
                         productimage = form.save(commit=False)
                         productimage.product = product
-                        productimage.thumbnail = productimage.make_thumbnail(
-                            form.cleaned_data['image'])
+                        image_changed = 'image' in form.changed_data
+                        if image_changed:
+                            productimage.mark_thumbnail_pending()
                         productimage.save()
+                        if image_changed:
+                            schedule_thumbnail(productimage.pk)
 
                     delete_key = f"productimages-{index}-delete"
                     if delete_key in request.POST:
                         productimage = form.instance
-                        productimage.image.delete(save=False)
-                        productimage.thumbnail.delete(save=False)
                         productimage.delete()
 
                 for key in request.FILES.keys():
@@ -181,8 +183,6 @@ def edit_product(request, pk):
                             product=product,
                             image=new_image_file,
                         )
-                        productimage.thumbnail = productimage.make_thumbnail(
-                            new_image_file)
 
                         index = key.split('-')[1]
                         default_checkbox_name = f'productimages-{ index }-default'
@@ -193,11 +193,10 @@ def edit_product(request, pk):
                             productimage.default = False
 
                         productimage.save()
+                        schedule_thumbnail(productimage.pk)
 
                         delete_key = f"productimages-{index}-delete"
                         if delete_key in request.POST:
-                            productimage.image.delete(save=False)
-                            productimage.thumbnail.delete(save=False)
                             productimage.delete()
 
                 formset.save()
@@ -283,11 +282,11 @@ def myaccount(request):
 
 
 def vendor_detail(request, pk):
-    user = get_object_or_404(User.objects.annotate(vendor_userid=F('vendors'), vendor_shop_name=F('vendors__shop_name')).prefetch_related(Prefetch(
-        'products', queryset=Product.objects.select_related('category').annotate(vendor_userid=F('user__vendors'), vendor_shop_name=F('user__vendors__shop_name')).filter(status=Product.ACTIVE, deleted=False))), pk=pk)
-    products = user.products.all()
+    user = get_object_or_404(User.objects.annotate(
+        vendor_shop_name=F('vendors__shop_name')), pk=pk)
+    products = ProductCard.objects.filter(user=user)
 
-    context = sort_filter(request, products)
+    context = sort_filter(request, products, default_ordering='-last_update')
     breadcrumbs = breadcrumb_navigation(request, user.vendor_shop_name)
 
     return render(request, 'vendor_detail.html', {'user': user, 'breadcrumbs': breadcrumbs, **context})